@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import sys
+import argparse
+from src.parser.standalone_parser import DEFAULT_STANDALONE_PATH
+from src.utils.batch import collect_sources, run_batch, write_report
+
+# 複数のソースファイルをまとめて処理する（パーサーの読み込みはワーカーごとに 1 度だけ）
+arg_parser = argparse.ArgumentParser(description="ソースファイルをまとめてパース・検査し、スクリプトを生成する")
+arg_parser.add_argument("inputs", nargs="*", help="ディレクトリ・glob パターン・ファイル")
+arg_parser.add_argument("--manifest", help="1 行に 1 パスを書いたファイル")
+arg_parser.add_argument("-o", "--output-dir", default="scripts/batch", help="生成したスクリプトの出力先")
+arg_parser.add_argument("-j", "--jobs", type=int, default=None, help="ワーカー数（既定は CPU 数）")
+arg_parser.add_argument("--report", default=None, help="診断結果の JSON の出力先（既定は <output-dir>/report.json）")
+arg_parser.add_argument("--grammar", default="./grammar/calc_grammar.lark")
+arg_parser.add_argument("--no-cache", action="store_true", help="パースキャッシュを使わない")
+arg_parser.add_argument("--no-optimize", action="store_true", help="定数畳み込みなどの最適化を行わない")
+arg_parser.add_argument("--no-standalone", action="store_true", help="生成済みのパーサー表を使わない")
+args = arg_parser.parse_args()
+
+if not args.inputs and args.manifest is None:
+    arg_parser.error("入力ファイルを指定してください")
+
+try:
+    sources = collect_sources(args.inputs, args.manifest)
+except ValueError as e:
+    print(e)
+    sys.exit(2)
+
+report = run_batch(
+    sources,
+    args.output_dir,
+    args.grammar,
+    workers=args.jobs,
+    standalone_path=None if args.no_standalone else DEFAULT_STANDALONE_PATH,
+    use_cache=not args.no_cache,
+    optimize=not args.no_optimize,
+)
+report_path = args.report or f"{args.output_dir}/report.json"
+write_report(report, report_path)
+
+for result in report["files"]:
+    for diagnostic in result["diagnostics"]:
+        position = f":{diagnostic['line']}:{diagnostic['column']}" if diagnostic["line"] else ""
+        print(f"{result['source']}{position}: {diagnostic['kind']}: {diagnostic['message']}")
+
+summary = report["summary"]
+print(f"{summary['files']} files, {summary['failed']} failed, {summary['diagnostics']} diagnostics "
+      f"({summary['workers']} workers, {summary['seconds']:.2f}s) -> {report_path}")
+sys.exit(1 if summary["failed"] else 0)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+import sys
+import argparse
+from src.utils.benchmark import (
+    DEFAULT_MIN_TIME, DEFAULT_THRESHOLD, PROGRAMS, SIZE_NAMES,
+    compare_results, format_results, load_results, run_benchmarks, write_results,
+)
+
+# 合成したプログラムでパイプラインの段ごとの時間を測り、基準の結果と比べる
+arg_parser = argparse.ArgumentParser(description="パース・変換・型検査・実行・生成の段ごとの時間を測り、基準と比べる")
+arg_parser.add_argument("--programs", default=",".join(PROGRAMS), help=f"測るプログラム（カンマ区切り。{', '.join(PROGRAMS)}）")
+arg_parser.add_argument("--sizes", default=",".join(SIZE_NAMES), help=f"プログラムの大きさ（カンマ区切り。{', '.join(SIZE_NAMES)}）")
+arg_parser.add_argument("--repeat", type=int, default=5, help="ケースごとに繰り返す回数（最も速かった回を結果にする）")
+arg_parser.add_argument("-o", "--output", default="benchmark.json", help="結果の JSON の出力先")
+arg_parser.add_argument("--baseline", default=None, help="比べる基準の結果の JSON（遅くなった段があれば終了コード 1）")
+arg_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="遅くなったとみなす割合（0.2 なら 20%% を超えたとき）")
+arg_parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="これより短い段（秒）は比べない")
+arg_parser.add_argument("--grammar", default="./grammar/calc_grammar.lark")
+args = arg_parser.parse_args()
+
+try:
+    baseline = load_results(args.baseline) if args.baseline else None
+    results = run_benchmarks(
+        args.grammar,
+        programs=[name for name in args.programs.split(",") if name],
+        sizes=[size for size in args.sizes.split(",") if size],
+        repeat=args.repeat,
+    )
+except (OSError, ValueError) as e:
+    print(e)
+    sys.exit(2)
+write_results(results, args.output)
+
+print("times in ms" + (f" (change from {args.baseline})" if baseline else ""))
+for line in format_results(results, baseline):
+    print(line)
+print(f"-> {args.output}")
+
+if baseline:
+    regressions = compare_results(results, baseline, args.threshold, args.min_time)
+    for regression in regressions:
+        print(f"REGRESSION {regression.case} {regression.stage}: "
+              f"{regression.baseline * 1000:.2f} ms -> {regression.current * 1000:.2f} ms ({regression.ratio:.2f}x)")
+    if regressions:
+        sys.exit(1)
+    print(f"no regressions over {args.threshold * 100:g}%")
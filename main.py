@@ -1,79 +1,194 @@
 #!/usr/bin/env python3
 import sys
+from contextlib import nullcontext
 from lark import Lark
 from lark.exceptions import UnexpectedInput, GrammarError
-from src.ast.node import Node
-from src.parser.calc_transformer import CalcTransformer
+from src.ast.node import Node, Kind
 from src.interpreter.eval import Eval
 from src.interpreter.interpreter import Interpreter
+from src.interpreter.compiler import Compiler
+from src.interpreter.optimizer import Optimizer
+from src.interpreter.profiler import Profiler
+from src.interpreter.purity import MemoCache
+from src.interpreter.code_cache import CodeCache
+from src.interpreter.python_backend import PythonBackend
+from src.interpreter.sampler import SamplingProfiler
+from src.interpreter.vm import VM
 from src.parser.grammar_loader import load_grammar
+from src.parser.parse_cache import ParseCache
+from src.parser.standalone_parser import DEFAULT_STANDALONE_PATH
+from src.parser.stream_parser import iter_functions
 from src.utils.generator import Generator
-
-def printNode(node, callCount=0):
-    callCount += 1
-    print(node.get_kind())
-
-    if type(node.get_lhs()) == Node and node.get_kind() == "FUNCTION":
-        for i in range(node.get_rhs().__len__()):
-            printNode(node.get_rhs()[i])
-
-    else:
-        if type(node.get_lhs()) == Node:
-            for i in range(callCount):
-                print("  ", end="")
-            print("L: ", end="")
-            printNode(node.get_lhs(), callCount)
-        elif node.get_lhs() is not None:
-            for i in range(callCount):
-                print("  ", end="")
-            print("L: ", node.get_lhs())
-
-        if type(node.get_rhs()) == Node:
-            for i in range(callCount):
-                print("  ", end="")
-            print("R: ", end="")
-            printNode(node.get_rhs(), callCount)
-        elif node.get_rhs() is not None:
-            for i in range(callCount):
-                print("  ", end="")
-            print("R: ", node.get_rhs())
-
-    callCount -= 1
+from src.utils.timings import StageTimings
+from src.utils.utils import printNode
 
 args = sys.argv
 
-parser = load_grammar("./grammar/calc_grammar.lark", "top_level")
-text = open("./tests/test.rs", encoding="utf-8", mode="r").read()
+# 段ごとの経過時間・CPU 時間・最大メモリ・ノード数（--timings で表示、--timings-json で timings.json に書き出す）
+timings = StageTimings() if "--timings" in args or "--timings-json" in args else None
 
 
-try:
-    tree = parser.parse(text)
-    result = CalcTransformer().transform(tree)
+def stage(name, tree=None):
+    return timings.stage(name, tree) if timings else nullcontext()
 
-except UnexpectedInput as e:
-    print(f"エラー位置: {e.line}:{e.column}")  # 行と列
-    print(f"エラー周辺のテキスト:\n{e.get_context(text)}")  # エラー周辺のテキスト
-    exit(1)
 
+def report_timings():
+    if timings is None:
+        return
+    timings.stop()
+    if "--timings" in args:
+        print("\n".join(timings.format()))
+    if "--timings-json" in args:
+        timings.write_json("timings.json")
+        print("⏱️ Timings saved: timings.json")
+
+
+# scripts/build_parser.py で生成した表があれば使う（--no-standalone で無効化）
+standalone_path = None if "--no-standalone" in args else DEFAULT_STANDALONE_PATH
+# 定数畳み込み・定数伝播・不要な let の削除（--no-optimize で無効化）。型検査の後、生成・実行の前に行う
+optimizer = None if "--no-optimize" in args else Optimizer()
+# 純粋な関数の結果を引数ごとにキャッシュする（--memo で有効化）
+memo = MemoCache() if "--memo" in args else None
+# 型検査（--no-typecheck で無効化）。型の不一致があれば実行しない
+typecheck = "--no-typecheck" not in args
+# --python の実行で compile() したコードオブジェクトのキャッシュ（--no-cache で無効化）
+code_cache = None
+if "--python" in args and "--no-cache" not in args and "--stream" not in args:
+    code_cache = CodeCache("./grammar/calc_grammar.lark", options=[
+        "optimize" if optimizer else "no-optimize",
+        "typecheck" if typecheck else "no-typecheck",
+    ])
+
+if "--stream" in args:
+    # 関数ごとにパースし、届いた順に型検査とスクリプト生成へ流す（ファイル全体を読み込まない）
+    parser = load_grammar("./grammar/calc_grammar.lark", "function", standalone_path)
+    eval = Eval(None, verbose=False)
+    print("🔧 Rust風スクリプトを生成しています...")
+    generator = Generator()
+    try:
+        # パース・型検査・最適化・生成は関数ごとに交互に進むので、まとめて 1 つの段として測る
+        with stage("stream"), open("./tests/test.rs", encoding="utf-8", mode="r") as source:
+            functions = iter_functions(source, parser)
+            if typecheck:
+                functions = eval.evaluate_functions(functions)
+            if optimizer:
+                functions = optimizer.optimize_functions(functions)
+            functions = list(generator.generate_stream(functions, "generated_script.rs"))
+    except UnexpectedInput as e:
+        print(f"エラー位置: {e.line}:{e.column}")  # 行と列
+        exit(1)
+    result = Node(Kind.TOP_LEVEL, functions)
+    if timings:
+        timings.count(result)
+
+else:
+    text = open("./tests/test.rs", encoding="utf-8", mode="r").read()
+
+    # ソースが変わっていなければ、パース・変換・型検査・生成・compile() をすべて省いて実行する
+    code = None
+    if code_cache:
+        with stage("code_cache"):
+            code = code_cache.load(text)
+    if code is not None:
+        with stage("execute"):
+            backend = PythonBackend(code=code)
+            backend.run()
+        print(backend.get_local("x"))
+        report_timings()
+        exit(0)
 
-# 型検査
-eval = Eval(result)
+    # パースキャッシュ（--no-cache で無効化）。ヒットすれば文法の読み込みも省略する
+    cache = None if "--no-cache" in args else ParseCache("./grammar/calc_grammar.lark")
+    result = None
+    if cache:
+        with stage("parse_cache"):
+            result = cache.load(text)
+        if timings and result is not None:
+            timings.count(result)
 
-# match eval.evaluate():
+    try:
+        if result is None:
+            # CalcTransformer をパース中に適用し、lark の Tree を作らずに Node の木を組み立てる
+            with stage("load_grammar"):
+                parser = load_grammar("./grammar/calc_grammar.lark", "top_level", standalone_path, inline_transform=True)
+            with stage("parse"):
+                result = parser.parse(text)
+            if timings:
+                timings.count(result)
+            if cache:
+                with stage("parse_cache_store"):
+                    cache.store(text, result)
 
-# スクリプト生成
-print("🔧 Rust風スクリプトを生成しています...")
-generator = Generator()
-generator.generate(result, "generated_script.rs")
+    except UnexpectedInput as e:
+        print(f"エラー位置: {e.line}:{e.column}")  # 行と列
+        print(f"エラー周辺のテキスト:\n{e.get_context(text)}")  # エラー周辺のテキスト
+        exit(1)
+
+
+    # 型検査
+    eval = Eval(result, verbose=False)
+    if typecheck:
+        with stage("check", result):
+            eval.check()
+
+    if optimizer:
+        with stage("optimize", result):
+            optimizer.optimize(result)
+
+    # スクリプト生成
+    print("🔧 Rust風スクリプトを生成しています...")
+    generator = Generator()
+    with stage("generate", result):
+        generator.generate(result, "generated_script.rs")
+
+# 型の不一致が報告されたか、検査に通らなかった関数があれば実行しない
+failed = [name for name, ok in eval.results.items() if not ok]
+if eval.errors or failed:
+    for message in eval.errors:
+        print(message)
+    if not eval.errors:
+        print(f"型検査に失敗した関数: {', '.join(failed)}")
+    exit(1)
 
-print("型解析無効モード")
-match True:
-    case False:
-        print("The result is a string.")
-    case _:
-        # 実行
-        interpreter = Interpreter(result)
-        mem = interpreter.execute()
-        r= mem.get_variable(("x", "identifier"), ("main", "identifier")).get_value()
-        print(r)
-        mem.view()
\ No newline at end of file
+# 実行。最適化後の木の式の型を求めておき、インタープリターの特殊化に使う
+types = None
+if typecheck:
+    with stage("infer_types", result):
+        types = eval.infer_types(result)
+if "--tree-walk" in args or "--profile" in args or "--sample" in args:
+    # 参照実装: Node 木を直接辿るインタープリター
+    # --profile なら関数・ノード種別ごとに計測し、--sample なら一定間隔で実行中の行を調べる
+    profiler = Profiler() if "--profile" in args else None
+    sampler = SamplingProfiler() if "--sample" in args else None
+    with stage("execute", result):
+        interpreter = Interpreter(result, memo=memo, types=types, profiler=profiler)
+        with sampler or nullcontext():
+            frame = interpreter.execute()
+    r= frame.get_variable("x").get_value()
+    print(r)
+    frame.view()
+    if profiler:
+        profiler.write_json("profile.json")
+        profiler.write_collapsed("profile.folded")
+        print("📊 Profile saved: profile.json, profile.folded")
+    if sampler:
+        with open("./tests/test.rs", encoding="utf-8") as source:
+            print(sampler.report(source.read(), result))
+elif "--python" in args:
+    # Python のソースに変換して compile() し、CPython のバイトコードとして実行する
+    with stage("execute", result):
+        backend = PythonBackend(result)
+        backend.run()
+    if code_cache:
+        code_cache.store(text, backend.code)
+    # VM・インタープリターと同じく main の x を表示する
+    print(backend.get_local("x"))
+else:
+    # バイトコードにコンパイルして VM で実行
+    with stage("execute", result):
+        vm = VM(Compiler().compile(result), memo=memo)
+        vm.run()
+    print(vm.get_local("x"))
+if memo:
+    print(f"メモ化: {memo.stats()}")
+report_timings()
@@ -0,0 +1,56 @@
+import io
+import sys
+import time
+import contextlib
+import argparse
+from pathlib import Path
+
+# ensure project root on sys.path when run as script
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.parser.calc_transformer import CalcTransformer
+from src.parser.grammar_loader import load_grammar
+from src.utils.emitter import PythonEmitter, RustEmitter
+from src.utils.generator import Generator
+
+
+def build_source(functions, terms):
+    """関数 functions 個、各関数に terms 項の式を持つ生成用のソース"""
+    lines = []
+    for i in range(functions):
+        expression = " + ".join(f"a * {j} - (b - {j}) / 2" for j in range(terms))
+        lines.append(
+            f"fn f{i}(a: i32, b: i32) -> i32 {{ let x = {expression}; "
+            f"if x < a && !(b == 0) {{ return f{i}(x, b - 1); }} return x; }}"
+        )
+    lines.append("fn main() -> i32 { return f0(1, 2); }")
+    return "\n".join(lines)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="大きな AST でのコード生成の速さを測る")
+    arg_parser.add_argument("--functions", type=int, default=200)
+    arg_parser.add_argument("--terms", type=int, default=50, help="関数ごとの式の項の数")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="最も速かった回を結果にする")
+    args = arg_parser.parse_args()
+
+    parser = load_grammar(str(ROOT / "grammar" / "calc_grammar.lark"), "top_level")
+    with contextlib.redirect_stdout(io.StringIO()):
+        root = CalcTransformer().transform(parser.parse(build_source(args.functions, args.terms)))
+
+    for emitter_class in (RustEmitter, PythonEmitter):
+        best = None
+        for _ in range(args.repeat):
+            generator = Generator(emitter=emitter_class(output_dir=None))
+            start = time.perf_counter()
+            generator.generate(root)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        size = len(generator.emitter.source())
+        print(f"{emitter_class.__name__}: {best * 1000:.1f} ms, {size / best / 1e6:.1f} MB/s of generated code")
+
+
+if __name__ == '__main__':
+    main()
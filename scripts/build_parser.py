@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+
+# ensure project root on sys.path when run as script
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.parser.standalone_parser import build_standalone_parser, DEFAULT_STANDALONE_PATH
+
+
+def main():
+    grammar_path = sys.argv[1] if len(sys.argv) > 1 else str(ROOT / "grammar" / "calc_grammar.lark")
+    output_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_STANDALONE_PATH
+    build_standalone_parser(grammar_path, "top_level", output_path)
+    print(f"Generated {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,155 @@
-from dataclasses import dataclass
+class Kind:
+    """ノード種別の整数タグ。各パスは文字列ではなくこのタグで分岐する"""
+    TOP_LEVEL = 0
+    FUNCTION = 1
+    PARAM_LIST = 2
+    PARAM = 3
+    STATEMENT = 4
+    LET = 5
+    LOOP = 6
+    IF = 7
+    IF_ELSE = 8
+    ELSE = 9
+    WHILE = 10
+    MATCH = 11
+    MATCH_ARM = 12
+    RETURN = 13
+    EXPR = 14
+    OR_EXPR = 15
+    AND_EXPR = 16
+    EQUALITY_EXPR = 17
+    RELATIONAL_EXPR = 18
+    EQ_EXPR = 19
+    NE_EXPR = 20
+    LT_EXPR = 21
+    GT_EXPR = 22
+    LE_EXPR = 23
+    GE_EXPR = 24
+    ADD_EXPR = 25
+    SUB_EXPR = 26
+    MUL_EXPR = 27
+    DIV_EXPR = 28
+    UNARY_EXPR = 29
+    NEG_EXPR = 30
+    NOT_EXPR = 31
+    FACTOR = 32
+    FUNCTION_CALL = 33
+    ARG_LIST = 34
+    NUM = 35
+    FLOAT = 36
+    ID = 37
+    STR = 38
+    BOOL = 39
+    PRIMITIVE_TYPE = 40
+    ARRAY_TYPE = 41
+    TYPE = 42
+
+
+KIND_NAMES = [name for name, _ in sorted(((n, v) for n, v in vars(Kind).items() if n.isupper()), key=lambda item: item[1])]
+KIND_TAGS = {name: tag for tag, name in enumerate(KIND_NAMES)}
+
+
+def kind_tag(name):
+    """種別名をタグに変換する。未知の種別名は新しいタグとして登録する"""
+    tag = KIND_TAGS.get(name)
+    if tag is None:
+        tag = len(KIND_NAMES)
+        KIND_NAMES.append(name)
+        KIND_TAGS[name] = tag
+    return tag
+
+
+# 種別ごとの子の配置: (フィールド名, リストかどうか)。葉ノード（トークンを持つもの）は空
+NODE = False
+LIST = True
+LAYOUTS = {
+    Kind.TOP_LEVEL: (("lhs", LIST),),
+    Kind.FUNCTION: (("lhs", NODE), ("params", NODE), ("type", NODE), ("rhs", LIST)),
+    Kind.PARAM_LIST: (("lhs", LIST),),
+    Kind.PARAM: (("lhs", NODE), ("rhs", NODE)),
+    Kind.STATEMENT: (("lhs", NODE),),
+    Kind.LET: (("lhs", NODE), ("type", NODE), ("rhs", NODE)),
+    Kind.LOOP: (("lhs", LIST),),
+    Kind.IF: (("lhs", NODE), ("rhs", LIST)),
+    Kind.IF_ELSE: (("lhs", NODE), ("rhs", LIST)),
+    Kind.ELSE: (("lhs", LIST),),
+    Kind.WHILE: (("lhs", NODE), ("rhs", LIST)),
+    Kind.MATCH: (("lhs", NODE), ("rhs", LIST)),
+    Kind.MATCH_ARM: (("lhs", NODE), ("rhs", NODE)),
+    Kind.RETURN: (("lhs", NODE),),
+    Kind.FUNCTION_CALL: (("lhs", NODE), ("rhs", LIST)),
+    Kind.ARG_LIST: (("lhs", LIST),),
+    Kind.NEG_EXPR: (("lhs", NODE),),
+    Kind.NOT_EXPR: (("lhs", NODE),),
+    Kind.FACTOR: (("lhs", NODE),),
+    Kind.ARRAY_TYPE: (("lhs", NODE),),
+    Kind.NUM: (),
+    Kind.FLOAT: (),
+    Kind.ID: (),
+    Kind.STR: (),
+    Kind.BOOL: (),
+    Kind.PRIMITIVE_TYPE: (),
+    Kind.TYPE: (),
+}
+# 二項演算は lhs / rhs ともに式
+BINARY_LAYOUT = (("lhs", NODE), ("rhs", NODE))
+
 
-@dataclass
 class Node:
-    def __init__(self, kind, l, r=None, annotated_type=None):
-        self.__kind = kind
-        self.__lhs = l
-        self.__rhs = r
-        self.__type = annotated_type
+    """AST のノード。__dict__ を持たないよう __slots__ で属性を固定している
+
+    span はソース上の位置 (開始行, 開始列, 終了行, 終了列)。行・列は 1 始まりで、終了列は
+    最後の文字の次を指す。CalcTransformer が付け、位置の分からないノードは None。
+    """
+    __slots__ = ("tag", "lhs", "rhs", "type", "params", "slot", "span")
+
+    def __init__(self, kind, l, r=None, annotated_type=None, params=None):
+        self.tag = kind if type(kind) is int else kind_tag(kind)
+        self.lhs = l
+        self.rhs = r
+        self.type = annotated_type
+        self.params = params
+        self.slot = None
+        self.span = None
+
+    def __repr__(self):
+        return f"Node({KIND_NAMES[self.tag]})"
 
     def get_kind(self):
-        return self.__kind
+        return KIND_NAMES[self.tag]
+
+    def get_tag(self):
+        return self.tag
 
     def get_lhs(self):
-        return self.__lhs
+        return self.lhs
 
     def get_rhs(self):
-        return self.__rhs
+        return self.rhs
 
     def get_type(self):
-        return self.__type
\ No newline at end of file
+        return self.type
+
+    def get_params(self):
+        return self.params
+
+    def get_slot(self):
+        return self.slot
+
+    def set_slot(self, slot):
+        # Resolver が割り当てたローカル変数のスロット番号
+        self.slot = slot
+
+    def get_span(self):
+        return self.span
+
+    def children(self):
+        """LAYOUTS に従って子ノードを順に返す"""
+        for field, is_list in LAYOUTS.get(self.tag, BINARY_LAYOUT):
+            child = getattr(self, field)
+            if child is None:
+                continue
+            if is_list:
+                yield from child
+            else:
+                yield child
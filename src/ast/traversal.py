@@ -0,0 +1,111 @@
+from typing import Callable, Dict, Optional
+from .node import Node, Kind
+
+# 子が 1 つだけの包みのノード。rhs がなければ子に置き換えてたどる
+PASSTHROUGH_KINDS = frozenset((Kind.FACTOR, Kind.EXPR, Kind.UNARY_EXPR))
+
+
+class Traversal:
+    """式の木を Python の再帰を使わず、明示的なスタックで後行順に評価する（各パス共通）。
+
+    パスは種別ごとの関数を登録して使う。
+    - binary[kind](node, lhs, rhs): lhs と rhs の値が出た後に呼ぶ
+    - unary[kind](node, operand): lhs の値が出た後に呼ぶ
+    - nary[kind] = (operands, combine): operands(node) が返す子を順に評価し、combine(node, *values) を呼ぶ
+    - それ以外は handlers[kind](node)（葉や、文のように自分で子をたどるもの）。未登録なら default(node)
+    FACTOR と rhs のない EXPR / UNARY_EXPR は子に置き換えるので、どの表にも登録しなくてよい
+    （包みのノードにも値を記録したいパスは passthrough に空の集合を渡して自分で登録する）。
+    closures に登録したノードは、子をたどらずにそのクロージャの戻り値を値にする。
+    """
+
+    def __init__(self, handlers: Dict[int, Callable], default: Callable, binary: Dict[int, Callable] = None,
+                 unary: Dict[int, Callable] = None, nary: Dict[int, tuple] = None, closures: Optional[Dict[Node, Callable]] = None,
+                 passthrough: frozenset = PASSTHROUGH_KINDS):
+        self.handlers = handlers
+        self.default = default
+        self.binary = binary or {}
+        self.unary = unary or {}
+        self.nary = nary or {}
+        self.closures = closures
+        self.passthrough = passthrough
+        # ノード 1 つにつき辞書を 1 回引くだけで済むよう、種別 → (子の数, 関数, 子を返す関数) にまとめておく
+        # 子の数が None なら葉として関数を呼び、-1 なら子を返す関数で子を求める
+        self.dispatch = {kind: (None, handler, None) for kind, handler in handlers.items()}
+        self.dispatch.update((kind, (-1, combine, operands)) for kind, (operands, combine) in self.nary.items())
+        self.dispatch.update((kind, (1, combine, None)) for kind, combine in self.unary.items())
+        self.dispatch.update((kind, (2, combine, None)) for kind, combine in self.binary.items())
+
+    def evaluate(self, root: Node):
+        dispatch = self.dispatch
+        leaf = (None, self.default, None)
+        closures = self.closures
+        passthrough = self.passthrough
+
+        # stack には評価するノードと、子の値がそろったら呼ぶ (combine, node, 子の数) を積む
+        stack = [root]
+        push = stack.append
+        pop = stack.pop
+        values = []
+        push_value = values.append
+        pop_value = values.pop
+        while stack:
+            node = pop()
+            if node.__class__ is tuple:
+                combine, node, count = node
+                if count == 2:
+                    rhs = pop_value()
+                    push_value(combine(node, pop_value(), rhs))
+                elif count == 1:
+                    push_value(combine(node, pop_value()))
+                elif count:
+                    operands = values[-count:]
+                    del values[-count:]
+                    push_value(combine(node, *operands))
+                else:
+                    push_value(combine(node))
+                continue
+
+            tag = node.tag
+            while tag in passthrough and node.rhs is None:
+                node = node.lhs
+                tag = node.tag
+            if closures:
+                closure = closures.get(node)
+                if closure is not None:
+                    push_value(closure())
+                    continue
+
+            count, function, operands = dispatch.get(tag, leaf)
+            if count is None:
+                push_value(function(node))
+            elif count == 2:
+                push((function, node, 2))
+                push(node.rhs)
+                push(node.lhs)
+            elif count == 1:
+                push((function, node, 1))
+                push(node.lhs)
+            else:
+                operands = operands(node)
+                push((function, node, len(operands)))
+                stack.extend(reversed(operands))
+        return values[-1]
+
+
+def preorder(root, visit: Callable) -> None:
+    """root から行きがけ順にたどる。visit(item) は続けてたどる子の列（順番どおり）を返す。
+
+    列には任意の値と、引数なしの関数を混ぜられる。関数はスタックから取り出した時点で呼ぶ
+    （兄弟をたどった後に行う処理に使う）。Python の再帰を使わないので木の深さに制限はない。
+    """
+    stack = [root]
+    push_all = stack.extend
+    pop = stack.pop
+    while stack:
+        item = pop()
+        if callable(item):
+            item()
+            continue
+        children = visit(item)
+        if children:
+            push_all(reversed(children))
@@ -0,0 +1,78 @@
+from typing import List, Any
+
+
+class Op:
+    """VM の命令コード。命令列は [op, arg, op, arg, ...] のフラットな int 列で表す"""
+    LOAD_CONST = 0
+    LOAD_LOCAL = 1
+    STORE_LOCAL = 2
+    POP = 3
+    ADD = 4
+    SUB = 5
+    MUL = 6
+    DIV = 7
+    EQ = 8
+    NE = 9
+    LT = 10
+    GT = 11
+    LE = 12
+    GE = 13
+    NEG = 14
+    NOT = 15
+    JUMP = 16
+    JUMP_IF_FALSE = 17
+    JUMP_IF_FALSE_OR_POP = 18
+    JUMP_IF_TRUE_OR_POP = 19
+    CALL = 20
+    RETURN = 21
+
+
+OP_NAMES = {value: name for name, value in vars(Op).items() if name.isupper()}
+
+
+class CodeObject:
+    """1 関数分のバイトコード（命令列・定数プール・ローカルスロット数）"""
+
+    def __init__(self, name: str, nparams: int = 0):
+        self.name = name
+        self.nparams = nparams
+        self.code: List[int] = []
+        self.consts: List[Any] = []
+        self.local_names: List[str] = []
+        # 結果が引数だけで決まる関数か（purity.pure_functions）。メモ化の対象になる
+        self.pure = False
+
+    @property
+    def nlocals(self) -> int:
+        return len(self.local_names)
+
+    def disassemble(self) -> List[str]:
+        lines = []
+        for pc in range(0, len(self.code), 2):
+            op, arg = self.code[pc], self.code[pc + 1]
+            name = OP_NAMES[op]
+            if op == Op.LOAD_CONST:
+                lines.append(f"{pc:4d} {name} {arg} ({self.consts[arg]!r})")
+            elif op in (Op.LOAD_LOCAL, Op.STORE_LOCAL):
+                lines.append(f"{pc:4d} {name} {arg} ({self.local_names[arg]})")
+            else:
+                lines.append(f"{pc:4d} {name} {arg}")
+        return lines
+
+
+class Program:
+    """コンパイル済みの関数群。CALL 命令の引数は functions のインデックス"""
+
+    def __init__(self):
+        self.functions: List[CodeObject] = []
+        self.function_index = {}
+
+    def add_function(self, code: CodeObject) -> int:
+        self.function_index[code.name] = len(self.functions)
+        self.functions.append(code)
+        return self.function_index[code.name]
+
+    def get_function(self, name: str) -> CodeObject:
+        if name not in self.function_index:
+            raise ValueError(f"Function {name} is not defined")
+        return self.functions[self.function_index[name]]
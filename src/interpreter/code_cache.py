@@ -0,0 +1,152 @@
+import os
+import hashlib
+import marshal
+import tempfile
+from functools import lru_cache
+from importlib.util import MAGIC_NUMBER
+from types import CodeType
+from typing import Iterable, Optional
+from ..parser.calc_transformer import TRANSFORMER_VERSION
+from ..utils import emitter, generator
+from ..utils.emitter import EMITTER_VERSION
+from . import optimizer, python_backend
+from .optimizer import OPTIMIZER_VERSION
+
+DEFAULT_CACHE_DIR = ".code_cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# エントリの形式の版。形式を変えたら上げる
+FORMAT_VERSION = 1
+
+# 生成されるコードを決めるモジュール。版を上げ忘れても、ソースが変われば別のキーになる
+_CODE_GENERATION_MODULES = (optimizer, generator, emitter, python_backend)
+
+# エントリの先頭: CPython の .pyc と同じマジックナンバー（marshal の形式は Python の版ごとに違う）と、キーの SHA-256
+_HEADER_SIZE = len(MAGIC_NUMBER) + hashlib.sha256().digest_size
+
+
+class CodeCache:
+    """PythonBackend が compile() したコードオブジェクトのディスクキャッシュ（.pyc 相当）。
+
+    キーはソース・文法・Transformer と optimizer と emitter の版・コード生成のモジュールのソース・生成に効くオプションのハッシュ。
+    ヒットすればパース・変換・型検査・生成・compile() をすべて省ける。
+    容量を超えたら最後に使われた時刻（mtime）が古いものから削除する。
+    """
+
+    def __init__(self, grammar_path: str, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 options: Iterable[str] = ()):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # 最適化の有無など、同じソースから違うコードを生成するオプション
+        self.options = ",".join(sorted(options))
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        with open(grammar_path, "rb") as grammar_file:
+            self.grammar_hash = hashlib.sha256(grammar_file.read()).hexdigest()
+        self.generator_hash = code_generation_hash()
+
+    def _digest(self, source: str) -> bytes:
+        digest = hashlib.sha256()
+        digest.update(
+            f"{FORMAT_VERSION}:{TRANSFORMER_VERSION}:{OPTIMIZER_VERSION}:{EMITTER_VERSION}:"
+            f"{self.grammar_hash}:{self.generator_hash}:{self.options}:".encode("utf-8")
+        )
+        digest.update(MAGIC_NUMBER)
+        digest.update(source.encode("utf-8"))
+        return digest.digest()
+
+    def key(self, source: str) -> str:
+        return self._digest(source).hex()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".pyc")
+
+    def load(self, source: str) -> Optional[CodeType]:
+        digest = self._digest(source)
+        path = self._path(digest.hex())
+        try:
+            with open(path, "rb") as cache_file:
+                data = cache_file.read()
+            # 別の Python で書かれたもの・キーの違うもの（名前の衝突や書き換え）は使わない
+            if data[:_HEADER_SIZE] != MAGIC_NUMBER + digest:
+                raise ValueError("Stale code cache entry")
+            code = marshal.loads(data[_HEADER_SIZE:])
+            if not isinstance(code, CodeType):
+                raise ValueError("Broken code cache entry")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (ValueError, EOFError, TypeError):
+            # 壊れたエントリは削除してミス扱いにする
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        # LRU のため最終使用時刻を更新する
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return code
+
+    def store(self, source: str, code: CodeType) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        digest = self._digest(source)
+        data = MAGIC_NUMBER + digest + marshal.dumps(code)
+        # 並行実行しても壊れたファイルが見えないよう、一時ファイルから置き換える
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, self._path(digest.hex()))
+        except OSError:
+            self._remove(temp_path)
+            raise
+        if self._size is None:
+            self.evict()
+        else:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pyc"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+        self._size = total
+
+    def clear(self) -> None:
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".pyc"):
+                    self._remove(entry.path)
+        self._size = None
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@lru_cache(maxsize=None)
+def code_generation_hash() -> str:
+    """最適化・生成・compile() を行うモジュールのソースのハッシュ（プロセスごとに 1 度だけ読む）"""
+    digest = hashlib.sha256()
+    for module in _CODE_GENERATION_MODULES:
+        with open(module.__file__, "rb") as module_file:
+            digest.update(module_file.read())
+    return digest.hexdigest()
@@ -0,0 +1,241 @@
+from functools import partial
+from ..ast.node import Node, Kind
+from ..ast.traversal import preorder
+from .bytecode import Op, CodeObject, Program
+from .resolver import Resolver
+from .purity import pure_functions
+
+
+BINARY_OPS = {
+    Kind.ADD_EXPR: Op.ADD,
+    Kind.SUB_EXPR: Op.SUB,
+    Kind.MUL_EXPR: Op.MUL,
+    Kind.DIV_EXPR: Op.DIV,
+    Kind.EQ_EXPR: Op.EQ,
+    Kind.NE_EXPR: Op.NE,
+    Kind.LT_EXPR: Op.LT,
+    Kind.GT_EXPR: Op.GT,
+    Kind.LE_EXPR: Op.LE,
+    Kind.GE_EXPR: Op.GE,
+}
+
+UNARY_OPS = {
+    Kind.NEG_EXPR: Op.NEG,
+    Kind.NOT_EXPR: Op.NOT,
+}
+
+
+class Compiler:
+    """CalcTransformer が生成した Node 木をフラットなバイトコードに変換する"""
+
+    def __init__(self):
+        self.program = Program()
+        self.scopes = {}
+        self.__code = None
+        self.__const_index = {}
+
+        self.statement_handlers = {
+            Kind.STATEMENT: self._compile_statement,
+            Kind.LET: self._compile_let,
+            Kind.RETURN: self._compile_return,
+            Kind.IF: self._compile_if,
+            Kind.IF_ELSE: self._compile_if_else,
+            Kind.WHILE: self._compile_while,
+            Kind.LOOP: self._compile_loop,
+            Kind.MATCH: self._compile_match,
+        }
+        self.expression_handlers = {
+            Kind.NUM: self._compile_num,
+            Kind.FLOAT: self._compile_float,
+            Kind.STR: self._compile_str,
+            Kind.BOOL: self._compile_bool,
+            Kind.ID: self._compile_id,
+            Kind.FACTOR: self._compile_passthrough,
+            Kind.EXPR: self._compile_passthrough,
+            Kind.UNARY_EXPR: self._compile_passthrough,
+            Kind.AND_EXPR: self._compile_and,
+            Kind.OR_EXPR: self._compile_or,
+            Kind.FUNCTION_CALL: self._compile_function_call,
+        }
+
+    def compile(self, root: Node) -> Program:
+        functions = root.lhs if root.tag == Kind.TOP_LEVEL else [root]
+        self.scopes = Resolver().resolve(root)
+        pure = pure_functions(root)
+
+        # 前方参照できるよう、先に全関数を登録してから本体をコンパイルする
+        for function in functions:
+            name = self._name_of(function.lhs)
+            code = CodeObject(name, self.scopes[name].nparams)
+            code.pure = name in pure
+            self.program.add_function(code)
+
+        for function in functions:
+            self._compile_function(function)
+        return self.program
+
+    # === helpers ===
+    def _name_of(self, node):
+        return str(node.lhs)
+
+    def _emit(self, op, arg=0):
+        self.__code.code.append(op)
+        self.__code.code.append(arg)
+        return len(self.__code.code) - 2
+
+    def _here(self):
+        return len(self.__code.code)
+
+    def _patch(self, position, target):
+        self.__code.code[position + 1] = target
+
+    def _const(self, value):
+        # -0.0 == 0.0 でハッシュも同じなので、float は repr で区別する（畳み込みで -0.0 ができる）
+        key = (float, repr(value)) if type(value) is float else (type(value), value)
+        if key not in self.__const_index:
+            self.__const_index[key] = len(self.__code.consts)
+            self.__code.consts.append(value)
+        return self.__const_index[key]
+
+    def _compile_body(self, statements):
+        for statement in statements:
+            self._compile_node(statement)
+
+    def _compile_node(self, node):
+        kind = node.tag
+        if kind in self.statement_handlers:
+            self.statement_handlers[kind](node)
+        else:
+            # 式文: 値は捨てる
+            self._compile_expr(node)
+            self._emit(Op.POP)
+
+    def _compile_expr(self, node):
+        # 深い式でも Python の再帰を使わないよう、行きがけ順にたどりながら命令を出す
+        preorder(node, self._expression_steps)
+
+    def _expression_steps(self, node):
+        """preorder から呼ばれ、続けてコンパイルする子と、その後で出す命令（関数）を返す"""
+        kind = node.tag
+        if kind in BINARY_OPS:
+            return (node.lhs, node.rhs, partial(self._emit, BINARY_OPS[kind]))
+        if kind in UNARY_OPS:
+            return (node.lhs, partial(self._emit, UNARY_OPS[kind]))
+        if kind in self.expression_handlers:
+            return self.expression_handlers[kind](node)
+        raise ValueError(f"Unknown node kind: {node.get_kind()}")
+
+    # === statements ===
+    def _compile_function(self, node):
+        name = self._name_of(node.lhs)
+        self.__code = self.program.get_function(name)
+        self.__code.local_names = self.scopes[name].local_names
+        self.__const_index = {}
+
+        self._compile_body(node.rhs or [])
+        self._emit(Op.LOAD_CONST, self._const(None))
+        self._emit(Op.RETURN)
+
+    def _compile_statement(self, node):
+        self._compile_node(node.lhs)
+
+    def _compile_let(self, node):
+        self._compile_expr(node.rhs)
+        self._emit(Op.STORE_LOCAL, node.slot)
+
+    def _compile_return(self, node):
+        if node.lhs is not None:
+            self._compile_expr(node.lhs)
+        else:
+            self._emit(Op.LOAD_CONST, self._const(None))
+        self._emit(Op.RETURN)
+
+    def _compile_if(self, node):
+        self._compile_expr(node.lhs)
+        jump_to_end = self._emit(Op.JUMP_IF_FALSE)
+        self._compile_body(node.rhs)
+        self._patch(jump_to_end, self._here())
+
+    def _compile_if_else(self, node):
+        if_node = node.lhs
+        self._compile_expr(if_node.lhs)
+        jump_to_else = self._emit(Op.JUMP_IF_FALSE)
+        self._compile_body(if_node.rhs)
+        jump_to_end = self._emit(Op.JUMP)
+        self._patch(jump_to_else, self._here())
+        self._compile_body(node.rhs)
+        self._patch(jump_to_end, self._here())
+
+    def _compile_while(self, node):
+        start = self._here()
+        self._compile_expr(node.lhs)
+        jump_to_end = self._emit(Op.JUMP_IF_FALSE)
+        self._compile_body(node.rhs)
+        self._emit(Op.JUMP, start)
+        self._patch(jump_to_end, self._here())
+
+    def _compile_loop(self, node):
+        start = self._here()
+        self._compile_body(node.lhs)
+        self._emit(Op.JUMP, start)
+
+    def _compile_match(self, node):
+        # 対象の値は隠しスロットに退避し、各アームのパターンと == で比較する
+        subject = node.slot
+        self._compile_expr(node.lhs)
+        self._emit(Op.STORE_LOCAL, subject)
+
+        jumps_to_end = []
+        for arm in node.rhs:
+            jump_to_next = None
+            if not Resolver.is_wildcard(arm.lhs):
+                self._emit(Op.LOAD_LOCAL, subject)
+                self._compile_expr(arm.lhs)
+                self._emit(Op.EQ)
+                jump_to_next = self._emit(Op.JUMP_IF_FALSE)
+            self._compile_node(arm.rhs)
+            jumps_to_end.append(self._emit(Op.JUMP))
+            if jump_to_next is not None:
+                self._patch(jump_to_next, self._here())
+
+        for position in jumps_to_end:
+            self._patch(position, self._here())
+
+    # === expressions ===
+    def _compile_num(self, node):
+        self._emit(Op.LOAD_CONST, self._const(int(node.lhs)))
+
+    def _compile_float(self, node):
+        self._emit(Op.LOAD_CONST, self._const(float(node.lhs)))
+
+    def _compile_str(self, node):
+        self._emit(Op.LOAD_CONST, self._const(str(node.lhs).strip('"')))
+
+    def _compile_bool(self, node):
+        self._emit(Op.LOAD_CONST, self._const(str(node.lhs) == "true"))
+
+    def _compile_id(self, node):
+        self._emit(Op.LOAD_LOCAL, node.slot)
+
+    def _compile_passthrough(self, node):
+        return (node.lhs,)
+
+    def _compile_and(self, node):
+        return self._compile_short_circuit(node, Op.JUMP_IF_FALSE_OR_POP)
+
+    def _compile_or(self, node):
+        return self._compile_short_circuit(node, Op.JUMP_IF_TRUE_OR_POP)
+
+    def _compile_short_circuit(self, node, op):
+        # lhs の後にジャンプを出し、rhs の後でその飛び先を埋める
+        jump_to_end = []
+        return (
+            node.lhs,
+            lambda: jump_to_end.append(self._emit(op)),
+            node.rhs,
+            lambda: self._patch(jump_to_end[0], self._here()),
+        )
+
+    def _compile_function_call(self, node):
+        function_name = self._name_of(node.lhs)
+        return Resolver.call_arguments(node) + [partial(self._emit, Op.CALL, self.program.function_index[function_name])]
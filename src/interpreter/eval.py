@@ -1,9 +1,12 @@
-from ..ast.node import Node
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set
+from ..ast.node import Node, Kind
+from ..ast.traversal import Traversal
+from ..parser.parse_cache import encode_ast, decode_ast
 from .memory import Memory
+from .resolver import Resolver
 from dataclasses import dataclass
 
-m = {}
-
 @dataclass
 class Types:
     NUM = "number"
@@ -13,13 +16,122 @@ class Types:
     ID = "identifier"
     VOID = "void"
 
+
+# 実行時に数値になる型（NUM は Python の int、FLOAT は float）
+NUMERIC_TYPES = (Types.NUM, Types.FLOAT)
+
+COMPARISON_KINDS = (Kind.EQ_EXPR, Kind.NE_EXPR, Kind.LT_EXPR, Kind.GT_EXPR, Kind.LE_EXPR, Kind.GE_EXPR)
+BINARY_INFER_KINDS = frozenset((Kind.ADD_EXPR, Kind.SUB_EXPR, Kind.MUL_EXPR, Kind.DIV_EXPR, Kind.AND_EXPR, Kind.OR_EXPR) + COMPARISON_KINDS)
+LITERAL_TYPES = {
+    Kind.NUM: Types.NUM,
+    Kind.FLOAT: Types.FLOAT,
+    Kind.STR: Types.STR,
+    Kind.BOOL: Types.BOOL,
+}
+
+
+def _check_function_worker(signatures, data):
+    """プロセスプール上で関数 1 つの本体を検査する。AST は encode_ast で直列化して受け取る"""
+    evaluator = Eval(None, verbose=False)
+    ok = evaluator.check_function(decode_ast(data), signatures)
+    return ok, evaluator.errors
+
+
 class Eval:
-    def __init__(self, root: Node):
+    def __init__(self, root: Node, verbose: bool = True):
         self.root = root
+        self.verbose = verbose
+        # 関数名 → 戻り値の型。本体の検査の前に collect_signatures で集める
+        self.signatures: Dict[str, str] = {}
+        # 名前 → 型。関数のシグネチャと検査中の関数の変数を持つ（インスタンスごとの状態）
+        self.m: Dict[str, str] = {}
+        # 見つかった型の不一致（関数の定義順）
+        self.errors: List[str] = []
+        # 関数名 → 本体の検査に通ったか
+        self.results: Dict[str, bool] = {}
+        # 式ノード → 実行時の値の型（infer_types で作る。インタープリターの特殊化に使う）
+        self.types: Dict[Node, str] = {}
+        # 検査中に呼ばれた、シグネチャの分からない関数の名前
+        self.undefined_calls: Set[str] = set()
+        # ストリーム処理で、まだ届いていない関数を呼んでいた関数（encode_ast で保存）。終わりで検査し直す
+        self.__deferred: List[bytes] = []
+        self.__now_function_name = None
         self.__now_function_type = None
 
+        # ノード種別のタグから評価メソッドを引くテーブル
+        self.handlers = {
+            Kind.TOP_LEVEL: self._evaluate_top_level,
+            Kind.FUNCTION: self._evaluate_function,
+            Kind.STATEMENT: self._evaluate_statement,
+            Kind.PRIMITIVE_TYPE: self._evaluate_primitive_type,
+            Kind.ARRAY_TYPE: self._evaluate_array_type,
+            Kind.NUM: self._evaluate_num,
+            Kind.FLOAT: self._evaluate_float,
+            Kind.ID: self._evaluate_id,
+            Kind.STR: self._evaluate_str,
+            Kind.BOOL: self._evaluate_bool,
+            Kind.EXPR: self._evaluate_expr,
+            Kind.LET: self._evaluate_let,
+            Kind.IF: self._evaluate_if,
+            Kind.IF_ELSE: self._evaluate_if_else,
+            Kind.WHILE: self._evaluate_while,
+            Kind.LOOP: self._evaluate_loop,
+            Kind.MATCH: self._evaluate_match,
+            Kind.RETURN: self._evaluate_return,
+        }
+        # 演算子は子の評価結果を受け取る（子は Traversal が明示的なスタックで先に評価する）
+        self.binary_handlers = {
+            Kind.ADD_EXPR: self._evaluate_arithmetic,
+            Kind.SUB_EXPR: self._evaluate_arithmetic,
+            Kind.MUL_EXPR: self._evaluate_arithmetic,
+            Kind.DIV_EXPR: self._evaluate_arithmetic,
+            Kind.EQ_EXPR: self._evaluate_comparison,
+            Kind.NE_EXPR: self._evaluate_comparison,
+            Kind.LT_EXPR: self._evaluate_comparison,
+            Kind.GT_EXPR: self._evaluate_comparison,
+            Kind.LE_EXPR: self._evaluate_comparison,
+            Kind.GE_EXPR: self._evaluate_comparison,
+            Kind.AND_EXPR: self._evaluate_logical,
+            Kind.OR_EXPR: self._evaluate_logical,
+        }
+        self.unary_handlers = {
+            Kind.NEG_EXPR: self._evaluate_neg_expr,
+            Kind.NOT_EXPR: self._evaluate_not_expr,
+        }
+        self.call_handlers = {
+            Kind.FUNCTION_CALL: (lambda node: [node.lhs] + Resolver.call_arguments(node), self._evaluate_function_call),
+        }
+        self.traversal = Traversal(self.handlers, self._unknown_node, self.binary_handlers, self.unary_handlers, self.call_handlers)
+
+        # infer_types 用。包みのノード（FACTOR など）にも型を記録するので、子への置き換えはしない
+        literal_handlers = dict.fromkeys(LITERAL_TYPES, self._infer_literal)
+        literal_handlers[Kind.ID] = self._infer_id
+        wrapper = (lambda node: (node.lhs,) if node.rhs is None else (), self._infer_wrapper)
+        self.infer_traversal = Traversal(
+            literal_handlers,
+            lambda node: None,
+            dict.fromkeys(BINARY_INFER_KINDS, self._infer_binary_node),
+            {Kind.FACTOR: self._infer_wrapper, Kind.NEG_EXPR: self._infer_neg, Kind.NOT_EXPR: self._infer_not},
+            {Kind.EXPR: wrapper, Kind.UNARY_EXPR: wrapper,
+             Kind.FUNCTION_CALL: (Resolver.call_arguments, self._infer_call)},
+            passthrough=frozenset(),
+        )
+        # _infer_expr の実行中の変数の型・記録先・代入前に読まれた変数
+        self.__infer_variables = None
+        self.__infer_types = None
+        self.__infer_unbound = None
+
     def type_error(self, value, type1, type2):
-        print(f"変数{value}で型{type1}と型{type2}の不一致が発生")
+        self.report(f"変数{value}で型{type1}と型{type2}の不一致が発生")
+
+    def report(self, message):
+        self.errors.append(message)
+        if self.verbose:
+            print(message)
+
+    def log(self, message):
+        if self.verbose:
+            print(message)
 
     def evaluate(self, node: Node=None):
         # 引数がない場合はルートノードを使用
@@ -27,152 +139,455 @@ class Eval:
             node = self.root
 
         if type(node) != Node:
-            print("うまくパースできていません")
+            self.log("うまくパースできていません")
             return False
 
-        if node.get_kind() == "TOP_LEVEL":
-            for child in node.get_lhs():
-                self.evaluate(child)
-
-        elif node.get_kind() == "FUNCTION":
-            # 関数ノードの場合、関数名とその中身を評価
-            self.__now_function_name = self.evaluate(node.get_lhs())[0]
-            self.__now_function_type = self.evaluate(node.get_type())
-            m[self.__now_function_name] = self.__now_function_type
-            if self.__now_function_name == "main":
-                for stmt in node.get_rhs():
-                    self.evaluate(stmt)
-
-        elif node.get_kind() == "STATEMENT":
-            r = self.evaluate(node.get_lhs())
-            if type(r) != bool and r[0] == TypeError:
-                print(f"変数{r[1]}で型{r[2][0]}と型{r[2][1]}の不一致が発生")
-                return False
-            return r
-
-        elif node.get_kind() == "PRIMITIVE_TYPE":
-            type_annotation = node.get_lhs()
-            if type_annotation == "i32":
-                return (Types.NUM)
-            elif type_annotation == "f64":
-                return (Types.FLOAT)
-            elif type_annotation == "bool":
-                return (Types.BOOL)
-            elif type_annotation == "String":
-                return (Types.STR)
-            elif type_annotation == "char":
-                return (Types.STR)
-            elif type_annotation == "()":
-                return (Types.VOID)
-            elif type_annotation.startswith("[") and type_annotation.endswith("]"):
-                inner_type = type_annotation[1:-1]
-                return (f"[{inner_type}]")
-            else:
-                raise ValueError(f"Unknown type annotation: {type_annotation}")
-
-        elif node.get_kind() == "NUM":
-            return (int(node.get_lhs()), Types.NUM)
-
-        elif node.get_kind() == "FLOAT":
-            return (float(node.get_lhs()), Types.FLOAT)
-
-        elif node.get_kind() == "ID":
-            return (str(node.get_lhs()), Types.ID)  # 変数名を返す
-
-        elif node.get_kind() == "STR":
-            return (str(node.get_lhs()), Types.STR)
-
-        elif node.get_kind() == "BOOL":
-            return (node.get_lhs(), Types.BOOL)
-
-        elif node.get_kind() == "EXPR":
-            lhs = self.evaluate(node.get_lhs())
-            rhs = self.evaluate(node.get_rhs())
-            if node.get_rhs() is not None:
-                operator = node.get_rhs().get_kind()
-                if operator == "+":
-                    return lhs + rhs
-                elif operator == "-":
-                    return lhs - rhs
-                elif operator == "*":
-                    return lhs * rhs
-                elif operator == "/":
-                    return lhs // rhs if rhs != 0 else 0  # 整数除算
-                elif operator == "%":
-                    return lhs % rhs
+        return self.traversal.evaluate(node)
+
+    def _unknown_node(self, node):
+        raise ValueError(f"Unknown node kind: {node.get_kind()}")
+
+    def evaluate_functions(self, functions):
+        """届いた FUNCTION ノードを順に検査し、そのまま次の段へ渡す。
+
+        後で定義される関数を呼ぶ関数は、ストリームの終わりで全シグネチャがそろってから検査する。
+        """
+        for function in functions:
+            self.evaluate(function)
+            yield function
+        self.check_deferred()
+
+    def check_deferred(self) -> bool:
+        """ストリームの途中で未知の関数を呼んでいた関数を、届いたすべてのシグネチャで検査し直す"""
+        ok = True
+        for data in self.__deferred:
+            function = decode_ast(data)
+            evaluator = Eval(None, verbose=False)
+            function_ok = evaluator.check_function(function, self.signatures)
+            self.results[str(function.get_lhs().get_lhs())] = function_ok
+            for message in evaluator.errors:
+                self.report(message)
+            ok = ok and function_ok
+        self.__deferred = []
+        return ok
+
+    def check(self, root: Node = None, workers: Optional[int] = None) -> bool:
+        """全関数のシグネチャを集めてから、関数ごとに本体を検査する。
+
+        workers が 2 以上なら本体の検査をプロセスプールに振り分ける。結果は関数の定義順に
+        まとめるので、並列でも逐次でも errors / results は同じになる。
+        """
+        root = root if root is not None else self.root
+        functions = root.get_lhs() if root.tag == Kind.TOP_LEVEL else [root]
+        signatures = self.collect_signatures(functions)
+
+        if workers is not None and workers > 1 and len(functions) > 1:
+            data = [encode_ast(function) for function in functions]
+            chunksize = max(1, len(functions) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                outcomes = list(pool.map(_check_function_worker, [signatures] * len(functions), data, chunksize=chunksize))
+        else:
+            outcomes = []
+            for function in functions:
+                evaluator = Eval(None, verbose=False)
+                outcomes.append((evaluator.check_function(function, signatures), evaluator.errors))
+
+        for function, (ok, errors) in zip(functions, outcomes):
+            self.results[str(function.get_lhs().get_lhs())] = ok
+            for message in errors:
+                self.report(message)
+        return all(ok for ok, _ in outcomes)
+
+    def collect_signatures(self, functions) -> Dict[str, str]:
+        """1 パス目: 関数名と戻り値の型だけを集める（前方参照できるように本体より先に行う）"""
+        for function in functions:
+            name = str(function.get_lhs().get_lhs())
+            self.signatures[name] = self._return_type(function)
+        self.m.update(self.signatures)
+        return dict(self.signatures)
+
+    def check_function(self, node: Node, signatures: Dict[str, str] = None) -> bool:
+        """2 パス目: 関数 1 つの本体を検査する。変数の型は関数ごとに作り直す"""
+        if signatures is not None:
+            self.signatures.update(signatures)
+        self.m = dict(self.signatures)
+        self.__now_function_name = str(node.get_lhs().get_lhs())
+        self.__now_function_type = self._return_type(node)
+
+        params = node.get_params()
+        if params is not None:
+            for param in params.get_lhs():
+                self.m[str(param.get_lhs().get_lhs())] = self.evaluate(param.get_rhs())
+
+        ok = True
+        for stmt in node.get_rhs() or []:
+            if self.evaluate(stmt) is False:
+                ok = False
+        return ok
+
+    def infer_types(self, root: Node = None) -> Dict[Node, str]:
+        """式ノードごとに、実行時の値の型を self.types に記録して返す。
+
+        検査（check）とは別に、実行時の規則（/ は真の除算で float になる）で型を決める。
+        引数・関数の戻り値と、関数内で異なる型を代入される変数は型不明として記録しない。
+        最適化で木を書き換えた場合は、書き換えた後の木に対して呼ぶ。
+        """
+        root = root if root is not None else self.root
+        functions = root.get_lhs() if root.tag == Kind.TOP_LEVEL else [root]
+        for function in functions:
+            self._infer_function(function)
+        return self.types
+
+    def _infer_function(self, function: Node) -> None:
+        # 値を持つ式（let の右辺・条件・match の対象・return の値・式文）を出現順に並べる
+        roots = []
+        self._collect_expressions(function.get_rhs() or [], roots)
+
+        # 変数名 → 型。None は型不明（引数や、異なる型が代入される変数）
+        variables = {str(name): None for name in self._param_names(function)}
+        # 代入より前に読まれた変数（ループで後ろの let が前の式に届く場合など）
+        unbound = set()
+        # 変数の型が変わらなくなるまで繰り返す。直線的なコードなら 1 回で済む
+        while True:
+            types = {}
+            changed = False
+            for let, expr in roots:
+                value_type = self._infer_expr(expr, variables, types, unbound)
+                if let is None:
+                    continue
+                name = str(let.get_lhs().get_lhs())
+                if name not in variables:
+                    variables[name] = value_type
+                    # 既に型不明として読まれていれば、読んだ式をやり直す
+                    changed = changed or name in unbound
+                elif variables[name] is not None and variables[name] != value_type:
+                    variables[name] = None
+                    changed = True
+            if not changed:
+                self.types.update(types)
+                return
+
+    def _collect_expressions(self, statements, roots) -> None:
+        for node in statements:
+            if node.tag == Kind.STATEMENT:
+                node = node.get_lhs()
+            kind = node.tag
+            if kind == Kind.LET:
+                roots.append((node, node.get_rhs()))
+            elif kind in (Kind.IF, Kind.WHILE):
+                roots.append((None, node.get_lhs()))
+                self._collect_expressions(node.get_rhs(), roots)
+            elif kind == Kind.IF_ELSE:
+                self._collect_expressions([node.get_lhs()], roots)
+                self._collect_expressions(node.get_rhs(), roots)
+            elif kind == Kind.LOOP:
+                self._collect_expressions(node.get_lhs(), roots)
+            elif kind == Kind.MATCH:
+                roots.append((None, node.get_lhs()))
+                for arm in node.get_rhs():
+                    roots.append((None, arm.get_lhs()))
+                    self._collect_expressions([arm.get_rhs()], roots)
+            elif kind == Kind.RETURN:
+                if node.get_lhs() is not None:
+                    roots.append((None, node.get_lhs()))
             else:
-                print(f"Evaluating expression: {lhs}")
-            return lhs
-
-        elif node.get_kind() == "FACTOR":
-            return self.evaluate(node.get_lhs())  # 再帰的に評価
-
-        elif node.get_kind() == "FUNCTION_CALL":
-            function_name = self.evaluate(node.get_lhs())
-            arguments = self.evaluate(node.get_rhs())
-            print(f"Evaluating function call: {function_name} with arguments {arguments}")
-            if function_name[0] in m:
-                function_type = m[function_name[0]]
-                if function_type == Types.VOID:
-                    return True
-                else:
-                    return (function_name[0], function_type)
+                # 式文
+                roots.append((None, node))
+
+    @staticmethod
+    def _param_names(function: Node) -> List[str]:
+        params = function.get_params()
+        return [] if params is None else [param.get_lhs().get_lhs() for param in params.get_lhs()]
+
+    def _infer_expr(self, node, variables, types, unbound) -> Optional[str]:
+        """式の実行時の型。types が渡されれば部分式の型も記録する"""
+        self.__infer_variables = variables
+        self.__infer_types = types
+        self.__infer_unbound = unbound
+        return self.infer_traversal.evaluate(node)
+
+    def _record(self, node, result) -> Optional[str]:
+        types = self.__infer_types
+        if types is not None and result is not None:
+            types[node] = result
+        return result
+
+    def _infer_literal(self, node):
+        result = LITERAL_TYPES[node.tag]
+        if self.__infer_types is not None:
+            self.__infer_types[node] = result
+        return result
+
+    def _infer_id(self, node):
+        variables = self.__infer_variables
+        name = str(node.lhs)
+        if name not in variables:
+            self.__infer_unbound.add(name)
+        return self._record(node, variables.get(name))
+
+    def _infer_wrapper(self, node, operand=None):
+        if operand is not None and self.__infer_types is not None:
+            self.__infer_types[node] = operand
+        return operand
+
+    def _infer_binary_node(self, node, lhs, rhs):
+        return self._record(node, self._infer_binary(node.tag, lhs, rhs))
+
+    def _infer_neg(self, node, operand):
+        return self._record(node, operand if operand in NUMERIC_TYPES else None)
+
+    def _infer_not(self, node, operand):
+        return self._record(node, Types.BOOL)
+
+    def _infer_call(self, node, *arguments):
+        # 関数呼び出しの戻り値の型の注釈は実行時の値を保証しない
+        return None
+
+    @staticmethod
+    def _infer_binary(kind, lhs, rhs) -> Optional[str]:
+        if lhs is None or rhs is None:
+            return None
+        if kind in (Kind.AND_EXPR, Kind.OR_EXPR):
+            return Types.BOOL if lhs == rhs == Types.BOOL else None
+        if kind in COMPARISON_KINDS:
+            return Types.BOOL if lhs == rhs or (lhs in NUMERIC_TYPES and rhs in NUMERIC_TYPES) else None
+        if lhs not in NUMERIC_TYPES or rhs not in NUMERIC_TYPES:
+            return Types.STR if kind == Kind.ADD_EXPR and lhs == rhs == Types.STR else None
+        if kind == Kind.DIV_EXPR:
+            return Types.FLOAT
+        return Types.NUM if lhs == rhs == Types.NUM else Types.FLOAT
+
+    def _return_type(self, function):
+        # 戻り値の型の注釈がない関数は () を返す
+        if function.get_type() is None:
+            return Types.VOID
+        return self.evaluate(function.get_type())
+
+    def _type_of(self, result):
+        """評価結果の型。変数は m から引く。型の不一致や未定義なら None"""
+        if not isinstance(result, tuple) or result[0] is TypeError:
+            return None
+        if result[1] == Types.ID:
+            return self.m.get(result[0])
+        return result[1]
+
+    def _evaluate_top_level(self, node):
+        return self.check(node)
+
+    def _evaluate_function(self, node):
+        # 関数ノードを単独で評価する場合（ストリーム処理）は、届いた順にシグネチャを登録して本体を検査する
+        name = str(node.get_lhs().get_lhs())
+        self.signatures[name] = self._return_type(node)
+        evaluator = Eval(None, verbose=False)
+        ok = evaluator.check_function(node, self.signatures)
+        if evaluator.undefined_calls:
+            # 後で届く関数かもしれない。後の段が木を書き換える前の形を保存し、check_deferred で検査する
+            self.__deferred.append(encode_ast(node))
+            return True
+        self.results[name] = ok
+        for message in evaluator.errors:
+            self.report(message)
+        return ok
+
+    def _evaluate_statement(self, node):
+        r = self.evaluate(node.get_lhs())
+        if isinstance(r, tuple) and r[0] == TypeError:
+            if isinstance(r[2], tuple):
+                self.report(f"変数{r[1]}で型{r[2][0]}と型{r[2][1]}の不一致が発生")
             else:
-                print(f"関数{function_name}は定義されていません")
-                return False
+                self.report(f"式で型{r[1]}と型{r[2]}の不一致が発生")
+            return False
+        return r
 
-        elif node.get_kind() == "ADD_EXPR":
-            lhs = self.evaluate(node.get_lhs())
-            rhs = self.evaluate(node.get_rhs())
-            return lhs + rhs
+    def _evaluate_primitive_type(self, node):
+        type_annotation = node.get_lhs()
+        if type_annotation == "i32":
+            return (Types.NUM)
+        elif type_annotation == "f64":
+            return (Types.FLOAT)
+        elif type_annotation == "bool":
+            return (Types.BOOL)
+        elif type_annotation == "String":
+            return (Types.STR)
+        elif type_annotation == "char":
+            return (Types.STR)
+        elif type_annotation == "()":
+            return (Types.VOID)
+        elif type_annotation.startswith("[") and type_annotation.endswith("]"):
+            inner_type = type_annotation[1:-1]
+            return (f"[{inner_type}]")
+        else:
+            raise ValueError(f"Unknown type annotation: {type_annotation}")
+
+    def _evaluate_array_type(self, node):
+        return f"[{self.evaluate(node.get_lhs())}]"
+
+    def _evaluate_num(self, node):
+        return (int(node.get_lhs()), Types.NUM)
 
-        elif node.get_kind() == "SUB_EXPR":
-            lhs = self.evaluate(node.get_lhs())
-            rhs = self.evaluate(node.get_rhs())
-            return lhs - rhs
+    def _evaluate_float(self, node):
+        return (float(node.get_lhs()), Types.FLOAT)
 
-        elif node.get_kind() == "MUL_EXPR":
-            lhs = self.evaluate(node.get_lhs())
-            rhs = self.evaluate(node.get_rhs())
-            return lhs * rhs
+    def _evaluate_id(self, node):
+        return (str(node.get_lhs()), Types.ID)  # 変数名を返す
 
-        elif node.get_kind() == "LET":
-            # 変数定義ノードの場合、変数をメモリに保存
-            variable_name = self.evaluate(node.get_lhs())
-            variable_value = self.evaluate(node.get_rhs())
+    def _evaluate_str(self, node):
+        return (str(node.get_lhs()), Types.STR)
 
-            if variable_value[0] == TypeError:
-                return(variable_value[0], variable_name[0], (variable_value[1], variable_value[2]))
+    def _evaluate_bool(self, node):
+        return (node.get_lhs(), Types.BOOL)
+
+    def _evaluate_expr(self, node):
+        lhs = self.evaluate(node.get_lhs())
+        rhs = self.evaluate(node.get_rhs())
+        if node.get_rhs() is not None:
+            operator = node.get_rhs().get_kind()
+            if operator == "+":
+                return lhs + rhs
+            elif operator == "-":
+                return lhs - rhs
+            elif operator == "*":
+                return lhs * rhs
+            elif operator == "/":
+                return lhs // rhs if rhs != 0 else 0  # 整数除算
+            elif operator == "%":
+                return lhs % rhs
+        else:
+            self.log(f"Evaluating expression: {lhs}")
+        return lhs
 
-            elif variable_value[0] in m:
-                m[variable_name[0]] = m[variable_value[0]]
+    def _evaluate_function_call(self, node, function_name, *arguments):
+        # 関数名の ID と引数は評価済みの結果で受け取る
+        self.log(f"Evaluating function call: {function_name} with arguments {arguments}")
+        if function_name[0] in self.m:
+            function_type = self.m[function_name[0]]
+            if function_type == Types.VOID:
+                return True
             else:
-                m[variable_name[0]] = variable_value[1]
+                return (function_name[0], function_type)
+        else:
+            self.undefined_calls.add(function_name[0])
+            self.report(f"関数{function_name[0]}は定義されていません")
+            return False
+
+    def _evaluate_operands(self, lhs, rhs):
+        """二項演算の両辺の評価結果から型を返す。不一致なら (TypeError, 左の型, 右の型)"""
+        for operand in (lhs, rhs):
+            if isinstance(operand, tuple) and operand[0] is TypeError:
+                return operand
+        lhs_type = self._type_of(lhs)
+        rhs_type = self._type_of(rhs)
+        if lhs_type is not None and rhs_type is not None and lhs_type != rhs_type:
+            return (TypeError, lhs_type, rhs_type)
+        return lhs_type or rhs_type
+
+    def _evaluate_arithmetic(self, node, lhs, rhs):
+        operand_type = self._evaluate_operands(lhs, rhs)
+        if isinstance(operand_type, tuple):
+            return operand_type
+        return (None, operand_type)
+
+    def _evaluate_comparison(self, node, lhs, rhs):
+        operand_type = self._evaluate_operands(lhs, rhs)
+        if isinstance(operand_type, tuple):
+            return operand_type
+        return (None, Types.BOOL)
+
+    def _evaluate_logical(self, node, lhs, rhs):
+        operand_type = self._evaluate_operands(lhs, rhs)
+        if isinstance(operand_type, tuple):
+            return operand_type
+        if operand_type is not None and operand_type != Types.BOOL:
+            return (TypeError, operand_type, Types.BOOL)
+        return (None, Types.BOOL)
+
+    def _evaluate_neg_expr(self, node, operand):
+        if isinstance(operand, tuple) and operand[0] is TypeError:
+            return operand
+        return (None, self._type_of(operand))
+
+    def _evaluate_not_expr(self, node, operand):
+        if isinstance(operand, tuple) and operand[0] is TypeError:
+            return operand
+        return (None, Types.BOOL)
+
+    def _evaluate_let(self, node):
+        # 変数定義ノードの場合、変数の型を記録
+        variable_name = self.evaluate(node.get_lhs())
+        variable_value = self.evaluate(node.get_rhs())
+
+        if not isinstance(variable_value, tuple):
+            # 未定義の関数の呼び出しなど（報告済み）
             return variable_value
 
-        elif node.get_kind() == "IF":
-            if_condition = self.evaluate(node.get_lhs())
-            print(f"Evaluating IF statement: {if_condition}")
-            if_body = self.evaluate(node.get_rhs())
+        if variable_value[0] == TypeError:
+            return(variable_value[0], variable_name[0], (variable_value[1], variable_value[2]))
+
+        value_type = self._type_of(variable_value)
+        if node.get_type() is not None:
+            annotated_type = self.evaluate(node.get_type())
+            if value_type is not None and value_type != annotated_type:
+                return (TypeError, variable_name[0], (annotated_type, value_type))
+            value_type = annotated_type
+        self.m[variable_name[0]] = value_type
+        return variable_value
 
-        elif node.get_kind() == "WHILE":
-            while_condition = self.evaluate(node.get_lhs())
-            print(f"Evaluating WHILE statement: {while_condition}")
-            while_body = self.evaluate(node.get_rhs())
+    def _evaluate_block(self, statements):
+        ok = True
+        for stmt in statements:
+            if self.evaluate(stmt) is False:
+                ok = False
+        return ok
+
+    def _evaluate_condition(self, node):
+        condition = self.evaluate(node)
+        if isinstance(condition, tuple) and condition[0] is TypeError:
+            self.report(f"式で型{condition[1]}と型{condition[2]}の不一致が発生")
+            return False
+        return True
 
-        elif node.get_kind() == "LOOP":
-            print("Evaluating LOOP")
-            loop_body =  self.evaluate(node.get_lhs())
+    def _evaluate_if(self, node):
+        if_condition = self._evaluate_condition(node.get_lhs())
+        self.log(f"Evaluating IF statement: {if_condition}")
+        return self._evaluate_block(node.get_rhs()) and if_condition
 
-        elif node.get_kind() == "RETURN":
+    def _evaluate_if_else(self, node):
+        if_ok = self._evaluate_if(node.get_lhs())
+        return self._evaluate_block(node.get_rhs()) and if_ok
+
+    def _evaluate_while(self, node):
+        while_condition = self._evaluate_condition(node.get_lhs())
+        self.log(f"Evaluating WHILE statement: {while_condition}")
+        return self._evaluate_block(node.get_rhs()) and while_condition
+
+    def _evaluate_loop(self, node):
+        self.log("Evaluating LOOP")
+        return self._evaluate_block(node.get_lhs())
+
+    def _evaluate_match(self, node):
+        ok = self._evaluate_condition(node.get_lhs())
+        for arm in node.get_rhs():
+            if self.evaluate(arm.get_rhs()) is False:
+                ok = False
+        return ok
+
+    def _evaluate_return(self, node):
+        if node.get_lhs() is None:
+            return_type = Types.VOID
+        else:
             return_value = self.evaluate(node.get_lhs())
-            if type(return_value) == bool:
+            if return_value is False:
+                # 未定義の関数の呼び出しなど（報告済み）
                 return False
-            if m[return_value[0]] == self.__now_function_type:
-                return True
+            if return_value is True:
+                # 戻り値の型が () の関数の呼び出し
+                return_type = Types.VOID
+            elif return_value[0] is TypeError:
+                return return_value
             else:
-                print(f"関数{self.__now_function_name}は型{self.__now_function_type}にも関わらず型{m[return_value[0]]}が返されました")
-                return False
-
+                return_type = self._type_of(return_value)
+        if return_type is None or return_type == self.__now_function_type:
+            return True
         else:
-            raise ValueError(f"Unknown node kind: {node.get_kind()}")
\ No newline at end of file
+            self.report(f"関数{self.__now_function_name}は型{self.__now_function_type}にも関わらず型{return_type}が返されました")
+            return False
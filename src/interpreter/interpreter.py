@@ -1,6 +1,11 @@
-from ..ast.node import Node
-from typing import List, Optional
+import sys
+from ..ast.node import Node, Kind
+from ..ast.traversal import Traversal
 from dataclasses import dataclass
+from .memory import Frame, MAX_CALL_DEPTH, CallDepthError
+from .resolver import Resolver
+from .profiler import Profiler
+from .purity import MemoCache, MISSING, pure_functions
 
 @dataclass
 class Types:
@@ -11,293 +16,449 @@ class Types:
     VOID = "void"
 
 class Variable:
+    """名前付きの格納場所（フレームのスロット）に入る値。式の途中の値は Python の値のまま扱う"""
+    __slots__ = ("name", "value", "var_type")
+
     def __init__(self, name: str, value: any, var_type: Types):
-        self.__name = name
-        self.__value = value
-        self.__var_type = var_type
+        self.name = name
+        self.value = value
+        self.var_type = var_type
     def set_name(self, name: str):
-        self.__name = name
+        self.name = name
     def get_name(self):
-        return self.__name
+        return self.name
     def get_value(self):
-        return self.__value
+        return self.value
     def get_type(self):
-        return self.__var_type
+        return self.var_type
+
+# 実行時の値の Python の型 → 言語の型（f64 も number として扱う）
+VALUE_TYPES = {
+    int: Types.NUM,
+    float: Types.NUM,
+    bool: Types.BOOL,
+    str: Types.STR,
+}
+
+def type_of(value) -> str:
+    return VALUE_TYPES.get(type(value), Types.VOID)
+
+# Eval.infer_types の型 → 言語の型
+STATIC_TYPES = {
+    "number": Types.NUM,
+    "float": Types.NUM,
+    "boolean": Types.BOOL,
+    "string": Types.STR,
+}
+
+# 数値の型が分かっている式で使う、子をたどらずに計算するクロージャの組み立て方
+NUMERIC_OPS = {
+    Kind.ADD_EXPR: lambda lhs, rhs: lambda: lhs() + rhs(),
+    Kind.SUB_EXPR: lambda lhs, rhs: lambda: lhs() - rhs(),
+    Kind.MUL_EXPR: lambda lhs, rhs: lambda: lhs() * rhs(),
+    Kind.DIV_EXPR: lambda lhs, rhs: lambda: lhs() / rhs(),
+}
+# float に変換しても値が変わらない int の範囲
+EXACT_FLOAT_INT = 2 ** 53
+# クロージャは呼び出すと Python の再帰になるため、これより深い部分木はまとめない（上の部分は Traversal が評価する）
+MAX_CLOSURE_DEPTH = 200
+# 言語の呼び出し 1 段で使う Python のフレームの数の見積もり（呼び出しを囲む if / while / match 1 段ごとに 4 つほど増える）。
+# 実行中は max_depth 段まで呼べるよう Python の再帰の上限を引き上げる
+FRAMES_PER_CALL = 20
+RECURSION_MARGIN = 1000
 
-class Function:
-    def __init__(self, name: str, func_type: Types, args: List, body: Optional[Node], scope: Optional['VariableTable'] = None):
-        self.__name = name
-        self.__type = func_type
-        self.__args = args
-        self.__body = body
-        self.__scope = scope if scope else VariableTable()
+class Interpreter:
+    """Node 木を直接たどって実行する参照実装。
 
-    def get_name(self):
-        return self.__name
+    types に Eval.infer_types の結果を渡すと、int / float と分かっている式の部分木を
+    型ごとに特殊化したクロージャにまとめて実行し、変数の型も実行時に調べずに決める。
+    profiler に Profiler を渡すと、関数ごとの呼び出し回数と時間、ノード種別ごとの実行回数を記録する。
+    """
 
-    def get_type(self):
-        return self.__type
-
-    def get_args(self):
-        return self.__args
-
-    def get_body(self):
-        return self.__body
-
-    def get_scope(self):
-        return self.__scope
-
-class VariableTable:
-    def __init__(self):
-        # 関数名をキーにして、変数の辞書を保持
-        self.__table = {}
-
-    def set_variable(self, variable: Variable, function_name: str):
-        if function_name not in self.__table:
-            self.__table[function_name] = {}  # 新しいスコープを作成
-#        self.__table[function_name].memory[variable.get_name()] = variable
-        self.__table[function_name].memory[variable.get_name()] = variable
-
-    def get_variable(self, variable_name, function_name: str):
-        if function_name in self.__table:
-            table = self.__table[function_name]
-            if isinstance(table, Table) and variable_name in table.memory:
-                return table.memory[variable_name]
-            elif isinstance(variable_name, Variable):
-                return table.memory[variable_name.get_name()]
-        raise KeyError(f"Variable '{variable_name}' not found in function scope '{function_name}'")
-
-    def set_function(self, function: Function):
-        if function.get_name() not in self.__table:
-            self.__table[function.get_name()] = {}  # 関数スコープを初期化
-        self.__table[function.get_name()] = Table(function.get_body())  # 関数スコープを設定
-
-    def get_function_scope(self, function_name: str):
-        if function_name in self.__table:
-            return self.__table[function_name]
-        raise KeyError(f"Function scope '{function_name}' not found")
-
-    def get_function_block(self, function_name: str):
-        if function_name in self.__table:
-            return self.__table[function_name].get_body()
-        raise KeyError(f"Function block '{function_name}' not found")
-
-    def view(self):
-        for function_name, variables in self.__table.items():
-            print(f"Function Scope: {function_name}")
-            """
-            for node in variables.get_body():
-                print(f"  statement: {node.get_kind()}")
-            """
-            for var_name, variable in variables.items():
-                print(f"  Variable Name: {var_name}, Value: {variable.get_value()}, Type: {variable.get_type()}")
-
-class Table:
-    def __init__(self, body, memory=None):
-        self.body = body
-        self.memory = memory if memory else {}
-
-    def get_body(self):
-        return self.body
-
-    def items(self):
-        return self.memory.items()
-
-class Interpreter:
-    def __init__(self, root: Node):
+    def __init__(self, root: Node, max_depth: int = MAX_CALL_DEPTH, memo: MemoCache = None, types=None,
+                 profiler: Profiler = None):
         self.root = root
-        self.__memory = VariableTable()
+        self.max_depth = max_depth
+        # 変数名は実行前にスロット番号へ解決しておく
+        self.__scopes = Resolver().resolve(root)
+        # memo を渡すと、純粋な関数の結果を引数の値ごとにキャッシュする
+        self.memo = memo
+        self.__pure = pure_functions(root) if memo is not None else set()
+        self.__functions = {}
+        self.__frame = None
+        self.__call_stack = []
+        # 関数ごとの解放済みフレーム（フリーリスト）
+        self.__free_frames = {name: [] for name in self.__scopes}
         self.__now_function_type = Types.VOID
         self.__now_function_name = None
+        # return を実行したら立て、呼び出し元に戻るまで文の並びの実行を止める
+        self.__returning = False
+        self.__return_value = None
+
+        # ノード種別のタグから実行メソッドを引くテーブル
+        self.handlers = {
+            Kind.TOP_LEVEL: self._execute_top_level,
+            Kind.FUNCTION: self._execute_function,
+            Kind.STATEMENT: self._execute_statement,
+            Kind.LET: self._execute_let,
+            Kind.IF: self._execute_if,
+            Kind.IF_ELSE: self._execute_if_else,
+            Kind.WHILE: self._execute_while,
+            Kind.LOOP: self._execute_loop,
+            Kind.MATCH: self._execute_match,
+            Kind.RETURN: self._execute_return,
+            # && と || は左辺の値で右辺を評価するか決めるので、子を自分で評価する
+            Kind.AND_EXPR: self._execute_and_expr,
+            Kind.OR_EXPR: self._execute_or_expr,
+            Kind.EXPR: self._execute_expr,
+            Kind.NUM: self._execute_num,
+            Kind.FLOAT: self._execute_float,
+            Kind.ARG_LIST: self._execute_arg_list,
+            Kind.ID: self._execute_id,
+            Kind.STR: self._execute_str,
+            Kind.BOOL: self._execute_bool,
+            Kind.PRIMITIVE_TYPE: self._execute_primitive_type,
+        }
+        # 演算子は子の値を受け取る（子は Traversal が明示的なスタックで先に評価する）
+        self.binary_handlers = {
+            Kind.ADD_EXPR: self._execute_add_expr,
+            Kind.SUB_EXPR: self._execute_sub_expr,
+            Kind.MUL_EXPR: self._execute_mul_expr,
+            Kind.DIV_EXPR: self._execute_div_expr,
+            Kind.EQ_EXPR: self._execute_eq_expr,
+            Kind.NE_EXPR: self._execute_ne_expr,
+            Kind.LT_EXPR: self._execute_lt_expr,
+            Kind.GT_EXPR: self._execute_gt_expr,
+            Kind.LE_EXPR: self._execute_le_expr,
+            Kind.GE_EXPR: self._execute_ge_expr,
+        }
+        self.unary_handlers = {
+            Kind.NEG_EXPR: self._execute_neg_expr,
+            Kind.NOT_EXPR: self._execute_not_expr,
+        }
+        self.call_handlers = {
+            Kind.FUNCTION_CALL: (Resolver.call_arguments, self._execute_function_call),
+        }
+
+        self.__types = types or {}
+        self.__specialized = {}
+        self.__closure_depths = {}
+        if types:
+            for node, node_type in types.items():
+                self._specialize(node, node_type)
+        closures = {node: closure for node, closure in self.__specialized.items() if closure}
+        self.profiler = profiler
+        if profiler is not None:
+            self._instrument(profiler, closures)
+        self.traversal = Traversal(self.handlers, self._unknown_node, self.binary_handlers, self.unary_handlers,
+                                   self.call_handlers, closures)
+
+    def _instrument(self, profiler, closures):
+        """実行関数の表を profiler の計測用の関数で包む（profiler を渡さなければ表はそのまま）"""
+        for table in (self.handlers, self.binary_handlers, self.unary_handlers):
+            for kind, function in table.items():
+                table[kind] = profiler.counted(kind, function)
+        for node, closure in closures.items():
+            closures[node] = profiler.counted(node.tag, closure)
+        for kind, (operands, combine) in self.call_handlers.items():
+            self.call_handlers[kind] = (operands, profiler.counted(kind, profiler.timed(self._callee_name, combine)))
+
+        # main は呼び出しではなく定義の実行で始まるので、main の定義の実行を main の呼び出しとして計る
+        execute_function = self.handlers[Kind.FUNCTION]
+        execute_main = profiler.timed(self._callee_name, execute_function)
+        self.handlers[Kind.FUNCTION] = lambda node: (execute_main if self._callee_name(node) == "main" else execute_function)(node)
+
+    @staticmethod
+    def _callee_name(node):
+        return str(node.lhs.lhs)
+
+    def _specialize(self, node, node_type):
+        """型が int / float の式をクロージャにする。数値以外を含む部分木は None"""
+        if node in self.__specialized:
+            return self.__specialized[node]
+        closure = None
+        depth = 1
+        if node_type in ("number", "float"):
+            kind = node.tag
+            if kind in (Kind.NUM, Kind.FLOAT):
+                value = int(node.lhs) if kind == Kind.NUM else float(node.lhs)
+                closure = lambda: value
+            elif kind == Kind.ID and node.slot is not None:
+                slot = node.slot
+                closure = lambda: self.__frame.values[slot].value
+            elif kind == Kind.FACTOR:
+                closure = self._specialize(node.lhs, node_type)
+                depth = self.__closure_depths.get(node.lhs, 1)
+            elif kind == Kind.NEG_EXPR:
+                operand = self._specialize(node.lhs, node_type)
+                if operand is not None:
+                    closure = lambda: -operand()
+                    depth = self.__closure_depths[node.lhs] + 1
+            elif kind in NUMERIC_OPS:
+                lhs = self._specialize_operand(node.lhs, node_type)
+                rhs = self._specialize_operand(node.rhs, node_type)
+                if lhs is not None and rhs is not None:
+                    closure = NUMERIC_OPS[kind](lhs, rhs)
+                    depth = max(self.__closure_depths.get(node.lhs, 1), self.__closure_depths.get(node.rhs, 1)) + 1
+        if depth > MAX_CLOSURE_DEPTH:
+            closure = None
+        self.__specialized[node] = closure
+        self.__closure_depths[node] = depth
+        return closure
+
+    def _specialize_operand(self, node, parent_type):
+        operand_type = self.__types.get(node)
+        if parent_type == "float" and operand_type == "number":
+            # float の演算に混ざる int の定数は、先に float にしておく（毎回の変換を省く）
+            literal = Resolver.unwrap(node)
+            if literal.tag == Kind.NUM and abs(int(literal.lhs)) <= EXACT_FLOAT_INT:
+                value = float(int(literal.lhs))
+                return lambda: value
+        return self._specialize(node, operand_type)
 
     def execute(self, node: Node=None):
         # 引数がない場合はルートノードを使用
         if node is None:
             node = self.root
-
-        if node.get_kind() == "TOP_LEVEL":
+        return self.traversal.evaluate(node)
+
+    def _unknown_node(self, node):
+        raise ValueError(f"Unknown node kind: {node.get_kind()}")
+
+    def _execute_top_level(self, node):
+        main_frame = None
+        # 定義より前の位置からも呼べるよう、実行の前に全関数を登録しておく
+        for child in node.get_lhs():
+            if child.tag == Kind.FUNCTION:
+                self.__functions[str(child.get_lhs().get_lhs())] = child
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, self.max_depth * FRAMES_PER_CALL + RECURSION_MARGIN))
+        try:
             for child in node.get_lhs():
-                self.execute(child)
-            return self.__memory
-
-        elif node.get_kind() == "FUNCTION":
-            # 関数ノードの場合、関数名とその中身を評価
-            self.__now_function_name = self.execute(node.get_lhs())
-            if node.get_type() is not None:
-                self.__now_function_type =self.execute(node.get_type())
-            self.__memory.set_function(Function(self.__now_function_name, self.__now_function_type, [], node.get_rhs()))
-            if self.__now_function_name[0] == "main":
-                for stmt in node.get_rhs():
-                    self.execute(stmt)
-
-        elif node.get_kind() == "STATEMENT":
-            r = self.execute(node.get_lhs())
-            if type(r) == tuple and r[0] == TypeError:
-                print(f"変数{r[1]}で型{r[2][0]}と型{r[2][1]}の不一致が発生")
-            return r
-
-        elif node.get_kind() == "LET":
-            # 変数定義ノードの場合、変数をメモリに保存
-            variable_name = self.execute(node.get_lhs())
-            variable_value = self.execute(node.get_rhs())
-                
-            if type(variable_name) == tuple:
-                pass
-            elif type(variable_name) == Variable:
-                variable_name = variable_name.get_name()
-
-            if type(variable_value) == tuple:
-                variable_value = Variable(variable_name, variable_value[0], variable_value[1])
-            elif type(variable_value) == Variable:
-                variable_value.set_name(variable_name)
-                print(f"変数{variable_value.get_name()}は関数{self.__now_function_name}内で宣言され値は{variable_value.get_value()}、型は{variable_value.get_type()}です")
-            else:
-                pass
-            
-            self.__memory.set_variable(variable_value, self.__now_function_name)
-
-            return variable_value
-
-        elif node.get_kind() == "IF":
-            if_condition = self.execute(node.get_lhs())
-            print(f"Evaluating IF statement: {if_condition}")
-            if_body = self.execute(node.get_rhs())
-
-        elif node.get_kind() == "WHILE":
-            while_condition = self.execute(node.get_lhs())
-            print(f"Evaluating WHILE statement: {while_condition}")
-            while_body = self.execute(node.get_rhs())
-
-        elif node.get_kind() == "LOOP":
-            print("Evaluating LOOP")
-            loop_body =  self.execute(node.get_lhs())
-
-        elif node.get_kind() == "RETURN":
-            r = self.execute(node.get_lhs())
-
-            if type(r) == Variable:
-                pass
-                # print(f"変数{r.get_name()}は関数{self.__now_function_name}内で宣言され値は{r.get_value()}、型は{r.get_type()}です")
-            elif r[1] == Types.ID:
-                r = self.__memory.get_variable(r, self.__now_function_name)
-                self.__memory.set_variable(Variable(self.__now_function_name, r.get_value(), r.get_type()), self.__now_function_name)
-            return r
-
-        elif node.get_kind() == "EXPR":
-            lhs = self.execute(node.get_lhs())
-            rhs = self.execute(node.get_rhs())
-            if node.get_rhs() is not None:
-                operator = node.get_rhs().get_kind()
-                if operator == "+":
-                    return lhs + rhs
-                elif operator == "-":
-                    return lhs - rhs
-                elif operator == "*":
-                    return lhs * rhs
-                elif operator == "/":
-                    return lhs // rhs if rhs != 0 else 0  # 整数除算
-                elif operator == "%":
-                    return lhs % rhs
-            else:
-                print(f"Evaluating expression: {lhs}")
-            return lhs
-
-        elif node.get_kind() == "ADD_EXPR":
-            lhs = self.execute(node.get_lhs())
-            rhs = self.execute(node.get_rhs())
-
-            return Variable(lhs.get_name(), lhs.get_value() + rhs.get_value(), Types.NUM)
-
-        elif node.get_kind() == "SUB_EXPR":
-            lhs = self.execute(node.get_lhs())
-            rhs = self.execute(node.get_rhs())
-
-            return Variable(lhs.get_name(), lhs.get_value() - rhs.get_value(), Types.NUM)
-
-        elif node.get_kind() == "MUL_EXPR":
-            lhs = self.execute(node.get_lhs())
-            rhs = self.execute(node.get_rhs())
-
-            return Variable(lhs.get_name(), lhs.get_value() * rhs.get_value(), Types.NUM)
-
-        elif node.get_kind() == "DIV_EXPR":
-            lhs = self.execute(node.get_lhs())
-            rhs = self.execute(node.get_rhs())
-
-            return Variable(lhs.get_name(), lhs.get_value() / rhs.get_value(), Types.NUM)
-
-        elif node.get_kind() == "FACTOR":
-            return self.execute(node.get_lhs())  # 再帰的に評価
-
-        elif node.get_kind() == "NUM":
-            return Variable(node.get_lhs(), int(node.get_lhs()), Types.NUM)
-
-        elif node.get_kind() == "FLOAT":
-            return Variable(node.get_lhs(), float(node.get_lhs()), Types.NUM)
-
-        elif node.get_kind() == "ARG_LIST":
-            # 引数リストノードの場合、引数を評価
-            arguments = []
-            for arg in node.get_lhs():
-                r = self.execute(arg)
-                print(r.get_name(), r.get_value(), r.get_type())
-                arguments.append(r)
-            return arguments
-
-        elif node.get_kind() == "FUNCTION_CALL":
-            # Evaluate function arguments　
-            parent = self.__now_function_name
-            function_name = self.execute(node.get_lhs())
-            arguments_stack = []
-
-            for i in node.get_rhs():
-                arguments = self.execute(i)
-                print(f"arguments {arguments}")
-                arguments_stack.push(arguments)
-            try:
-                self.__now_function_name = function_name
-                body = self.__memory.get_function_block(function_name)
-                result = None
-                for statement in body:
-                    result = self.execute(statement)
-
-                self.__now_function_name = parent
+                frame = self.execute(child)
+                if frame is not None:
+                    main_frame = frame
+        except RecursionError:
+            # max_depth より先に Python のスタックが尽きた場合も言語レベルのエラーにする
+            raise CallDepthError(self.__now_function_name, len(self.__call_stack)) from None
+        finally:
+            sys.setrecursionlimit(limit)
+        return main_frame
+
+    def _execute_function(self, node):
+        # 関数ノードの場合、関数名とその中身を評価
+        self.__now_function_name = str(node.get_lhs().get_lhs())
+        if node.get_type() is not None:
+            self.__now_function_type =self.execute(node.get_type())
+        self.__functions[self.__now_function_name] = node
+        if self.__now_function_name == "main":
+            self.__frame = Frame(self.__scopes["main"])
+            self._execute_block(node.get_rhs())
+            self.__returning = False
+            return self.__frame
+
+    def _execute_block(self, statements) -> bool:
+        """文を順に実行する。return を実行したらそこで止めて True を返す"""
+        for statement in statements:
+            self.execute(statement)
+            if self.__returning:
+                return True
+        return False
+
+    def _execute_statement(self, node):
+        return self.execute(node.get_lhs())
+
+    def _execute_let(self, node):
+        # 変数定義ノードの場合、値を現在のフレームのスロットに Variable として保存
+        variable_name = str(node.get_lhs().get_lhs())
+        value = self.execute(node.get_rhs())
+        # 型が静的に分かっていれば値の型を調べない
+        variable = Variable(variable_name, value, STATIC_TYPES.get(self.__types.get(node.get_rhs())) or type_of(value))
+        print(f"変数{variable_name}は関数{self.__now_function_name}内で宣言され値は{value}、型は{variable.var_type}です")
+
+        self.__frame.values[node.get_slot()] = variable
+
+        return value
+
+    def _execute_if(self, node):
+        if self.execute(node.get_lhs()):
+            self._execute_block(node.get_rhs())
+
+    def _execute_if_else(self, node):
+        # lhs は条件と then 側の本体を持つ IF ノード、rhs は else 側の本体
+        if_node = node.get_lhs()
+        self._execute_block(if_node.get_rhs() if self.execute(if_node.get_lhs()) else node.get_rhs())
+
+    def _execute_while(self, node):
+        condition = node.get_lhs()
+        body = node.get_rhs()
+        while self.execute(condition):
+            if self._execute_block(body):
+                return
+
+    def _execute_loop(self, node):
+        # break はないので、抜けるのは return したときだけ
+        body = node.get_lhs()
+        while not self._execute_block(body):
+            pass
+
+    def _execute_match(self, node):
+        # 上のアームから順にパターンと == で比べ、最初に一致したアームだけを実行する（_ は何にでも一致する）
+        subject = self.execute(node.get_lhs())
+        for arm in node.get_rhs():
+            if Resolver.is_wildcard(arm.get_lhs()) or subject == self.execute(arm.get_lhs()):
+                self._execute_block([arm.get_rhs()])
+                return
+
+    def _execute_return(self, node):
+        value = self.execute(node.get_lhs()) if node.get_lhs() is not None else None
+        self.__return_value = value
+        self.__returning = True
+        return value
+
+    def _execute_and_expr(self, node):
+        # VM と同じく、左辺が偽ならその値、真なら右辺の値
+        value = self.execute(node.get_lhs())
+        return self.execute(node.get_rhs()) if value else value
+
+    def _execute_or_expr(self, node):
+        value = self.execute(node.get_lhs())
+        return value if value else self.execute(node.get_rhs())
+
+    def _execute_expr(self, node):
+        lhs = self.execute(node.get_lhs())
+        rhs = self.execute(node.get_rhs())
+        if node.get_rhs() is not None:
+            operator = node.get_rhs().get_kind()
+            if operator == "+":
+                return lhs + rhs
+            elif operator == "-":
+                return lhs - rhs
+            elif operator == "*":
+                return lhs * rhs
+            elif operator == "/":
+                return lhs // rhs if rhs != 0 else 0  # 整数除算
+            elif operator == "%":
+                return lhs % rhs
+        else:
+            print(f"Evaluating expression: {lhs}")
+        return lhs
+
+    # 式は Variable やタプルで包まず、Python の値をそのまま返す
+    def _execute_add_expr(self, node, lhs, rhs):
+        return lhs + rhs
+
+    def _execute_sub_expr(self, node, lhs, rhs):
+        return lhs - rhs
+
+    def _execute_mul_expr(self, node, lhs, rhs):
+        return lhs * rhs
+
+    def _execute_div_expr(self, node, lhs, rhs):
+        return lhs / rhs
+
+    def _execute_eq_expr(self, node, lhs, rhs):
+        return lhs == rhs
+
+    def _execute_ne_expr(self, node, lhs, rhs):
+        return lhs != rhs
+
+    def _execute_lt_expr(self, node, lhs, rhs):
+        return lhs < rhs
+
+    def _execute_gt_expr(self, node, lhs, rhs):
+        return lhs > rhs
+
+    def _execute_le_expr(self, node, lhs, rhs):
+        return lhs <= rhs
+
+    def _execute_ge_expr(self, node, lhs, rhs):
+        return lhs >= rhs
+
+    def _execute_neg_expr(self, node, operand):
+        return -operand
+
+    def _execute_not_expr(self, node, operand):
+        return not operand
+
+    def _execute_num(self, node):
+        return int(node.get_lhs())
+
+    def _execute_float(self, node):
+        return float(node.get_lhs())
+
+    def _execute_arg_list(self, node):
+        # 引数リストノードの場合、引数を評価
+        return [self.execute(arg) for arg in node.get_lhs()]
+
+    def _execute_function_call(self, node, *arguments):
+        # 引数は評価済みの値で受け取る
+        parent = self.__now_function_name
+        function_name = str(node.get_lhs().get_lhs())
+        if function_name not in self.__functions:
+            raise ValueError(f"Function {function_name} is not defined")
+        if len(self.__call_stack) >= self.max_depth:
+            raise CallDepthError(function_name, self.max_depth)
+
+        # 解放済みフレームを再利用し、引数を先頭のスロットに束縛する
+        scope = self.__scopes[function_name]
+        free = self.__free_frames[function_name]
+        frame = free.pop() if free else Frame(scope)
+        for slot, value in enumerate(arguments):
+            frame.values[slot] = Variable(scope.local_names[slot], value, type_of(value))
+
+        key = None
+        if function_name in self.__pure:
+            key = (function_name, arguments, tuple(map(type, arguments)))
+            result = self.memo.lookup(key)
+            if result is not MISSING:
+                frame.clear()
+                free.append(frame)
                 return result
-            except KeyError:
-                raise ValueError(f"Function {function_name} is not defined")
-
-        elif node.get_kind() == "ID":
-            try:
-                value = self.__memory.get_variable((str(node.get_lhs()), Types.ID), self.__now_function_name)
-                return value  # 変数の内容を返す
-            except KeyError:
-                return (str(node.get_lhs()), Types.ID)  # 変数名を返す
-
-        elif node.get_kind() == "STR":
-            return (str(node.get_lhs()), Types.STR)
-
-        elif node.get_kind() == "BOOL":
-            return (node.get_lhs(), Types.BOOL)
-
-        elif node.get_kind() == "PRIMITIVE_TYPE":
-            type_annotation = node.get_lhs()
-            if type_annotation == "i32":
-                return (Types.NUM)
-            elif type_annotation == "f64":
-                return (Types.NUM)
-            elif type_annotation == "bool":
-                return (Types.BOOL)
-            elif type_annotation == "String":
-                return (Types.STR)
-            elif type_annotation == "char":
-                return (Types.STR)
-            elif type_annotation == "()":
-                return (Types.VOID)
-            elif type_annotation.startswith("[") and type_annotation.endswith("]"):
-                inner_type = type_annotation[1:-1]
-                return (f"[{inner_type}]")
-            else:
-                raise ValueError(f"Unknown type annotation: {type_annotation}")
 
+        self.__call_stack.append(self.__frame)
+        self.__now_function_name = function_name
+        self.__frame = frame
+        # 戻り値は return の値。return せずに本体の最後まで来たら None（VM と同じ）
+        result = None
+        if self._execute_block(self.__functions[function_name].get_rhs()):
+            result = self.__return_value
+            self.__returning = False
+            self.__return_value = None
+
+        frame.clear()
+        free.append(frame)
+        self.__frame = self.__call_stack.pop()
+        self.__now_function_name = parent
+        if key is not None:
+            self.memo.store(key, result)
+        return result
+
+    def _execute_id(self, node):
+        return self.__frame.values[node.get_slot()].value  # 変数の内容を返す
+
+    def _execute_str(self, node):
+        return str(node.get_lhs()).strip('"')
+
+    def _execute_bool(self, node):
+        return str(node.get_lhs()) == "true"
+
+    def _execute_primitive_type(self, node):
+        type_annotation = node.get_lhs()
+        if type_annotation == "i32":
+            return (Types.NUM)
+        elif type_annotation == "f64":
+            return (Types.NUM)
+        elif type_annotation == "bool":
+            return (Types.BOOL)
+        elif type_annotation == "String":
+            return (Types.STR)
+        elif type_annotation == "char":
+            return (Types.STR)
+        elif type_annotation == "()":
+            return (Types.VOID)
+        elif type_annotation.startswith("[") and type_annotation.endswith("]"):
+            inner_type = type_annotation[1:-1]
+            return (f"[{inner_type}]")
         else:
-            raise ValueError(f"Unknown node kind: {node.get_kind()}")
\ No newline at end of file
+            raise ValueError(f"Unknown type annotation: {type_annotation}")
\ No newline at end of file
@@ -10,4 +10,40 @@ class Memory:
     def set(self, kind, name, variable):
         self.kind = kind
         self.name = name
-        self.variable = variable
\ No newline at end of file
+        self.variable = variable
+
+class Frame:
+    """関数呼び出し 1 回分のローカル変数。Resolver が割り当てたスロット番号で読み書きする"""
+    __slots__ = ("scope", "values")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.values = [None] * scope.nlocals
+
+    def clear(self):
+        # フリーリストに戻す前に古い値への参照を外す
+        self.values[:] = [None] * len(self.values)
+
+    def get_variable(self, name):
+        slot = self.scope.lookup(name)
+        if slot is None or self.values[slot] is None:
+            raise KeyError(f"Variable '{name}' not found in function scope '{self.scope.name}'")
+        return self.values[slot]
+
+    def view(self):
+        print(f"Function Scope: {self.scope.name}")
+        for name, variable in zip(self.scope.local_names, self.values):
+            if variable is not None:
+                print(f"  Variable Name: {name}, Value: {variable.get_value()}, Type: {variable.get_type()}")
+
+# 言語レベルでの呼び出しの深さの上限（VM / インタープリター共通の既定値）
+MAX_CALL_DEPTH = 1000
+
+
+class CallDepthError(Exception):
+    """スクリプトの再帰が深すぎる場合のエラー（Python の RecursionError の代わりに送出する）"""
+
+    def __init__(self, function_name, limit):
+        super().__init__(f"Maximum recursion depth {limit} exceeded in function {function_name}")
+        self.function_name = function_name
+        self.limit = limit
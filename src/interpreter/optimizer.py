@@ -0,0 +1,309 @@
+import math
+import operator
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from ..ast.node import Node, Kind, LAYOUTS, BINARY_LAYOUT
+from ..ast.traversal import Traversal
+
+# 最適化の結果が変わったら上げる（コードキャッシュのキーに含まれる）
+OPTIMIZER_VERSION = 2
+
+# 畳み込む演算。インタープリター・VM と同じく Python の演算子で計算する（/ は真の除算）
+FOLD_OPS = {
+    Kind.ADD_EXPR: operator.add,
+    Kind.SUB_EXPR: operator.sub,
+    Kind.MUL_EXPR: operator.mul,
+    Kind.DIV_EXPR: operator.truediv,
+}
+# 畳み込まずに子だけを畳み込む式の種別
+GENERIC_KINDS = (
+    Kind.EXPR, Kind.UNARY_EXPR, Kind.OR_EXPR, Kind.AND_EXPR, Kind.EQUALITY_EXPR, Kind.RELATIONAL_EXPR,
+    Kind.EQ_EXPR, Kind.NE_EXPR, Kind.LT_EXPR, Kind.GT_EXPR, Kind.LE_EXPR, Kind.GE_EXPR, Kind.NOT_EXPR,
+)
+
+
+class Optimizer:
+    """CalcTransformer の出力に対する最適化パス。
+
+    - 定数どうしの四則演算（と単項マイナス）を 1 つの NUM / FLOAT に畳み込む
+    - 定数で束縛された let 変数の参照を定数に置き換える
+    - 同じ文の並びの中で、読まれる前に上書きされる let（右辺に副作用がないもの）を削除する
+
+    値は実行時と同じ規則で計算するため、型検査（Eval）は最適化の前に行う。
+    木はその場で書き換え、書き換えた根を返す。
+    """
+
+    def __init__(self):
+        self.folded = 0
+        self.propagated = 0
+        self.removed = 0
+        self.__constants: Dict[str, Node] = {}
+        # 式の畳み込みは Traversal で行う（深い式でも Python の再帰を使わない）。
+        # 包みのノード（括弧など）は木に残すので passthrough は使わない
+        generic = (self._fold_operands, self._fold_rebuild)
+        self.__folder = Traversal(
+            handlers={Kind.ID: self._fold_id},
+            default=self._fold_other,
+            binary={kind: self._fold_arithmetic for kind in FOLD_OPS},
+            unary={Kind.NEG_EXPR: self._fold_neg, Kind.FACTOR: self._fold_factor},
+            nary={
+                **{kind: generic for kind in GENERIC_KINDS},
+                Kind.FUNCTION_CALL: (lambda node: node.rhs or [], self._fold_call),
+                Kind.ARG_LIST: (lambda node: node.lhs or [], self._fold_arguments),
+            },
+            passthrough=frozenset(),
+        )
+
+    def optimize(self, root: Node) -> Node:
+        if root.tag == Kind.TOP_LEVEL:
+            for function in root.lhs:
+                self.optimize_function(function)
+        else:
+            self.optimize_function(root)
+        return root
+
+    def optimize_function(self, function: Node) -> Node:
+        # 引数の値は分からないので、関数ごとに空の状態から始める
+        self.__constants = {}
+        function.rhs = self._optimize_block(function.rhs or [])
+        return function
+
+    def optimize_functions(self, functions: Iterable[Node]) -> Iterator[Node]:
+        """FUNCTION ノードを受け取った順に最適化して次の段へ渡す"""
+        for function in functions:
+            yield self.optimize_function(function)
+
+    # === 定数 ===
+    @staticmethod
+    def constant_value(node):
+        """NUM / FLOAT ノードの値。定数でなければ None"""
+        if node.tag == Kind.NUM:
+            return int(node.lhs)
+        if node.tag == Kind.FLOAT:
+            return float(node.lhs)
+        return None
+
+    @staticmethod
+    def constant_node(value) -> Optional[Node]:
+        if type(value) is int:
+            return Node(Kind.NUM, str(value))
+        if type(value) is float and math.isfinite(value):
+            return Node(Kind.FLOAT, repr(value))
+        return None
+
+    # === 文 ===
+    def _optimize_block(self, statements: List[Node]) -> List[Node]:
+        statements = [self._optimize_statement(statement) for statement in statements]
+        return self._remove_dead_stores(statements)
+
+    def _optimize_statement(self, statement: Node) -> Node:
+        node = statement.lhs if statement.tag == Kind.STATEMENT else statement
+        kind = node.tag
+
+        if kind == Kind.LET:
+            node.rhs = self._fold(node.rhs)
+            name = str(node.lhs.lhs)
+            if self.constant_value(node.rhs) is not None:
+                self.__constants[name] = node.rhs
+            else:
+                self.__constants.pop(name, None)
+
+        elif kind in (Kind.WHILE, Kind.LOOP):
+            # 2 周目以降は本体での代入が条件や本体の先頭に届くので、先に忘れておく
+            self._forget(self.assigned_names(node))
+            if kind == Kind.WHILE:
+                node.lhs = self._fold(node.lhs)
+                node.rhs = self._optimize_branch(node.rhs)
+            else:
+                node.lhs = self._optimize_branch(node.lhs)
+
+        elif kind == Kind.IF:
+            node.lhs = self._fold(node.lhs)
+            node.rhs = self._optimize_branch(node.rhs)
+
+        elif kind == Kind.IF_ELSE:
+            if_node = node.lhs
+            if_node.lhs = self._fold(if_node.lhs)
+            if_node.rhs = self._optimize_branch(if_node.rhs)
+            node.rhs = self._optimize_branch(node.rhs)
+
+        elif kind == Kind.MATCH:
+            node.lhs = self._fold(node.lhs)
+            for arm in node.rhs:
+                arm.lhs = self._fold(arm.lhs)
+                arm.rhs = self._optimize_branch([arm.rhs])[0]
+
+        elif kind == Kind.RETURN:
+            node.lhs = self._fold(node.lhs)
+
+        else:
+            # 式文
+            node = self._fold(node)
+
+        if statement.tag == Kind.STATEMENT:
+            statement.lhs = node
+            return statement
+        return node
+
+    def _optimize_branch(self, statements: List[Node]) -> List[Node]:
+        # 実行されるとは限らない本体: 中で代入された変数は、本体の後では定数とみなさない
+        saved = dict(self.__constants)
+        statements = self._optimize_block(statements)
+        self.__constants = saved
+        for statement in statements:
+            self._forget(self.assigned_names(statement))
+        return statements
+
+    def _forget(self, names: Set[str]) -> None:
+        for name in names:
+            self.__constants.pop(name, None)
+
+    def _remove_dead_stores(self, statements: List[Node]) -> List[Node]:
+        # 後ろから見て、読まれる前に同じ並びの let で上書きされる変数を集める
+        overwritten = set()
+        kept = []
+        for statement in reversed(statements):
+            node = statement.lhs if statement.tag == Kind.STATEMENT else statement
+            if node.tag == Kind.LET:
+                name = str(node.lhs.lhs)
+                if name in overwritten and self.is_pure(node.rhs):
+                    self.removed += 1
+                    continue
+                # 右辺はこの let より前の値を読むので、上書きの印を付けてから右辺が読む名前を外す
+                # （let b = b * 2; の前の b は読まれている）
+                overwritten.add(name)
+                overwritten -= self.read_names(node.rhs)
+            elif node.tag == Kind.RETURN:
+                # return より後ろの let は実行されない
+                overwritten = set()
+            else:
+                overwritten -= self.read_names(node)
+            kept.append(statement)
+        kept.reverse()
+        return kept
+
+    # === 式 ===
+    def _fold(self, node):
+        if not isinstance(node, Node):
+            return node
+        return self.__folder.evaluate(node)
+
+    def _fold_id(self, node: Node) -> Node:
+        constant = self.__constants.get(str(node.lhs))
+        if constant is None:
+            return node
+        self.propagated += 1
+        propagated = Node(constant.tag, constant.lhs)
+        propagated.span = node.span
+        return propagated
+
+    def _fold_arithmetic(self, node: Node, lhs: Node, rhs: Node) -> Node:
+        node.lhs = lhs
+        node.rhs = rhs
+        lhs = self.constant_value(lhs)
+        rhs = self.constant_value(rhs)
+        if lhs is None or rhs is None:
+            return node
+        if node.tag == Kind.DIV_EXPR and rhs == 0:
+            # 0 除算は実行時のエラーとして残す
+            return node
+        return self._folded(node, FOLD_OPS[node.tag](lhs, rhs))
+
+    def _fold_neg(self, node: Node, operand: Node) -> Node:
+        node.lhs = operand
+        value = self.constant_value(operand)
+        return node if value is None else self._folded(node, -value)
+
+    def _fold_factor(self, node: Node, operand: Node) -> Node:
+        # 括弧の中身が定数になれば括弧ごと置き換える
+        node.lhs = operand
+        return operand if self.constant_value(operand) is not None else node
+
+    @staticmethod
+    def _fold_operands(node: Node) -> List[Node]:
+        return [child for child in (node.lhs, node.rhs) if isinstance(child, Node)]
+
+    @staticmethod
+    def _fold_rebuild(node: Node, *values: Node) -> Node:
+        """_fold_operands が返した子を、畳み込んだ結果に差し替える"""
+        values = iter(values)
+        if isinstance(node.lhs, Node):
+            node.lhs = next(values)
+        if isinstance(node.rhs, Node):
+            node.rhs = next(values)
+        return node
+
+    @staticmethod
+    def _fold_call(node: Node, *arguments: Node) -> Node:
+        # 関数名の ID は変数ではないので引数（ARG_LIST）だけを見る
+        node.rhs = list(arguments)
+        return node
+
+    @staticmethod
+    def _fold_arguments(node: Node, *arguments: Node) -> Node:
+        node.lhs = list(arguments)
+        return node
+
+    def _fold_other(self, node: Node) -> Node:
+        # 葉と、式の表にない種別（拡張のノードなど）: 子をそれぞれ畳み込む
+        for field, is_list in LAYOUTS.get(node.tag, BINARY_LAYOUT):
+            child = getattr(node, field)
+            if child is None:
+                continue
+            if is_list:
+                setattr(node, field, [self._fold(item) for item in child])
+            else:
+                setattr(node, field, self._fold(child))
+        return node
+
+    def _folded(self, node: Node, value) -> Node:
+        constant = self.constant_node(value)
+        if constant is None:
+            return node
+        self.folded += 1
+        constant.span = node.span
+        return constant
+
+    # === 解析 ===
+    @staticmethod
+    def assigned_names(node: Node) -> Set[str]:
+        """部分木の中の let で代入される変数名"""
+        names = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if not isinstance(current, Node):
+                continue
+            if current.tag == Kind.LET:
+                names.add(str(current.lhs.lhs))
+            stack.extend(current.children())
+        return names
+
+    @staticmethod
+    def read_names(node) -> Set[str]:
+        """部分木の中で参照される名前（let の左辺は除く）"""
+        names = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if not isinstance(current, Node):
+                continue
+            if current.tag == Kind.ID:
+                names.add(str(current.lhs))
+            elif current.tag == Kind.LET:
+                stack.append(current.rhs)
+            else:
+                stack.extend(current.children())
+        return names
+
+    @staticmethod
+    def is_pure(node) -> bool:
+        """削除しても動作が変わらない式か（関数呼び出しと、畳み込めなかった除算を含まない）"""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if not isinstance(current, Node):
+                continue
+            if current.tag in (Kind.FUNCTION_CALL, Kind.DIV_EXPR):
+                return False
+            stack.extend(current.children())
+        return True
@@ -0,0 +1,108 @@
+import json
+import time
+from typing import Callable, Dict, List, Tuple
+from ..ast.node import KIND_NAMES
+
+
+class FunctionStats:
+    """関数ごとの呼び出し回数と時間（秒）。inclusive は呼び出し先を含み、exclusive は含まない"""
+    __slots__ = ("calls", "inclusive", "exclusive")
+
+    def __init__(self):
+        self.calls = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+
+
+class Profiler:
+    """インタープリターの実行を関数とノード種別ごとに計測する。
+
+    Interpreter(root, profiler=Profiler()) のように渡したときだけ、インタープリターが
+    種別ごとの実行関数を計測用の関数で包む。渡さなければ実行の経路には何も加わらない。
+    - node_counts: ノード種別のタグ → 実行した回数（FACTOR などの包みのノードは数えない。
+      特殊化したクロージャは、まとめた部分木の根の種別で 1 回と数える）
+    - functions: 関数名 → FunctionStats（再帰呼び出しの inclusive は一番外側の呼び出しだけ数える）
+    - stacks: 呼び出しの列（main から順の関数名のタプル）→ その列の先頭の関数の exclusive の合計
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.node_counts: Dict[int, int] = {}
+        self.functions: Dict[str, FunctionStats] = {}
+        self.stacks: Dict[Tuple[str, ...], float] = {}
+        # 実行中の呼び出し: [呼び出しの列, 開始時刻, 呼び出し先で使った時間]
+        self.__active: List[list] = []
+        # 実行中の呼び出しの関数名 → その関数の呼び出しの深さ（再帰の inclusive の二重計上を防ぐ）
+        self.__depths: Dict[str, int] = {}
+
+    def counted(self, kind: int, function: Callable) -> Callable:
+        """function を、呼ばれるたびに kind の回数を数える関数で包む"""
+        counts = self.node_counts
+        counts.setdefault(kind, 0)
+
+        def counting(*args):
+            counts[kind] += 1
+            return function(*args)
+        return counting
+
+    def timed(self, name_of: Callable, function: Callable) -> Callable:
+        """function(node, ...) を、name_of(node) の関数の呼び出しとして時間を計る関数で包む"""
+        def timing(node, *args):
+            self.enter(name_of(node))
+            try:
+                return function(node, *args)
+            finally:
+                self.leave()
+        return timing
+
+    def enter(self, name: str) -> None:
+        active = self.__active
+        path = (active[-1][0] if active else ()) + (name,)
+        self.__depths[name] = self.__depths.get(name, 0) + 1
+        active.append([path, self.clock(), 0.0])
+
+    def leave(self) -> None:
+        path, start, children = self.__active.pop()
+        elapsed = self.clock() - start
+        name = path[-1]
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = FunctionStats()
+        stats.calls += 1
+        stats.exclusive += elapsed - children
+        depth = self.__depths[name] - 1
+        self.__depths[name] = depth
+        if depth == 0:
+            stats.inclusive += elapsed
+        self.stacks[path] = self.stacks.get(path, 0.0) + elapsed - children
+        if self.__active:
+            self.__active[-1][2] += elapsed
+
+    def to_dict(self) -> dict:
+        """JSON に書き出す形。関数は exclusive の大きい順、ノード種別は回数の多い順（時間はミリ秒）"""
+        functions = sorted(self.functions.items(), key=lambda item: item[1].exclusive, reverse=True)
+        kinds = sorted(((KIND_NAMES[tag], count) for tag, count in self.node_counts.items() if count), key=lambda item: -item[1])
+        return {
+            "functions": {
+                name: {
+                    "calls": stats.calls,
+                    "inclusive_ms": stats.inclusive * 1000,
+                    "exclusive_ms": stats.exclusive * 1000,
+                }
+                for name, stats in functions
+            },
+            "node_kinds": dict(kinds),
+        }
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def collapsed(self) -> List[str]:
+        """flamegraph.pl や speedscope が読む collapsed stack 形式の行（値は exclusive のマイクロ秒）"""
+        return [f"{';'.join(path)} {round(seconds * 1_000_000)}" for path, seconds in sorted(self.stacks.items())]
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for line in self.collapsed():
+                f.write(line + "\n")
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+from typing import Dict, Set
+from ..ast.node import Node, Kind
+
+# 言語の既知のノード種別はどれも入出力や呼び出し元の状態の変更を伴わない
+# （引数は値渡しでグローバル変数もない）。未知の種別（組み込み関数などの拡張）は純粋とみなさない
+PURE_KINDS = frozenset(tag for name, tag in vars(Kind).items() if name.isupper())
+
+# メモ化キャッシュの既定のエントリ数
+DEFAULT_MEMO_SIZE = 4096
+
+# lookup でキャッシュに無かったことを表す値（None も戻り値になりうるため）
+MISSING = object()
+
+
+def pure_functions(root: Node) -> Set[str]:
+    """結果が引数だけで決まる関数の名前を返す。
+
+    本体が既知の種別だけからなり、呼び出す関数もすべて純粋な関数を純粋とする。
+    全関数を純粋と仮定し、条件を満たさないものを取り除いていく（再帰呼び出しは純粋のまま残る）。
+    """
+    functions = root.lhs if root.tag == Kind.TOP_LEVEL else [root]
+    calls: Dict[str, Set[str]] = {}
+    pure = set()
+    for function in functions:
+        name = str(function.lhs.lhs)
+        callees = set()
+        if _collect_calls(function.rhs or [], callees):
+            pure.add(name)
+        calls[name] = callees
+
+    changed = True
+    while changed:
+        changed = False
+        for name in list(pure):
+            if not calls[name] <= pure:
+                pure.discard(name)
+                changed = True
+    return pure
+
+
+def _collect_calls(statements, callees: Set[str]) -> bool:
+    """呼び出す関数名を callees に集める。未知の種別があれば False"""
+    stack = list(statements)
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, Node):
+            continue
+        if node.tag not in PURE_KINDS:
+            return False
+        if node.tag == Kind.FUNCTION_CALL:
+            callees.add(str(node.lhs.lhs))
+            stack.extend(node.rhs)
+        else:
+            stack.extend(node.children())
+    return True
+
+
+class MemoCache:
+    """純粋な関数の結果を (関数, 引数) をキーに保持する LRU キャッシュ。
+
+    max_entries を超えると最後に使われたのが古いものから捨てる。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MEMO_SIZE):
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be positive: {max_entries}")
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key):
+        value = self.entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def store(self, key, value) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+        }
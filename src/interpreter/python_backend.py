@@ -0,0 +1,169 @@
+from types import CodeType
+import keyword
+from typing import List, Optional, Tuple
+from ..ast.node import Node, Kind
+from ..utils.emitter import PythonEmitter
+from ..utils.generator import Generator, STATEMENT_KINDS
+from .memory import MAX_CALL_DEPTH, CallDepthError
+
+# compile() に渡すファイル名（トレースバックに表示される）
+GENERATED_FILENAME = "<generated>"
+# get_local で実行後のローカル変数を読める関数（VM.get_local のエントリ関数に当たる）
+OBSERVED_FUNCTION = "main"
+# CPython の compile() は式の深さに上限がある（3.11 なら再帰上限の 3 倍程度）。
+# これより深い式は一時変数に分けてから生成する
+CHUNK_DEPTH = 100
+
+# 子を左から順に必ず評価する式の種別と、一時変数に移してよい子のフィールド
+# （&& / || の右辺は評価されないことがあるので移さない）
+EAGER_FIELDS = {
+    **{kind: ("lhs", "rhs") for kind in (
+        Kind.EXPR, Kind.EQUALITY_EXPR, Kind.RELATIONAL_EXPR,
+        Kind.EQ_EXPR, Kind.NE_EXPR, Kind.LT_EXPR, Kind.GT_EXPR, Kind.LE_EXPR, Kind.GE_EXPR,
+        Kind.ADD_EXPR, Kind.SUB_EXPR, Kind.MUL_EXPR, Kind.DIV_EXPR,
+    )},
+    **{kind: ("lhs",) for kind in (Kind.UNARY_EXPR, Kind.NEG_EXPR, Kind.NOT_EXPR, Kind.FACTOR, Kind.AND_EXPR, Kind.OR_EXPR)},
+}
+
+
+def generate_python(root: Node, observe: Optional[str] = None) -> str:
+    """Node 木を Generator + PythonEmitter で Python のモジュールのソースに変換する。
+
+    CHUNK_DEPTH より深い式は一時変数 __chunk_N に分けて出力する。木は生成の後で元に戻す。
+    observe は PythonEmitter にそのまま渡す（ローカル変数を __observed__ に写す関数名）。
+    """
+    emitter = PythonEmitter(output_dir=None, observe=observe)
+    undo = split_deep_expressions(root)
+    try:
+        Generator(emitter=emitter).generate(root)
+    finally:
+        for owner, field, value in reversed(undo):
+            setattr(owner, field, value)
+    return emitter.source()
+
+
+def split_deep_expressions(root: Node, max_depth: int = CHUNK_DEPTH) -> List[Tuple[Node, str, object]]:
+    """文の直前で 1 度だけ評価される式（let の右辺、return・if・match の対象、式文）のうち、
+    深さ max_depth に達した部分式を、文の前の let __chunk_N に移す。
+
+    部分式は左から、内側から順に移す。&& / || の右辺のように評価されないことがある部分は移さず、
+    関数呼び出しに副作用はないので、結果は変わらない。
+    while の条件や match のアームのように文の前に移せない式はそのまま残す。
+    書き換えた箇所の (ノード, フィールド, 元の値) の列を返す（逆順に戻すと元の木になる）。
+    """
+    functions = root.lhs if root.tag == Kind.TOP_LEVEL else [root]
+    undo = []
+    chunks = []
+    bodies = [(function, "rhs") for function in functions]
+    while bodies:
+        owner, field = bodies.pop()
+        statements = getattr(owner, field) or []
+        split = []
+        for statement in statements:
+            node = statement.lhs if statement.tag == Kind.STATEMENT else statement
+            kind = node.tag
+            if kind == Kind.LET:
+                targets = [(node, "rhs")]
+            elif kind in (Kind.RETURN, Kind.IF, Kind.MATCH):
+                targets = [(node, "lhs")] if node.lhs is not None else []
+            elif kind == Kind.IF_ELSE:
+                targets = [(node.lhs, "lhs")]
+            elif kind not in STATEMENT_KINDS and statement is not node:
+                targets = [(statement, "lhs")]
+            else:
+                targets = []
+
+            if kind in (Kind.IF, Kind.WHILE):
+                bodies.append((node, "rhs"))
+            elif kind == Kind.IF_ELSE:
+                bodies.append((node.lhs, "rhs"))
+                bodies.append((node, "rhs"))
+            elif kind == Kind.LOOP:
+                bodies.append((node, "lhs"))
+
+            for target in targets:
+                for let in _split_expression(*target, max_depth, chunks, undo):
+                    split.append(Node(Kind.STATEMENT, let))
+            split.append(statement)
+        if len(split) != len(statements):
+            undo.append((owner, field, statements))
+            setattr(owner, field, split)
+    return undo
+
+
+def _split_expression(owner: Node, field: str, max_depth: int, chunks: list, undo: list) -> List[Node]:
+    """owner.field の式を後行順にたどり、深さが max_depth に達した部分式を let に移す"""
+    lets = []
+    heights = {}
+    # (ノード, 親, フィールド（移せないなら None）, 展開済みか)
+    stack = [(getattr(owner, field), owner, field, False)]
+    while stack:
+        node, parent, name, expanded = stack.pop()
+        if not isinstance(node, Node):
+            continue
+        if not expanded:
+            stack.append((node, parent, name, True))
+            eager = EAGER_FIELDS.get(node.tag, ()) if name is not None else ()
+            children = [(child, child_field if child_field in eager else None)
+                        for child_field in ("lhs", "rhs") for child in [getattr(node, child_field)] if isinstance(child, Node)]
+            children += [(child, None) for child in node.children() if child is not node.lhs and child is not node.rhs]
+            for child, child_field in reversed(children):
+                stack.append((child, node, child_field, False))
+            continue
+        height = 1 + max((heights.pop(id(child), 0) for child in node.children() if isinstance(child, Node)), default=0)
+        if height >= max_depth and name is not None and parent is not owner:
+            chunk = Node(Kind.ID, f"__chunk_{len(chunks)}")
+            chunks.append(chunk)
+            lets.append(Node(Kind.LET, Node(Kind.ID, chunk.lhs), node))
+            undo.append((parent, name, node))
+            setattr(parent, name, chunk)
+            node = chunk
+            height = 1
+        heights[id(node)] = height
+    return lets
+
+
+class PythonBackend:
+    """Node 木を Python のソースに変換して compile() し、CPython のバイトコードとして実行する。
+
+    コードオブジェクトは 1 度だけ作り、関数を定義したモジュールの名前空間も最初の run() で 1 度だけ作る。
+    以降の run() は生成された関数を直接呼ぶだけになる。
+    main は return の直前にローカル変数を写すよう生成するので、実行後に get_local で読める。
+    """
+
+    def __init__(self, root: Node = None, code: CodeType = None, max_depth: int = MAX_CALL_DEPTH):
+        self.source = None
+        if code is None:
+            self.source = generate_python(root, observe=OBSERVED_FUNCTION)
+            try:
+                code = compile(self.source, GENERATED_FILENAME, "exec")
+            except (RecursionError, MemoryError) as e:
+                # 一時変数に分けられない位置（while の条件など）に深すぎる式が残った
+                raise ValueError(f"Generated Python code is too deeply nested to compile: {e}") from None
+        self.code = code
+        self.max_depth = max_depth
+        self.__namespace = None
+
+    def run(self, entry: str = "main", *args):
+        if self.__namespace is None:
+            self.__namespace = {"__name__": "__generated__", "__observed__": {}}
+            exec(self.code, self.__namespace)
+        function = self.__namespace.get(entry)
+        if function is None:
+            raise ValueError(f"Function {entry} is not defined")
+        try:
+            return function(*args)
+        except RecursionError:
+            # 生成コードの再帰は Python の再帰上限で止まる。VM と同じ例外にそろえる
+            raise CallDepthError(entry, self.max_depth) from None
+
+    def get_local(self, name: str):
+        """main が最後に return した時点のローカル変数の値を返す（実行後の確認用。VM.get_local と同じ）"""
+        namespace = self.__namespace or {}
+        observed = namespace.get("__observed__", {})
+        # PythonEmitter.format_identifier と同じく、予約語と関数名を隠す名前には _ が付いている
+        if keyword.iskeyword(name) or callable(namespace.get(name)):
+            name += "_"
+        if name not in observed:
+            raise KeyError(f"Variable '{name}' not found in function scope '{OBSERVED_FUNCTION}'")
+        return observed[name]
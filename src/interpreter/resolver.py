@@ -0,0 +1,149 @@
+from typing import Dict, List, Optional
+from ..ast.node import Node, Kind
+from ..ast.traversal import preorder
+
+
+class Scope:
+    """関数 1 つ分のローカル変数レイアウト（名前 → スロット番号）"""
+
+    def __init__(self, name: str, params: List[str]):
+        self.name = name
+        self.nparams = len(params)
+        self.local_names: List[str] = []
+        self.slots: Dict[str, int] = {}
+        for param in params:
+            self.declare(param)
+
+    @property
+    def nlocals(self) -> int:
+        return len(self.local_names)
+
+    def declare(self, name: str) -> int:
+        if name not in self.slots:
+            self.slots[name] = len(self.local_names)
+            self.local_names.append(name)
+        return self.slots[name]
+
+    def lookup(self, name: str) -> Optional[int]:
+        return self.slots.get(name)
+
+
+class Resolver:
+    """let で束縛された名前に関数ごとのスロット番号を割り当て、ID / LET ノードに記録する。
+
+    未定義の変数・関数や引数の数の不一致は実行前にまとめて報告する。
+    """
+
+    def __init__(self):
+        self.scopes: Dict[str, Scope] = {}
+        self.errors: List[str] = []
+        self.__scope = None
+
+    def resolve(self, root: Node) -> Dict[str, Scope]:
+        functions = root.lhs if root.tag == Kind.TOP_LEVEL else [root]
+
+        # 前方参照できるよう、先に全関数のスコープを作ってから本体を解決する
+        for function in functions:
+            self.declare_function(function)
+
+        for function in functions:
+            self.resolve_function(function)
+
+        if self.errors:
+            raise ValueError("\n".join(self.errors))
+        return self.scopes
+
+    def declare_function(self, function: Node) -> Scope:
+        name = str(function.lhs.lhs)
+        if name in self.scopes:
+            self.errors.append(f"Function {name} is defined more than once")
+        self.scopes[name] = Scope(name, self.param_names(function))
+        return self.scopes[name]
+
+    def resolve_function(self, function: Node) -> None:
+        """関数 1 つの本体を解決する。呼び出し先のスコープは declare_function で登録済みであること"""
+        name = str(function.lhs.lhs)
+        if self.scopes[name].nlocals > self.scopes[name].nparams:
+            # 解決し直す場合はローカル変数のレイアウトを作り直す
+            self.scopes[name] = Scope(name, self.param_names(function))
+        self.__scope = self.scopes[name]
+        preorder(function.rhs or [], self._resolve)
+
+    @staticmethod
+    def param_names(function: Node) -> List[str]:
+        if function.params is None:
+            return []
+        return [str(param.lhs.lhs) for param in function.params.lhs]
+
+    @staticmethod
+    def call_arguments(node: Node) -> List[Node]:
+        # function_call の引数は ARG_LIST ノードにまとめられている
+        arguments = []
+        for arg in node.rhs:
+            if arg.tag == Kind.ARG_LIST:
+                arguments.extend(arg.lhs)
+            else:
+                arguments.append(arg)
+        return arguments
+
+    def _resolve(self, node):
+        """preorder から呼ばれ、続けて解決する子（と後で行う処理）を返す"""
+        if isinstance(node, list):
+            return node
+        if node is None:
+            return None
+
+        kind = node.tag
+        if kind == Kind.LET:
+            # 右辺を先に解決する（let x = x + 1; の右辺は以前の x を指す）
+            return [node.rhs, lambda: self._declare_let(node)]
+
+        elif kind == Kind.ID:
+            name = str(node.lhs)
+            slot = self.__scope.lookup(name)
+            if slot is None:
+                self.errors.append(f"Variable '{name}' not found in function scope '{self.__scope.name}'")
+            else:
+                node.slot = slot
+
+        elif kind == Kind.FUNCTION_CALL:
+            function_name = str(node.lhs.lhs)
+            arguments = self.call_arguments(node)
+            if function_name not in self.scopes:
+                self.errors.append(f"Function {function_name} is not defined")
+            elif len(arguments) != self.scopes[function_name].nparams:
+                self.errors.append(
+                    f"Function {function_name} expects {self.scopes[function_name].nparams} arguments but got {len(arguments)}"
+                )
+            return arguments
+
+        elif kind == Kind.MATCH:
+            # 対象の値を退避する隠しスロットを確保する
+            children = [node.lhs, lambda: self._declare_match(node)]
+            for arm in node.rhs:
+                if not self.is_wildcard(arm.lhs):
+                    children.append(arm.lhs)
+                children.append(arm.rhs)
+            return children
+
+        else:
+            return list(node.children())
+
+    def _declare_let(self, node):
+        slot = self.__scope.declare(str(node.lhs.lhs))
+        node.slot = slot
+        node.lhs.slot = slot
+
+    def _declare_match(self, node):
+        node.slot = self.__scope.declare(f"$match{self.__scope.nlocals}")
+
+    @staticmethod
+    def unwrap(node: Node) -> Node:
+        while node.tag in (Kind.FACTOR, Kind.EXPR, Kind.UNARY_EXPR) and node.rhs is None:
+            node = node.lhs
+        return node
+
+    @staticmethod
+    def is_wildcard(pattern: Node) -> bool:
+        pattern = Resolver.unwrap(pattern)
+        return pattern.tag == Kind.ID and str(pattern.lhs) == "_"
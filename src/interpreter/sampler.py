@@ -0,0 +1,138 @@
+import time
+import signal
+from bisect import bisect_right
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from ..ast.node import Node, Kind
+from ..ast.traversal import Traversal
+
+DEFAULT_INTERVAL = 0.001
+
+# Traversal.evaluate のフレームのローカル変数 node が、そのフレームで実行中のノード
+_EVALUATE_CODE = Traversal.evaluate.__code__
+# 関数全体・プログラム全体を表すノード。どのサンプルにも含まれるので行には数えない
+_CONTAINER_KINDS = (Kind.TOP_LEVEL, Kind.FUNCTION)
+
+
+class SamplingProfiler:
+    """タイマーのシグナルで一定間隔ごとに実行中のノードを調べ、時間をソースの行と関数に割り振る。
+
+    Profiler と違って実行の経路には何も加えない。interval 秒の CPU 時間ごとに SIGPROF を受け、
+    Python のフレームをたどって Traversal.evaluate が処理中のノードの span の行を記録する。
+    signal.setitimer を使うので、Unix のメインスレッドでだけ使える。CPU 時間のタイマーは
+    カーネルのティック（多くの環境で 1〜4 ms）より細かくならないため、report には計測した CPU 時間も出す。
+
+        with SamplingProfiler() as sampler:
+            Interpreter(root).execute()
+        print(sampler.report(source, root))
+
+    stacks: 行の列（内側から外側へ。呼び出し元の行も含む）→ サンプル数
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        if not hasattr(signal, "setitimer"):
+            raise ValueError("Sampling profiler requires signal.setitimer (not available on this platform)")
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        # start から stop までの CPU 時間（秒）
+        self.cpu_time = 0.0
+        self.__previous_handler = None
+        self.__started = None
+
+    def start(self) -> None:
+        self.__previous_handler = signal.signal(signal.SIGPROF, self._on_signal)
+        self.__started = time.process_time()
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self) -> None:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        self.cpu_time += time.process_time() - self.__started
+        signal.signal(signal.SIGPROF, self.__previous_handler or signal.SIG_DFL)
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _on_signal(self, signum, frame) -> None:
+        self.sample(frame)
+
+    def sample(self, frame) -> None:
+        """frame から外側へ Traversal.evaluate のフレームをたどり、処理中のノードの行の列を記録する"""
+        lines = []
+        while frame is not None:
+            if frame.f_code is _EVALUATE_CODE:
+                node = frame.f_locals.get("node")
+                # 位置のないノード（型の注釈など）や、スタックから取り出したばかりのタプルは飛ばす
+                if node.__class__ is Node and node.span is not None and node.tag not in _CONTAINER_KINDS:
+                    line = node.span[0]
+                    if not lines or lines[-1] != line:
+                        lines.append(line)
+            frame = frame.f_back
+        if lines:
+            # インタープリターの外（パースなど）で受けたサンプルは数えない
+            self.samples += 1
+            self.stacks[tuple(lines)] += 1
+
+    def line_samples(self) -> Tuple[Counter, Counter]:
+        """(行 → self のサンプル数, 行 → total のサンプル数)。self は一番内側の行だけ、total は列に含まれる行すべて"""
+        self_lines = Counter()
+        total_lines = Counter()
+        for lines, count in self.stacks.items():
+            self_lines[lines[0]] += count
+            for line in set(lines):
+                total_lines[line] += count
+        return self_lines, total_lines
+
+    def function_samples(self, root: Node) -> Dict[str, Tuple[int, int]]:
+        """関数名 → (self, total) のサンプル数。行は root の FUNCTION の span で関数に割り振る"""
+        ranges = function_ranges(root)
+        starts = [start for start, _, _ in ranges]
+        result: Dict[str, List[int]] = {}
+        for lines, count in self.stacks.items():
+            names = [function_at(ranges, starts, line) for line in lines]
+            for name in set(names):
+                if name is not None:
+                    result.setdefault(name, [0, 0])[1] += count
+            if names[0] is not None:
+                result[names[0]][0] += count
+        return {name: (own, total) for name, (own, total) in result.items()}
+
+    def report(self, source: str, root: Node) -> str:
+        """関数ごとの割合と、ソースの各行に self / total の割合を付けた注釈付きのソース"""
+        if not self.samples:
+            return "No samples (the program finished before the first timer tick)"
+        percent = lambda count: f"{count * 100 / self.samples:5.1f}%" if count else ""
+        lines = [f"samples: {self.samples} over {self.cpu_time * 1000:.1f} ms CPU (timer interval {self.interval * 1000:g} ms)", ""]
+
+        functions = sorted(self.function_samples(root).items(), key=lambda item: (-item[1][0], -item[1][1]))
+        width = max([len("function")] + [len(name) for name, _ in functions])
+        lines.append(f"{'function':<{width}}    self   total")
+        for name, (own, total) in functions:
+            lines.append(f"{name:<{width}}  {percent(own):>6}  {percent(total):>6}")
+        lines.append("")
+
+        self_lines, total_lines = self.line_samples()
+        lines.append("  self   total  line")
+        for number, text in enumerate(source.splitlines(), 1):
+            lines.append(f"{percent(self_lines[number]):>6}  {percent(total_lines[number]):>6}  {number:4d}  {text}")
+        return "\n".join(lines)
+
+
+def function_ranges(root: Node) -> List[Tuple[int, int, str]]:
+    """TOP_LEVEL 直下の FUNCTION の (開始行, 終了行, 関数名) を開始行の順に返す"""
+    ranges = []
+    for function in root.lhs if root.tag == Kind.TOP_LEVEL else [root]:
+        if function.span is not None:
+            ranges.append((function.span[0], function.span[2], str(function.lhs.lhs)))
+    return sorted(ranges)
+
+
+def function_at(ranges: List[Tuple[int, int, str]], starts: List[int], line: int) -> Optional[str]:
+    index = bisect_right(starts, line) - 1
+    if index >= 0 and line <= ranges[index][1]:
+        return ranges[index][2]
+    return None
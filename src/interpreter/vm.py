@@ -0,0 +1,196 @@
+from .bytecode import Op, CodeObject, Program
+from .memory import MAX_CALL_DEPTH, CallDepthError
+from .purity import MemoCache, MISSING
+
+
+class CallFrame:
+    """関数呼び出し 1 回分の状態。ローカル変数のリストごと再利用する"""
+    __slots__ = ("function_index", "code", "values", "blank", "pc", "memo_key")
+
+    def __init__(self, function_index: int, code: CodeObject):
+        self.function_index = function_index
+        self.code = code
+        # 引数は先頭 nparams 個のスロットに直接書き込む
+        self.values = [None] * code.nlocals
+        self.blank = (None,) * code.nlocals
+        self.pc = 0
+        # メモ化する呼び出しのキー。RETURN で戻り値をキャッシュに入れる
+        self.memo_key = None
+
+
+class VM:
+    """Compiler が生成したバイトコードを実行するスタックマシン。
+
+    関数呼び出しは Python の再帰を使わず、明示的なコールスタックで扱う。
+    memo に MemoCache を渡すと、純粋な関数（CodeObject.pure）の結果を引数ごとにキャッシュする。
+    """
+
+    def __init__(self, program: Program, max_depth: int = MAX_CALL_DEPTH, memo: MemoCache = None):
+        self.program = program
+        self.max_depth = max_depth
+        self.memo = memo
+        # 関数ごとの解放済みフレーム（フリーリスト）
+        self.__free_frames = [[] for _ in program.functions]
+        self.__entry = None
+
+    def run(self, entry: str = "main"):
+        index = self.program.function_index.get(entry)
+        if index is None:
+            raise ValueError(f"Function {entry} is not defined")
+        self.__entry = CallFrame(index, self.program.functions[index])
+        return self._execute(self.__entry)
+
+    def get_local(self, name: str):
+        """エントリ関数のローカル変数の値を返す（実行後の確認用）"""
+        if self.__entry is None or name not in self.__entry.code.local_names:
+            raise KeyError(f"Variable '{name}' not found in function scope '{self.__entry.code.name if self.__entry else None}'")
+        return self.__entry.values[self.__entry.code.local_names.index(name)]
+
+    def _execute(self, frame: CallFrame):
+        functions = self.program.functions
+        free_frames = self.__free_frames
+        max_depth = self.max_depth
+        memo = self.memo
+        # メモ化しない場合は None にして CALL での判定を 1 回で済ませる
+        memoized = [code.pure for code in functions] if memo is not None else None
+        call_stack = []
+        stack = []
+        push = stack.append
+        pop = stack.pop
+
+        instructions = frame.code.code
+        consts = frame.code.consts
+        local_values = frame.values
+        pc = 0
+
+        # グローバル参照を避けるため命令コードをローカルに束縛する
+        LOAD_CONST = Op.LOAD_CONST
+        LOAD_LOCAL = Op.LOAD_LOCAL
+        STORE_LOCAL = Op.STORE_LOCAL
+        POP = Op.POP
+        ADD = Op.ADD
+        SUB = Op.SUB
+        MUL = Op.MUL
+        DIV = Op.DIV
+        EQ = Op.EQ
+        NE = Op.NE
+        LT = Op.LT
+        GT = Op.GT
+        LE = Op.LE
+        GE = Op.GE
+        NEG = Op.NEG
+        NOT = Op.NOT
+        JUMP = Op.JUMP
+        JUMP_IF_FALSE = Op.JUMP_IF_FALSE
+        JUMP_IF_FALSE_OR_POP = Op.JUMP_IF_FALSE_OR_POP
+        JUMP_IF_TRUE_OR_POP = Op.JUMP_IF_TRUE_OR_POP
+        CALL = Op.CALL
+        RETURN = Op.RETURN
+
+        while True:
+            op = instructions[pc]
+            arg = instructions[pc + 1]
+            pc += 2
+
+            if op == LOAD_LOCAL:
+                push(local_values[arg])
+            elif op == LOAD_CONST:
+                push(consts[arg])
+            elif op == STORE_LOCAL:
+                local_values[arg] = pop()
+            elif op == ADD:
+                rhs = pop()
+                stack[-1] = stack[-1] + rhs
+            elif op == SUB:
+                rhs = pop()
+                stack[-1] = stack[-1] - rhs
+            elif op == MUL:
+                rhs = pop()
+                stack[-1] = stack[-1] * rhs
+            elif op == DIV:
+                rhs = pop()
+                stack[-1] = stack[-1] / rhs
+            elif op == LT:
+                rhs = pop()
+                stack[-1] = stack[-1] < rhs
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == CALL:
+                if len(call_stack) >= max_depth:
+                    raise CallDepthError(functions[arg].name, max_depth)
+                key = None
+                if memoized is not None and memoized[arg]:
+                    nparams = functions[arg].nparams
+                    args = tuple(stack[len(stack) - nparams:])
+                    # 1 と 1.0 を区別するため型もキーに含める
+                    key = (arg, args, tuple(map(type, args)))
+                    value = memo.lookup(key)
+                    if value is not MISSING:
+                        if nparams:
+                            del stack[-nparams:]
+                        push(value)
+                        continue
+                free = free_frames[arg]
+                callee = free.pop() if free else CallFrame(arg, functions[arg])
+                callee.memo_key = key
+                nparams = callee.code.nparams
+                if nparams:
+                    # 引数はスタックから呼び出し先のスロットへ直接移す
+                    callee.values[:nparams] = stack[-nparams:]
+                    del stack[-nparams:]
+                frame.pc = pc
+                call_stack.append(frame)
+                frame = callee
+                instructions = frame.code.code
+                consts = frame.code.consts
+                local_values = frame.values
+                pc = 0
+            elif op == RETURN:
+                # 戻り値はスタックの先頭に残したまま呼び出し元へ戻る
+                if not call_stack:
+                    return pop()
+                if frame.memo_key is not None:
+                    memo.store(frame.memo_key, stack[-1])
+                local_values[:] = frame.blank
+                free_frames[frame.function_index].append(frame)
+                frame = call_stack.pop()
+                instructions = frame.code.code
+                consts = frame.code.consts
+                local_values = frame.values
+                pc = frame.pc
+            elif op == GT:
+                rhs = pop()
+                stack[-1] = stack[-1] > rhs
+            elif op == LE:
+                rhs = pop()
+                stack[-1] = stack[-1] <= rhs
+            elif op == GE:
+                rhs = pop()
+                stack[-1] = stack[-1] >= rhs
+            elif op == EQ:
+                rhs = pop()
+                stack[-1] = stack[-1] == rhs
+            elif op == NE:
+                rhs = pop()
+                stack[-1] = stack[-1] != rhs
+            elif op == POP:
+                pop()
+            elif op == NEG:
+                stack[-1] = -stack[-1]
+            elif op == NOT:
+                stack[-1] = not stack[-1]
+            elif op == JUMP_IF_FALSE_OR_POP:
+                if not stack[-1]:
+                    pc = arg
+                else:
+                    pop()
+            elif op == JUMP_IF_TRUE_OR_POP:
+                if stack[-1]:
+                    pc = arg
+                else:
+                    pop()
+            else:
+                raise ValueError(f"Unknown opcode: {op}")
@@ -1,76 +1,169 @@
-from lark import Transformer
-from ..ast.node import Node
+from lark import Token
+from lark.visitors import Transformer_NonRecursive
+from ..ast.node import Node, Kind
+
+# 変換結果の形が変わったら上げる（パースキャッシュのキーに含まれる）
+TRANSFORMER_VERSION = 2
+
+# 深い式（左再帰の長い足し算など）でも再帰しないよう、後置順に並べてから変換する版を使う
+class CalcTransformer(Transformer_NonRecursive):
+    # span に足す行・列（transform の line / column から決まる）
+    __line_delta = 0
+    __column_delta = 0
+
+    def transform(self, tree, line: int = 1, column: int = 1):
+        """tree を Node の木に変換し、各ノードにソース上の位置を span として付ける。
+
+        line / column には、パースしたテキストの先頭がソース全体で何行何列目かを渡す（関数ごとにパースする場合）。
+        """
+        self.__line_delta = line - 1
+        self.__column_delta = column - 1
+        return super().transform(tree)
+
+    def _call_userfunc(self, tree, new_children=None):
+        result = super()._call_userfunc(tree, new_children)
+        # 子をそのまま返した規則（1 項だけの add_expr など）は、子の位置のほうが正確なので上書きしない
+        if result.__class__ is Node and result.span is None:
+            result.span = self._span(new_children if new_children is not None else tree.children)
+        return result
+
+    def _span(self, children):
+        """変換済みの子（ノードとトークン）の位置から規則全体の位置を求める。
+
+        propagate_positions を使うと lark のパースが 3 倍ほど遅くなるため、トークンが持つ位置から組み立てる。
+        "fn" や ";" のように木に残らないトークンは範囲に含まれない。
+        """
+        first = last = None
+        for child in children:
+            first = self._child_span(child)
+            if first is not None:
+                break
+        if first is None:
+            return None
+        for child in reversed(children):
+            last = self._child_span(child)
+            if last is not None:
+                break
+        if first is last:
+            # 子が 1 つなら同じタプルを共有する
+            return first
+        return (first[0], first[1], last[2], last[3])
+
+    def _child_span(self, child):
+        if child.__class__ is Node:
+            return child.span
+        if isinstance(child, Token) and child.line is not None:
+            if not self.__line_delta and not self.__column_delta:
+                return (child.line, child.column, child.end_line, child.end_column)
+            column_delta = self.__column_delta
+            return (
+                child.line + self.__line_delta,
+                child.column + (column_delta if child.line == 1 else 0),
+                child.end_line + self.__line_delta,
+                child.end_column + (column_delta if child.end_line == 1 else 0),
+            )
+        return None
 
-class CalcTransformer(Transformer):
     def top_level(self, tree):
-        return Node("TOP_LEVEL", tree)
+        return Node(Kind.TOP_LEVEL, tree)
 
     def function(self, tree):
         function_name = tree[0]  # 関数名
         type_annotation = None
         function_arguments = None
-        function_body = None
+        function_body = []
 
         index = 1
-        if tree[index].get_kind() == "PARAM_LIST":
+        if index < len(tree) and tree[index].tag == Kind.PARAM_LIST:
             function_arguments = tree[index]  # 関数の引数
             index += 1
-        if tree[index].get_kind() == "PRIMITIVE_TYPE":
+        if index < len(tree) and tree[index].tag in (Kind.PRIMITIVE_TYPE, Kind.ARRAY_TYPE):
             type_annotation = tree[index] # 型宣言
             index += 1
-        if tree[index].get_kind() == "STATEMENT":
+        if index < len(tree) and tree[index].tag == Kind.STATEMENT:
             function_body = tree[index: len(tree)]  # 関数本体
 
         print(f"関数名: {function_name}, 引数: {function_arguments}, 型: {type_annotation}, 本体: {function_body}")
-        return Node("FUNCTION", function_name, function_body, type_annotation)
+        return Node(Kind.FUNCTION, function_name, function_body, type_annotation, function_arguments)
 
     def statement(self, tree):
-        return Node("STATEMENT", tree[0])
+        return Node(Kind.STATEMENT, tree[0])
 
     def let(self, tree):
+        if len(tree) > 2:
+            # let x: 型 = 式;
+            return Node(Kind.LET, tree[0], tree[2], tree[1])
         if len(tree) > 1:
-            return Node("LET", tree[0], tree[1])
+            return Node(Kind.LET, tree[0], tree[1])
         return tree[0]
 
     def loop(self, tree):
-        return Node("LOOP", tree[0])
+        return Node(Kind.LOOP, list(tree))
 
     def if_stmt(self, tree):
-        return Node("IF", tree[0], tree[1])
+        condition = tree[0]
+        if len(tree) > 1 and tree[-1].tag == Kind.ELSE:
+            # if-else は IF ノードと else 側の本体の組で表す
+            return Node(Kind.IF_ELSE, Node(Kind.IF, condition, list(tree[1:-1])), tree[-1].lhs)
+        return Node(Kind.IF, condition, list(tree[1:]))
+
+    def else_block(self, tree):
+        return Node(Kind.ELSE, list(tree))
 
     def while_stmt(self, tree):
-        return Node("WHILE", tree[0], tree[1])
+        return Node(Kind.WHILE, tree[0], list(tree[1:]))
 
     def match_stmt(self, tree):
-        return Node("MATCH", tree[0], tree[1])
+        return Node(Kind.MATCH, tree[0], list(tree[1:]))
 
     def match_arm(self, tree):
-        return Node("MATCH_ARM", tree[0], tree[1])
+        return Node(Kind.MATCH_ARM, tree[0], tree[1])
 
     def return_stmt(self, tree):
         if len(tree) > 0:
-            return Node("RETURN", tree[0])
-        return Node("RETURN", None)
+            return Node(Kind.RETURN, tree[0])
+        return Node(Kind.RETURN, None)
 
     def expr(self, tree):
         if len(tree) > 1:
-            return Node("EXPR", tree[0], tree[1])
+            return Node(Kind.EXPR, tree[0], tree[1])
         return tree[0]
 
+    def or_expr(self, tree):
+        return Node(Kind.OR_EXPR, tree[0], tree[1])
+
     def and_expr(self, tree):
         if len(tree) > 1:
-            return Node("AND_EXPR", tree[0], tree[1])
+            return Node(Kind.AND_EXPR, tree[0], tree[1])
         return tree[0]
 
     def equality_expr(self, tree):
         if len(tree) > 1:
-            return Node("EQUALITY_EXPR", tree[0], tree[1])
+            return Node(Kind.EQUALITY_EXPR, tree[0], tree[1])
         return tree[0]
 
     def relational_expr(self, tree):
         if len(tree) > 1:
-            return Node("RELATIONAL_EXPR", tree[0], tree[1])
+            return Node(Kind.RELATIONAL_EXPR, tree[0], tree[1])
         return tree[0]
+
+    def eq_expr(self, tree):
+        return Node(Kind.EQ_EXPR, tree[0], tree[1])
+
+    def ne_expr(self, tree):
+        return Node(Kind.NE_EXPR, tree[0], tree[1])
+
+    def lt_expr(self, tree):
+        return Node(Kind.LT_EXPR, tree[0], tree[1])
+
+    def gt_expr(self, tree):
+        return Node(Kind.GT_EXPR, tree[0], tree[1])
+
+    def le_expr(self, tree):
+        return Node(Kind.LE_EXPR, tree[0], tree[1])
+
+    def ge_expr(self, tree):
+        return Node(Kind.GE_EXPR, tree[0], tree[1])
  
     def add_sub_expr(self, tree):
         return tree[0]
@@ -80,81 +173,116 @@ class CalcTransformer(Transformer):
 
     def add_expr(self, tree):
         if len(tree) > 1:
-            return Node("ADD_EXPR", tree[0], tree[1])
+            return Node(Kind.ADD_EXPR, tree[0], tree[1])
         return tree[0]
 
     def sub_expr(self, tree):
         if len(tree) > 1:
-            return Node("SUB_EXPR", tree[0], tree[1])
+            return Node(Kind.SUB_EXPR, tree[0], tree[1])
         return tree[0]
 
     def mul_expr(self, tree):
         if len(tree) > 1:
-            return Node("MUL_EXPR", tree[0], tree[1])
+            return Node(Kind.MUL_EXPR, tree[0], tree[1])
         return tree[0]
 
     def div_expr(self, tree):
         if len(tree) > 1:
-            return Node("DIV_EXPR", tree[0], tree[1])
+            return Node(Kind.DIV_EXPR, tree[0], tree[1])
         return tree[0]
 
     def unary_expr(self, tree):
         if len(tree) > 1:
-            return Node("UNARY_EXPR", tree[0], tree[1])
+            return Node(Kind.UNARY_EXPR, tree[0], tree[1])
         return tree[0]
 
+    def neg_expr(self, tree):
+        return Node(Kind.NEG_EXPR, tree[0])
+
+    def not_expr(self, tree):
+        return Node(Kind.NOT_EXPR, tree[0])
+
     def factor(self, tree):
-        return Node("FACTOR", tree[0])
+        return Node(Kind.FACTOR, tree[0])
 
     def function_call(self, tree):
         function_name = tree[0]
         arguments = tree[1:] if len(tree) > 1 else []
-        return Node("FUNCTION_CALL", function_name, arguments)
+        return Node(Kind.FUNCTION_CALL, function_name, arguments)
+
     def param_list(self, tree):
-        return Node("PARAM_LIST", tree)
+        return Node(Kind.PARAM_LIST, tree)
+
+    def param(self, tree):
+        return Node(Kind.PARAM, tree[0], tree[1])
 
     def arg_list(self, tree):
-        return Node("ARG_LIST", tree)
+        return Node(Kind.ARG_LIST, tree)
 
     def annotated_type(self, tree):
         if not tree:
             print("annotated_type: tree is empty")
-            return Node("TYPE", None)
+            return Node(Kind.TYPE, None)
 
         return tree[0]
 
     def number(self, tree):
-        return Node("NUM", tree[0])
+        return Node(Kind.NUM, tree[0])
 
     def float(self, tree):
-        return Node("FLOAT", tree[0])
+        return Node(Kind.FLOAT, tree[0])
 
     def identifier(self, tree):
-        return Node("ID", tree[0])
+        return Node(Kind.ID, tree[0])
 
     def string(self, tree):
-        return Node("STR", tree[0])
+        return Node(Kind.STR, tree[0])
 
     def boolean(self, tree):
-        return Node("BOOL", tree[0])
+        return Node(Kind.BOOL, tree[0])
 
     def primitive_i32(self, tree):
-        return Node("PRIMITIVE_TYPE", "i32")
+        return Node(Kind.PRIMITIVE_TYPE, "i32")
 
     def primitive_f64(self, tree):
-        return Node("PRIMITIVE_TYPE", "f64")
+        return Node(Kind.PRIMITIVE_TYPE, "f64")
 
     def primitive_bool(self, tree):
-        return Node("PRIMITIVE_TYPE", "bool")
+        return Node(Kind.PRIMITIVE_TYPE, "bool")
 
     def primitive_string_type(self, tree):
-        return Node("PRIMITIVE_TYPE", "String")
+        return Node(Kind.PRIMITIVE_TYPE, "String")
 
     def primitive_char(self, tree):
-        return Node("PRIMITIVE_TYPE", "char")
+        return Node(Kind.PRIMITIVE_TYPE, "char")
 
     def primitive_unit(self, tree):
-        return Node("PRIMITIVE_TYPE", "()")
+        return Node(Kind.PRIMITIVE_TYPE, "()")
 
     def array_type(self, tree):
-        return Node("ARRAY_TYPE", tree[0])
\ No newline at end of file
+        return Node(Kind.ARRAY_TYPE, tree[0])
+
+class InlineCalcTransformer:
+    """LALR のパース中に CalcTransformer の規則を適用するための、Lark(transformer=...) に渡すオブジェクト。
+
+    インラインの変換では lark が規則ごとのメソッドを子のリストで直接呼び、_call_userfunc を通らないので、
+    ここで包んで span を付ける。Tree を作らずにパースから Node の木が直接できる。
+    関数ごとのパース（transform の line / column）には対応しない。span はパースしたテキストの先頭からの位置になる。
+    """
+
+    def __init__(self, transformer: CalcTransformer = None):
+        self.__transformer = transformer if transformer is not None else CalcTransformer()
+
+    def __getattr__(self, name):
+        # lark は規則名（と終端記号名）で getattr する。メソッドのない名前は AttributeError のまま返し、lark の既定の処理に任せる
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = getattr(self.__transformer, name)
+        span = self.__transformer._span
+
+        def callback(children):
+            result = method(children)
+            if result.__class__ is Node and result.span is None:
+                result.span = span(children)
+            return result
+        return callback
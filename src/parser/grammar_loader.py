@@ -1,11 +1,27 @@
 from lark import Lark
 from lark.exceptions import GrammarError
+from .calc_transformer import CalcTransformer, InlineCalcTransformer
+from .standalone_parser import load_standalone_parser
 
-def load_grammar(grammar_path, start_rule):
+def load_grammar(grammar_path, start_rule, standalone_path=None, inline_transform=False):
+    # standalone_path を指定すると生成済みの表を使う。文法が変わっていれば .lark から作り直す
+    # inline_transform なら CalcTransformer をパース中に適用し、parse が Tree を作らずに Node の木を返す
+    transformer = InlineCalcTransformer() if inline_transform else None
+    if standalone_path is not None:
+        parser = load_standalone_parser(grammar_path, start_rule, standalone_path, transformer)
+        if parser is not None:
+            return parser
     try:
         with open(grammar_path, encoding="utf-8") as grammar_file:
             grammar = grammar_file.read()
-        return Lark(grammar, start=start_rule, parser="lalr", cache=True)
+        return Lark(grammar, start=start_rule, parser="lalr", cache=True, transformer=transformer)
     except GrammarError as e:
         print("文法定義にエラーがあります:", e)
-        raise
\ No newline at end of file
+        raise
+
+
+def parse_ast(parser, text):
+    """text をパースして Node の木を返す。inline_transform で作ったパーサーなら変換はパース中に済んでいる"""
+    if parser.options.transformer is not None:
+        return parser.parse(text)
+    return CalcTransformer().transform(parser.parse(text))
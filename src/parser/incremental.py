@@ -0,0 +1,233 @@
+import io
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from lark.exceptions import UnexpectedInput
+from ..ast.node import Node, Kind
+from ..interpreter.resolver import Resolver, Scope
+from .calc_transformer import CalcTransformer
+from .stream_parser import split_functions, parse_function
+
+
+class TextEdit:
+    """ソースの start 〜 end（文字オフセット、end は含まない）を text に置き換える編集"""
+    __slots__ = ("start", "end", "text")
+
+    def __init__(self, start: int, end: int, text: str):
+        self.start = start
+        self.end = end
+        self.text = text
+
+    @classmethod
+    def from_range(cls, source: str, start: Tuple[int, int], end: Tuple[int, int], text: str) -> "TextEdit":
+        """(行, 列)（どちらも 1 始まり）の範囲から編集を作る"""
+        return cls(offset_of(source, *start), offset_of(source, *end), text)
+
+    def __repr__(self):
+        return f"TextEdit({self.start}, {self.end}, {self.text!r})"
+
+
+class Diagnostic:
+    """関数 1 つ分の検査結果、または構文エラー。function は構文エラーのとき None"""
+    __slots__ = ("function", "message", "line", "column")
+
+    def __init__(self, function: Optional[str], message: str, line: int, column: int):
+        self.function = function
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def __repr__(self):
+        return f"Diagnostic({self.line}:{self.column} {self.message})"
+
+
+def offset_of(source: str, line: int, column: int) -> int:
+    offset = 0
+    for _ in range(line - 1):
+        offset = source.index("\n", offset) + 1
+    return offset + column - 1
+
+
+def position_of(source: str, offset: int) -> Tuple[int, int]:
+    line = source.count("\n", 0, offset) + 1
+    return line, offset - source.rfind("\n", 0, offset)
+
+
+def type_text(node: Optional[Node]) -> str:
+    if node is None:
+        return ""
+    if node.tag == Kind.ARRAY_TYPE:
+        return f"[{type_text(node.lhs)}]"
+    return str(node.lhs)
+
+
+def function_signature(function: Node) -> Tuple:
+    """呼び出し側の検査結果が依存する部分（引数の名前と型・戻り値の型）"""
+    params = function.params.lhs if function.params is not None else []
+    return tuple((str(param.lhs.lhs), type_text(param.rhs)) for param in params), type_text(function.type)
+
+
+def called_functions(function: Node) -> Set[str]:
+    called = set()
+    stack = list(function.rhs or [])
+    while stack:
+        node = stack.pop()
+        if node.tag == Kind.FUNCTION_CALL:
+            called.add(str(node.lhs.lhs))
+        stack.extend(node.children())
+    return called
+
+
+def resolver_checker(document: "IncrementalDocument", function: Node) -> List[str]:
+    """Resolver で関数 1 つを検査する（未定義の変数・関数、引数の数）"""
+    resolver = Resolver()
+    resolver.scopes = document.scopes
+    resolver.resolve_function(function)
+    return resolver.errors
+
+
+class _Item:
+    """トップレベルの関数 1 つ分のテキスト範囲と、そこから作ったノード・検査結果"""
+    __slots__ = ("start", "end", "node", "error", "name", "name_offset", "signature", "calls", "messages")
+
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.end = end
+        self.node = None
+        self.error = None
+        self.name = None
+        self.name_offset = 0
+        self.signature = None
+        self.calls = set()
+        # None は未検査（または無効化済み）
+        self.messages = None
+
+
+class IncrementalDocument:
+    """編集のたびに、変更のあった関数だけをパースし直して TOP_LEVEL に差し替えるソース。
+
+    検査結果は関数ごとに保持し、編集された関数と、シグネチャが変わった関数の呼び出し元だけを
+    検査し直す。parser は開始規則が function のもの（load_grammar(path, "function")）を渡す。
+    """
+
+    def __init__(self, text: str, parser, checker: Callable[["IncrementalDocument", Node], List[str]] = resolver_checker):
+        self.parser = parser
+        self.checker = checker
+        self.transformer = CalcTransformer()
+        self.text = ""
+        self.items: List[_Item] = []
+        self.root = Node(Kind.TOP_LEVEL, [])
+        # 関数名 → シグネチャから作ったスコープ（Resolver が呼び出し先の引数の数を調べるのに使う）
+        self.scopes: Dict[str, Scope] = {}
+        self.definitions: Dict[str, List[_Item]] = {}
+        self.callers: Dict[str, Set[_Item]] = {}
+        self.reparsed = 0
+        self.checks = 0
+        self.apply_edit(TextEdit(0, 0, text))
+
+    def apply_edit(self, edit: TextEdit) -> Set[str]:
+        """編集を適用し、検査結果が無効になった関数名を返す"""
+        if not 0 <= edit.start <= edit.end <= len(self.text):
+            raise ValueError(f"Edit range {edit.start}-{edit.end} is outside the document (length {len(self.text)})")
+        old_text = self.text
+        text = old_text[:edit.start] + edit.text + old_text[edit.end:]
+        delta = len(edit.text) - (edit.end - edit.start)
+        items = self.items
+
+        # 編集位置を含む関数から切り出し直し、旧い境界と一致したところで止める
+        first = max(0, bisect_right(items, edit.start, key=lambda item: item.start) - 1)
+        region_start = items[first].start if items else 0
+        resync = len(items)
+        new_items = []
+        j = first
+        for piece, offset, _, _ in split_functions(io.StringIO(text[region_start:])):
+            start = region_start + offset
+            end = start + len(piece)
+            new_items.append(self._parse_item(piece, start, end))
+            while j < len(items) and (items[j].end < edit.end or items[j].end + delta < end):
+                j += 1
+            if j < len(items) and items[j].end + delta == end:
+                resync = j + 1
+                break
+
+        old_items = items[first:resync]
+        items[first:resync] = new_items
+        for item in items[first + len(new_items):]:
+            item.start += delta
+            item.end += delta
+        self.text = text
+        self.reparsed += len(new_items)
+        self.root.lhs[:] = [item.node for item in items if item.node is not None]
+        return self._invalidate(old_items, new_items)
+
+    def diagnostics(self) -> List[Diagnostic]:
+        """構文エラーと関数ごとの検査結果。無効化された関数だけを検査し直す"""
+        result = []
+        for item in self.items:
+            if item.error is not None:
+                line, column = position_of(self.text, item.start + max(item.error.pos_in_stream, 0))
+                # lark のメッセージに含まれる行・列は関数の先頭からの相対位置なので落とす
+                message = str(item.error).splitlines()[0].split(" at line ")[0]
+                result.append(Diagnostic(None, message, line, column))
+                continue
+            if item.messages is None:
+                self.checks += 1
+                messages = list(self.checker(self, item.node))
+                if len(self.definitions[item.name]) > 1:
+                    messages.insert(0, f"Function {item.name} is defined more than once")
+                item.messages = messages
+            if item.messages:
+                line, column = position_of(self.text, item.start + item.name_offset)
+                result.extend(Diagnostic(item.name, message, line, column) for message in item.messages)
+        return result
+
+    def _parse_item(self, piece: str, start: int, end: int) -> _Item:
+        item = _Item(start, end)
+        try:
+            # 位置は関数の先頭からの相対位置のまま持ち、報告するときに絶対位置へ直す
+            item.node = parse_function(self.parser, self.transformer, piece, 0, 1, 1)
+        except UnexpectedInput as e:
+            item.error = e
+            return item
+        name = item.node.lhs.lhs
+        item.name = str(name)
+        item.name_offset = getattr(name, "start_pos", 0) or 0
+        item.signature = function_signature(item.node)
+        item.calls = called_functions(item.node)
+        return item
+
+    def _invalidate(self, old_items: List[_Item], new_items: List[_Item]) -> Set[str]:
+        old_signatures = {}
+        for item in old_items:
+            if item.node is None:
+                continue
+            old_signatures.setdefault(item.name, item.signature)
+            self.definitions[item.name].remove(item)
+            for callee in item.calls:
+                self.callers[callee].discard(item)
+
+        new_signatures = {}
+        invalidated = set()
+        for item in new_items:
+            if item.node is None:
+                continue
+            new_signatures.setdefault(item.name, item.signature)
+            self.definitions.setdefault(item.name, []).append(item)
+            for callee in item.calls:
+                self.callers.setdefault(callee, set()).add(item)
+            invalidated.add(item.name)
+
+        # 追加・削除・シグネチャの変更があった関数は、呼び出し元と同名の定義も検査し直す
+        for name in set(old_signatures) | set(new_signatures):
+            if old_signatures.get(name) == new_signatures.get(name):
+                continue
+            definitions = self.definitions.get(name)
+            if definitions:
+                self.definitions[name].sort(key=lambda item: item.start)
+                self.scopes[name] = Scope(name, [param for param, _ in definitions[0].signature[0]])
+            else:
+                self.definitions.pop(name, None)
+                self.scopes.pop(name, None)
+            for item in list(self.callers.get(name, ())) + list(definitions or ()):
+                item.messages = None
+                invalidated.add(item.name)
+        return invalidated
@@ -0,0 +1,240 @@
+import os
+import hashlib
+import marshal
+import tempfile
+from array import array
+from typing import Optional
+from ..ast.node import Node, KIND_NAMES
+from .calc_transformer import TRANSFORMER_VERSION
+from .grammar_loader import parse_ast
+
+DEFAULT_CACHE_DIR = ".parse_cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# 直列化形式の版。形式を変えたら上げる
+FORMAT_VERSION = 2
+
+# 直列化用の命令
+_NONE = 0
+_STR = 1
+_INT = 2
+_LIST = 3
+_NODE = 4
+# span を持つノード。span の 4 つの整数は spans に並べる
+_SPANNED_NODE = 5
+# 直前に書いたノードと同じ span を持つノード（1 項だけの規則の包みのノードなど）
+_SAME_SPAN_NODE = 6
+
+# Kind のタグ番号が変わった場合もキャッシュを無効にする
+_KIND_TABLE_HASH = hashlib.sha256(",".join(KIND_NAMES).encode("utf-8")).hexdigest()
+
+
+def encode_ast(root: Node) -> bytes:
+    """AST を後置記法のフラットな列に変換して marshal で直列化する（深い木でも再帰しない）。
+
+    命令とタグは 1 バイトずつ ops に、文字列・整数・リスト長は values に並べる。
+    ノードの span は行・列を整数の配列（すべて 65535 以下なら 2 バイトずつ）に詰めて保存する。
+    同じ文字列は同じオブジェクトにそろえ、marshal の参照で 1 度だけ保存されるようにする。
+    """
+    ops = bytearray()
+    values = []
+    strings = {}
+    spans = []
+    last_span = None
+    stack = [(root, False)]
+    while stack:
+        value, expanded = stack.pop()
+        if isinstance(value, Node):
+            if expanded:
+                span = value.span
+                if span is None:
+                    ops.append(_NODE)
+                elif span == last_span:
+                    ops.append(_SAME_SPAN_NODE)
+                else:
+                    ops.append(_SPANNED_NODE)
+                    spans.extend(span)
+                    last_span = span
+                ops.append(value.tag)
+            else:
+                stack.append((value, True))
+                stack.append((value.params, False))
+                stack.append((value.type, False))
+                stack.append((value.rhs, False))
+                stack.append((value.lhs, False))
+        elif isinstance(value, list):
+            if expanded:
+                ops.append(_LIST)
+                values.append(len(value))
+            else:
+                stack.append((value, True))
+                for item in reversed(value):
+                    stack.append((item, False))
+        elif value is None:
+            ops.append(_NONE)
+        elif isinstance(value, int):
+            ops.append(_INT)
+            values.append(value)
+        elif isinstance(value, str):
+            # lark の Token も str として保存する
+            text = str(value)
+            ops.append(_STR)
+            values.append(strings.setdefault(text, text))
+        else:
+            raise ValueError(f"Cannot serialize AST value: {value!r}")
+    typecode = "H" if max(spans, default=0) <= 0xFFFF else "L"
+    return marshal.dumps((bytes(ops), values, typecode, array(typecode, spans).tobytes()))
+
+
+def decode_ast(data: bytes) -> Node:
+    """encode_ast の逆変換"""
+    ops, values, typecode, span_bytes = marshal.loads(data)
+    spans = array(typecode, span_bytes)
+    span_index = 0
+    span = None
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    value_index = 0
+    index = 0
+    length = len(ops)
+    while index < length:
+        op = ops[index]
+        if op == _NODE or op == _SPANNED_NODE or op == _SAME_SPAN_NODE:
+            params = pop()
+            annotated_type = pop()
+            rhs = pop()
+            lhs = pop()
+            node = Node(ops[index + 1], lhs, rhs, annotated_type, params)
+            if op == _SPANNED_NODE:
+                span = tuple(spans[span_index:span_index + 4])
+                span_index += 4
+            if op != _NODE:
+                # 同じ span は同じタプルを共有する
+                node.span = span
+            push(node)
+            index += 2
+            continue
+        if op == _STR or op == _INT:
+            push(values[value_index])
+            value_index += 1
+        elif op == _NONE:
+            push(None)
+        elif op == _LIST:
+            count = values[value_index]
+            value_index += 1
+            items = stack[len(stack) - count:]
+            del stack[len(stack) - count:]
+            push(items)
+        else:
+            raise ValueError(f"Broken AST cache entry (opcode {op})")
+        index += 1
+    if len(stack) != 1:
+        raise ValueError("Broken AST cache entry")
+    return stack[0]
+
+
+class ParseCache:
+    """変換済み AST のディスクキャッシュ。
+
+    キーはソース・文法・Transformer の版のハッシュで、容量を超えたら
+    最後に使われた時刻（mtime）が古いものから削除する。
+    """
+
+    def __init__(self, grammar_path: str, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # キャッシュ全体の大きさの見積もり。保存のたびにディレクトリを走査しないよう、最初の 1 回だけ数える
+        self._size = None
+        with open(grammar_path, "rb") as grammar_file:
+            self.grammar_hash = hashlib.sha256(grammar_file.read()).hexdigest()
+
+    def key(self, source: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{FORMAT_VERSION}:{TRANSFORMER_VERSION}:{_KIND_TABLE_HASH}:{self.grammar_hash}:".encode("utf-8"))
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".ast")
+
+    def load(self, source: str) -> Optional[Node]:
+        path = self._path(self.key(source))
+        try:
+            with open(path, "rb") as cache_file:
+                root = decode_ast(cache_file.read())
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (ValueError, EOFError, TypeError, IndexError):
+            # 壊れたエントリは削除してミス扱いにする
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        # LRU のため最終使用時刻を更新する
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return root
+
+    def store(self, source: str, root: Node) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data = encode_ast(root)
+        # 並行実行しても壊れたファイルが見えないよう、一時ファイルから置き換える
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, self._path(self.key(source)))
+        except OSError:
+            self._remove(temp_path)
+            raise
+        if self._size is None:
+            self.evict()
+        else:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self.evict()
+
+    def parse(self, parser, source: str) -> Node:
+        """キャッシュにあればそれを返し、なければパース・変換して保存する（parser はインラインの変換でもよい）"""
+        root = self.load(source)
+        if root is None:
+            root = parse_ast(parser, source)
+            self.store(source, root)
+        return root
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".ast"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+        self._size = total
+
+    def clear(self) -> None:
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".ast"):
+                    self._remove(entry.path)
+        self._size = None
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,84 @@
+import os
+import hashlib
+import tempfile
+import importlib.util
+from typing import Optional
+import lark
+from lark import Lark
+from lark.lexer import TerminalDef
+from lark.grammar import Rule
+
+DEFAULT_STANDALONE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calc_parser_standalone.py")
+
+# 生成するモジュールの形式の版。形式を変えたら上げる
+STANDALONE_VERSION = 1
+
+_HEADER = '''"""calc_grammar.lark から生成した LALR パーサーの表。手で編集しないこと。
+
+scripts/build_parser.py で再生成する。
+"""
+'''
+
+
+def grammar_hash(grammar_path: str, start_rule: str) -> str:
+    """文法ファイルの内容と開始規則から照合用のハッシュを作る"""
+    with open(grammar_path, "rb") as grammar_file:
+        grammar = grammar_file.read()
+    digest = hashlib.sha256()
+    digest.update(f"{STANDALONE_VERSION}:{start_rule}:".encode("utf-8"))
+    digest.update(grammar)
+    return digest.hexdigest()
+
+
+def build_standalone_parser(grammar_path: str, start_rule: str, output_path: str = DEFAULT_STANDALONE_PATH) -> str:
+    """文法を解析し、LALR の表を Python のリテラルとして持つモジュールを書き出す。
+
+    読み込み時は文法の解析を行わず、表から直接パーサーを組み立てる。
+    """
+    with open(grammar_path, encoding="utf-8") as grammar_file:
+        parser = Lark(grammar_file.read(), start=start_rule, parser="lalr")
+    data, memo = parser.memo_serialize([TerminalDef, Rule])
+
+    source = "".join([
+        _HEADER,
+        f"GRAMMAR_HASH = {grammar_hash(grammar_path, start_rule)!r}\n",
+        f"START = {start_rule!r}\n",
+        f"LARK_VERSION = {lark.__version__!r}\n",
+        f"DATA = {data!r}\n",
+        f"MEMO = {memo!r}\n",
+    ])
+
+    # 生成途中のファイルが読み込まれないよう、一時ファイルから置き換える
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    fd, temp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as temp_file:
+            temp_file.write(source)
+        os.replace(temp_path, output_path)
+    except OSError:
+        os.remove(temp_path)
+        raise
+    return output_path
+
+
+def load_standalone_parser(
+    grammar_path: str, start_rule: str, standalone_path: str = DEFAULT_STANDALONE_PATH, transformer=None,
+) -> Optional[Lark]:
+    """生成済みモジュールからパーサーを作る。transformer を渡すとパース中に適用する（Lark の transformer）。
+
+    モジュールがない、または文法・開始規則・lark の版が生成時と異なる場合は None を返す。
+    """
+    if not os.path.exists(standalone_path):
+        return None
+    spec = importlib.util.spec_from_file_location("_calc_parser_standalone", standalone_path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except (SyntaxError, ValueError):
+        return None
+
+    if getattr(module, "GRAMMAR_HASH", None) != grammar_hash(grammar_path, start_rule):
+        return None
+    if getattr(module, "LARK_VERSION", None) != lark.__version__:
+        return None
+    return Lark._load_from_dict(module.DATA, module.MEMO, transformer=transformer)
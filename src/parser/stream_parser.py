@@ -0,0 +1,113 @@
+import re
+from typing import Iterator, TextIO, Tuple
+from lark.exceptions import UnexpectedInput
+from ..ast.node import Node
+from .calc_transformer import CalcTransformer
+
+CHUNK_SIZE = 64 * 1024
+
+# 関数の境界を探すときに意味を持つ字句。文字列・コメント中の括弧は数えない
+_SPECIAL = re.compile(r'"|//|/\*|[{}]')
+_COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+
+
+def split_functions(stream: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, int, int, int]]:
+    """ソースを少しずつ読み、トップレベルの関数 1 つ分ずつの文字列に分割する。
+
+    関数本体の波括弧の対応で境界を決めるので、保持するのは読みかけの関数 1 つ分だけで済む。
+    (テキスト, 開始位置, 開始行, 開始列) を返す。関数の間の空白やコメントは次の関数の先頭に含める。
+    """
+    buffer = ""
+    start = 0
+    pos = 0
+    depth = 0
+    offset = 0
+    line = 1
+    column = 1
+    eof = False
+
+    while True:
+        match = _SPECIAL.search(buffer, pos)
+        end = None
+        if match is not None:
+            token = match.group()
+            if token == '"':
+                end = buffer.find('"', match.end())
+                end = None if end < 0 else end + 1
+            elif token == "//":
+                end = buffer.find("\n", match.end())
+                if end >= 0:
+                    end += 1
+                else:
+                    end = len(buffer) if eof else None
+            elif token == "/*":
+                end = buffer.find("*/", match.end())
+                end = None if end < 0 else end + 2
+            else:
+                end = match.end()
+                depth += 1 if token == "{" else -1
+
+        if end is not None:
+            pos = end
+            if match.group() == "}" and depth <= 0:
+                text = buffer[start:pos]
+                yield text, offset, line, column
+                offset += len(text)
+                newlines = text.count("\n")
+                if newlines:
+                    line += newlines
+                    column = len(text) - text.rfind("\n")
+                else:
+                    column += len(text)
+                start = pos
+                depth = 0
+            continue
+
+        # 字句が読みかけのまま終わっている（文字列やコメントの途中・"/" で切れた）ので続きを読む
+        if eof:
+            break
+        if match is not None:
+            pos = match.start()
+        else:
+            pos = max(pos, start, len(buffer) - 1)
+        chunk = stream.read(chunk_size)
+        if chunk:
+            # 返し終えた部分は捨てる
+            buffer = buffer[start:] + chunk
+            pos -= start
+            start = 0
+        else:
+            eof = True
+
+    # 最後の関数の後に残った部分。空白とコメントだけなら捨て、そうでなければパーサーにエラーを報告させる
+    rest = buffer[start:]
+    if _COMMENT.sub("", rest).strip():
+        yield rest, offset, line, column
+
+
+def parse_function(parser, transformer: CalcTransformer, text: str, offset: int, line: int, column: int) -> Node:
+    """split_functions で切り出した関数 1 つをパース・変換する。
+
+    構文エラーの位置とノードの span は、ファイル全体での行・列に直す。
+    """
+    try:
+        tree = parser.parse(text)
+    except UnexpectedInput as e:
+        if e.line < 1:
+            raise
+        if e.line == 1:
+            e.column += column - 1
+        e.line += line - 1
+        e.pos_in_stream += offset
+        raise
+    return transformer.transform(tree, line, column)
+
+
+def iter_functions(stream: TextIO, parser, chunk_size: int = CHUNK_SIZE) -> Iterator[Node]:
+    """関数ごとにパース・変換し、FUNCTION ノードを届いた順に返す。
+
+    parser は開始規則が function のもの（load_grammar(path, "function")）を渡す。
+    """
+    transformer = CalcTransformer()
+    for text, offset, line, column in split_functions(stream, chunk_size):
+        yield parse_function(parser, transformer, text, offset, line, column)
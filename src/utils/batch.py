@@ -0,0 +1,178 @@
+import io
+import os
+import glob
+import json
+import time
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from lark.exceptions import UnexpectedInput
+from ..interpreter.eval import Eval
+from ..interpreter.optimizer import Optimizer
+from ..interpreter.resolver import Resolver
+from ..parser.grammar_loader import load_grammar, parse_ast
+from ..parser.parse_cache import ParseCache
+from .generator import Generator
+
+SOURCE_SUFFIX = ".rs"
+
+# ワーカープロセスごとに 1 度だけ読み込むパーサーとキャッシュ
+_worker_parser = None
+_worker_cache = None
+_worker_optimize = True
+
+
+def collect_sources(inputs: List[str], manifest: Optional[str] = None) -> List[str]:
+    """ディレクトリ（再帰的に *.rs）・glob パターン・ファイル・マニフェストから入力ファイルを集める。
+
+    マニフェストは 1 行に 1 パス（マニフェストのあるディレクトリからの相対パス可、# 以降はコメント）。
+    重複を除いて並べ替えた絶対パスを返す。
+    """
+    patterns = list(inputs)
+    if manifest is not None:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, encoding="utf-8") as manifest_file:
+            for line in manifest_file:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    patterns.append(line if os.path.isabs(line) else os.path.join(base, line))
+
+    sources = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            sources.update(glob.glob(os.path.join(pattern, "**", "*" + SOURCE_SUFFIX), recursive=True))
+        elif glob.has_magic(pattern):
+            sources.update(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+        elif os.path.isfile(pattern):
+            sources.add(pattern)
+        else:
+            raise ValueError(f"No such source file or directory: {pattern}")
+    return sorted(os.path.abspath(source) for source in sources)
+
+
+def output_paths(sources: List[str], output_dir: str) -> List[str]:
+    """入力ファイルに共通するディレクトリからの相対パスを output_dir の下に写す"""
+    if not sources:
+        return []
+    base = os.path.commonpath([os.path.dirname(source) for source in sources])
+    return [os.path.join(output_dir, os.path.relpath(source, base)) for source in sources]
+
+
+def _init_worker(grammar_path: str, standalone_path: Optional[str], use_cache: bool, optimize: bool = True) -> None:
+    global _worker_parser, _worker_cache, _worker_optimize
+    _worker_optimize = optimize
+    _worker_parser = load_grammar(grammar_path, "top_level", standalone_path, inline_transform=True)
+    _worker_cache = ParseCache(grammar_path) if use_cache else None
+
+
+def _diagnostic(kind: str, message: str, line: int = None, column: int = None) -> Dict:
+    return {"kind": kind, "message": message, "line": line, "column": column}
+
+
+def compile_file(task) -> Dict:
+    """ファイル 1 つをパース・検査し、スクリプトを生成する。ワーカーで _init_worker の後に呼ぶ"""
+    source, output = task
+    started = time.perf_counter()
+    diagnostics = []
+    try:
+        with open(source, encoding="utf-8") as source_file:
+            text = source_file.read()
+    except (OSError, UnicodeDecodeError) as e:
+        # 読めないファイルもそのファイルだけの失敗として報告し、他のファイルの処理は続ける
+        return {
+            "source": source,
+            "output": None,
+            "ok": False,
+            "diagnostics": [_diagnostic("read", f"{type(e).__name__}: {e}")],
+            "seconds": time.perf_counter() - started,
+        }
+
+    # 変換や生成の途中の表示はまとめの報告に含めない
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            if _worker_cache is not None:
+                root = _worker_cache.parse(_worker_parser, text)
+            else:
+                root = parse_ast(_worker_parser, text)
+        except UnexpectedInput as e:
+            root = None
+            diagnostics.append(_diagnostic("syntax", str(e).splitlines()[0], e.line, e.column))
+
+        if root is not None:
+            try:
+                Resolver().resolve(root)
+            except ValueError as e:
+                diagnostics.extend(_diagnostic("resolve", message) for message in str(e).splitlines())
+
+            evaluator = Eval(root, verbose=False)
+            try:
+                evaluator.check()
+            except ValueError as e:
+                diagnostics.append(_diagnostic("type", str(e)))
+            diagnostics.extend(_diagnostic("type", message) for message in evaluator.errors)
+
+            # 最適化や生成に失敗しても他のファイルの処理は続ける
+            if _worker_optimize:
+                try:
+                    Optimizer().optimize(root)
+                except Exception as e:
+                    # 書き換えの途中の木は生成しない
+                    root = None
+                    diagnostics.append(_diagnostic("optimize", f"{type(e).__name__}: {e}"))
+
+        if root is not None:
+            try:
+                Generator(output_dir=os.path.dirname(output)).generate(root, os.path.basename(output))
+            except Exception as e:
+                root = None
+                diagnostics.append(_diagnostic("generate", f"{type(e).__name__}: {e}"))
+
+    return {
+        "source": source,
+        "output": output if root is not None else None,
+        "ok": not diagnostics,
+        "diagnostics": diagnostics,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def run_batch(sources: List[str], output_dir: str, grammar_path: str, workers: Optional[int] = None,
+              standalone_path: Optional[str] = None, use_cache: bool = True, optimize: bool = True) -> Dict:
+    """入力ファイルをプロセスプールに振り分けて処理し、ファイルごとの結果と集計を返す。
+
+    パーサーはワーカーごとに 1 度だけ読み込む。結果は入力の順に並ぶ。
+    """
+    started = time.perf_counter()
+    outputs = output_paths(sources, output_dir)
+    # ワーカー同士が同じディレクトリを作ろうとして競合しないよう、先に作っておく
+    for directory in sorted({os.path.dirname(output) for output in outputs}):
+        os.makedirs(directory, exist_ok=True)
+
+    tasks = list(zip(sources, outputs))
+    workers = workers or os.cpu_count() or 1
+    init_args = (grammar_path, standalone_path, use_cache, optimize)
+    if workers > 1 and len(tasks) > 1:
+        # 小さなファイルが多いときのプロセス間通信を減らすため、まとめて渡す
+        chunksize = max(1, len(tasks) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+            files = list(pool.map(compile_file, tasks, chunksize=chunksize))
+    else:
+        _init_worker(*init_args)
+        files = [compile_file(task) for task in tasks]
+
+    failed = [result for result in files if not result["ok"]]
+    return {
+        "files": files,
+        "summary": {
+            "files": len(files),
+            "failed": len(failed),
+            "diagnostics": sum(len(result["diagnostics"]) for result in files),
+            "workers": workers,
+            "seconds": time.perf_counter() - started,
+        },
+    }
+
+
+def write_report(report: Dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, ensure_ascii=False, indent=2)
@@ -0,0 +1,236 @@
+import io
+import json
+import time
+import platform
+import contextlib
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+import lark
+from ..interpreter.compiler import Compiler
+from ..interpreter.eval import Eval
+from ..interpreter.interpreter import Interpreter
+from ..interpreter.vm import VM
+from ..parser.calc_transformer import CalcTransformer
+from ..parser.grammar_loader import load_grammar
+from .emitter import RustEmitter
+from .generator import Generator
+
+# 結果の JSON の形が変わったら上げる（形の違う基準とは比べない）
+RESULTS_VERSION = 1
+# parse_inline は CalcTransformer をパース中に適用したパース（main.py・batch.py の経路）。parse + transform と比べる
+STAGES = ("parse", "transform", "parse_inline", "check", "execute", "generate")
+DEFAULT_THRESHOLD = 0.2
+# これより短い段は揺らぎのほうが大きいので比べない（秒）
+DEFAULT_MIN_TIME = 0.001
+
+
+def deep_expression(terms: int) -> str:
+    """terms 項の足し算 1 つ（左再帰で深さ terms の木になる）"""
+    expression = " + ".join(f"(a - {i}) * {i % 7 + 1}" for i in range(terms))
+    return f"fn main() -> i32 {{\n    let a = 3;\n    let x = {expression};\n    return x;\n}}"
+
+
+def many_functions(functions: int) -> str:
+    """小さな関数 functions 個と、それをすべて呼ぶ main"""
+    lines = [f"fn f{i}(a: i32) -> i32 {{\n    let y = a * 2 + {i};\n    return y - a;\n}}" for i in range(functions)]
+    calls = " + ".join(f"f{i}({i})" for i in range(functions))
+    lines.append(f"fn main() -> i32 {{\n    let x = {calls};\n    return x;\n}}")
+    return "\n".join(lines)
+
+
+def long_loop(iterations: int) -> str:
+    """iterations 回まわる while ループ"""
+    return (
+        f"fn main() -> i32 {{\n    let i = 0;\n    let x = 0;\n    while i < {iterations} {{\n"
+        f"        let x = x + i * 2 - 1;\n        let i = i + 1;\n    }}\n    return x;\n}}"
+    )
+
+
+def deep_recursion(depth: int) -> str:
+    """深さ depth まで自分を呼ぶ関数（depth は memory.MAX_CALL_DEPTH より小さくする）"""
+    return (
+        f"fn depth(n: i32) -> i32 {{\n    if n < 1 {{\n        return 0;\n    }}\n    return depth(n - 1) + 1;\n}}\n"
+        f"fn main() -> i32 {{\n    let x = depth({depth});\n    return x;\n}}"
+    )
+
+
+class Program(NamedTuple):
+    build: Callable[[int], str]
+    # 大きさの名前 → build に渡す値
+    sizes: Dict[str, int]
+    # execute の段で使う実行器。ループと再帰は Interpreter だと let ごとの表示が時間の大半になるので、main.py の既定の VM で測る
+    executor: str
+
+
+PROGRAMS: Dict[str, Program] = {
+    "deep_expression": Program(deep_expression, {"small": 100, "medium": 500, "large": 2000}, "interpreter"),
+    "many_functions": Program(many_functions, {"small": 20, "medium": 100, "large": 400}, "interpreter"),
+    "long_loop": Program(long_loop, {"small": 1000, "medium": 10000, "large": 50000}, "vm"),
+    "deep_recursion": Program(deep_recursion, {"small": 100, "medium": 400, "large": 900}, "vm"),
+}
+SIZE_NAMES = ("small", "medium", "large")
+
+
+def execute(root, executor: str):
+    """root の main を実行し、main の変数 x の値を返す"""
+    if executor == "interpreter":
+        return Interpreter(root).execute().get_variable("x").get_value()
+    if executor == "vm":
+        vm = VM(Compiler().compile(root))
+        vm.run()
+        return vm.get_local("x")
+    raise ValueError(f"Unknown executor: {executor}")
+
+
+def run_stages(parser, source: str, executor: str, inline_parser=None) -> Dict[str, float]:
+    """source を 1 度だけ通しで処理し、段ごとの経過時間（秒）を返す。inline_parser があれば parse_inline の段も測る"""
+    clock = time.perf_counter
+    times = {}
+    start = clock()
+    tree = parser.parse(source)
+    times["parse"] = clock() - start
+
+    start = clock()
+    root = CalcTransformer().transform(tree)
+    times["transform"] = clock() - start
+
+    if inline_parser is not None:
+        start = clock()
+        inline_parser.parse(source)
+        times["parse_inline"] = clock() - start
+
+    start = clock()
+    evaluator = Eval(root, verbose=False)
+    if not evaluator.check():
+        raise ValueError(f"Benchmark program failed to type-check: {evaluator.errors}")
+    times["check"] = clock() - start
+
+    start = clock()
+    execute(root, executor)
+    times["execute"] = clock() - start
+
+    start = clock()
+    Generator(emitter=RustEmitter(output_dir=None)).generate(root)
+    times["generate"] = clock() - start
+    return times
+
+
+def run_benchmarks(
+    grammar_path: str,
+    programs: Optional[Sequence[str]] = None,
+    sizes: Sequence[str] = SIZE_NAMES,
+    repeat: int = 5,
+) -> dict:
+    """programs × sizes の各ケースを repeat 回ずつ処理し、段ごとに最も速かった回の時間を記録する。
+
+    ケースごとに毎回パースからやり直すので、check や execute が木に残した状態は次の回に持ち越さない。
+    load_grammar は入力によらないので "grammar" ケースとして 1 つだけ記録する（lark の cache=True が効いた時間）。
+    結果は {"cases": {ケース名: {段: 秒}}, ...} の形で、compare_results にそのまま渡せる。
+    """
+    names = list(programs) if programs is not None else list(PROGRAMS)
+    for name in names:
+        if name not in PROGRAMS:
+            raise ValueError(f"Unknown benchmark program: {name}")
+    for size in sizes:
+        if size not in SIZE_NAMES:
+            raise ValueError(f"Unknown benchmark size: {size}")
+
+    cases: Dict[str, Dict[str, float]] = {}
+    grammar_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser = load_grammar(grammar_path, "top_level")
+        grammar_times.append(time.perf_counter() - start)
+    cases["grammar"] = {"load_grammar": min(grammar_times)}
+    inline_parser = load_grammar(grammar_path, "top_level", inline_transform=True)
+
+    info = {}
+    # CalcTransformer と Interpreter の print は計測の対象外なので捨てる
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name in names:
+            program = PROGRAMS[name]
+            for size in sizes:
+                source = program.build(program.sizes[size])
+                best: Dict[str, float] = {}
+                for _ in range(repeat):
+                    for stage, seconds in run_stages(parser, source, program.executor, inline_parser).items():
+                        best[stage] = min(seconds, best.get(stage, seconds))
+                case = f"{name}/{size}"
+                cases[case] = best
+                info[case] = {"size": program.sizes[size], "bytes": len(source), "executor": program.executor}
+
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "lark": lark.__version__,
+        "repeat": repeat,
+        "cases": cases,
+        "info": info,
+    }
+
+
+def write_results(results: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        results = json.load(f)
+    if results.get("version") != RESULTS_VERSION:
+        raise ValueError(f"Unsupported benchmark results version in {path}: {results.get('version')}")
+    return results
+
+
+class Comparison(NamedTuple):
+    case: str
+    stage: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline > 0 else float("inf")
+
+
+def compare_results(
+    current: dict,
+    baseline: dict,
+    threshold: float = DEFAULT_THRESHOLD,
+    min_time: float = DEFAULT_MIN_TIME,
+) -> List[Comparison]:
+    """基準より threshold の割合を超えて遅くなったケースと段を、遅くなった割合の大きい順に返す。
+
+    両方の結果にあるケース・段だけを比べる。基準も今回も min_time 秒より短い段は揺らぎとみなして除く。
+    """
+    regressions = []
+    for case, stages in current["cases"].items():
+        baseline_stages = baseline["cases"].get(case, {})
+        for stage, seconds in stages.items():
+            previous = baseline_stages.get(stage)
+            if previous is None or max(previous, seconds) < min_time:
+                continue
+            comparison = Comparison(case, stage, previous, seconds)
+            if comparison.ratio > 1 + threshold:
+                regressions.append(comparison)
+    return sorted(regressions, key=lambda comparison: comparison.ratio, reverse=True)
+
+
+def format_results(results: dict, baseline: Optional[dict] = None) -> List[str]:
+    """ケースごとに段の時間（ミリ秒）を並べた表の行。baseline があれば基準からの変化の割合も付ける"""
+    columns = ("load_grammar",) + STAGES
+    width = max(len(case) for case in results["cases"])
+    lines = [f"{'case':<{width}}" + "".join(f"  {column:>14}" for column in columns)]
+    for case, stages in results["cases"].items():
+        previous = baseline["cases"].get(case, {}) if baseline else {}
+        cells = []
+        for column in columns:
+            seconds = stages.get(column)
+            if seconds is None:
+                cells.append(f"  {'':>14}")
+                continue
+            cell = f"{seconds * 1000:.2f}"
+            if previous.get(column):
+                cell += f" {(seconds / previous[column] - 1) * 100:+.0f}%"
+            cells.append(f"  {cell:>14}")
+        lines.append(f"{case:<{width}}" + "".join(cells))
+    return lines
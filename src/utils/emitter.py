@@ -1,162 +1,79 @@
+import keyword
 import os
-from typing import Optional, List, Any
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict, Iterable, Tuple, TextIO
 
+# Generator + emitter が出力するコードの形が変わったら上げる（コードキャッシュのキーに含まれる）
+EMITTER_VERSION = 2
 
-class BaseEmitter:
-    def __init__(self, output_dir: str = "scripts"):
-        self.output_dir = output_dir
-        self.code_lines = []  # type: List[str]
-        self.indent_level = 0
-
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-    def add_line(self, line):
-        indent = "    " * self.indent_level
-        self.code_lines.append(indent + line)
-
-    def indent(self):
-        self.indent_level += 1
-
-    def dedent(self):
-        self.indent_level = max(0, self.indent_level - 1)
-
-    def write_to_file(self, filename):
-        filepath = os.path.join(self.output_dir, filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(self.code_lines))
-        print("✅ Generated script saved: {}".format(filepath))
-
-    def clear(self):
-        self.code_lines = []
-        self.indent_level = 0
-
-    # --- Language-agnostic formatting helpers (defaults produce Rust-like output) ---
-    def function_def_start(self, name, return_type=""):
-        self.add_line("fn {}(){} {{".format(name, return_type))
-        self.indent()
-
-    def function_def_end(self):
-        self.dedent()
-        self.add_line("}")
-        self.add_line("")
-
-    def let_statement(self, var_name, value):
-        self.add_line("let {} = {};".format(var_name, value))
-
-    def loop_start(self):
-        self.add_line("loop {")
-        self.indent()
-
-    def loop_end(self):
-        self.dedent()
-        self.add_line("}")
-
-    def if_start(self, condition):
-        self.add_line("if {} {{".format(condition))
-        self.indent()
-
-    def if_end(self):
-        self.dedent()
-        self.add_line("}")
-
-    def while_start(self, condition):
-        self.add_line("while {} {{".format(condition))
-        self.indent()
-
-    def while_end(self):
-        self.dedent()
-        self.add_line("}")
-
-    def return_statement(self, value=None):
-        if value is not None:
-            self.add_line("return {};".format(value))
-        else:
-            self.add_line("return;")
-
-    def format_binary(self, left, op, right):
-        return "{} {} {}".format(left, op, right)
-
-    def format_function_call(self, name, args):
-        return "{}({})".format(name, ', '.join(args))
-
-    def format_literal(self, value):
-        return str(value)
-
-
-class RustEmitter(BaseEmitter):
-    """Simple Rust-like emitter. Keeps the same behavior as the previous generator."""
-    pass
-
-
-class PythonEmitter(BaseEmitter):
-    """Emit Python code. Overrides formatting helpers from BaseEmitter."""
-
-    def function_def_start(self, name, return_type=""):
-        self.add_line("def {}():".format(name))
-        self.indent()
-
-    def function_def_end(self):
-        self.dedent()
-        self.add_line("")
+DEFAULT_BUFFER_SIZE = 64 * 1024
+# PythonEmitter の observe で、観測する関数のローカル変数を写す行
+OBSERVE_LINE = "__observed__.update(locals())"
 
-    def let_statement(self, var_name, value):
-        self.add_line("{} = {}".format(var_name, value))
 
-    def loop_start(self):
-        self.add_line("while True:")
-        self.indent()
-
-    def loop_end(self):
-        self.dedent()
-
-    def if_start(self, condition):
-        self.add_line("if {}:" .format(condition))
-        self.indent()
-
-    def if_end(self):
-        self.dedent()
-
-    def while_start(self, condition):
-        self.add_line("while {}:" .format(condition))
-        self.indent()
-
-    def while_end(self):
-        self.dedent()
-
-    def return_statement(self, value=None):
-        if value is not None:
-            self.add_line("return {}".format(value))
-        else:
-            self.add_line("return")
+class LineWriter:
+    """行を改行でつないで file-like な sink に書き出す。
 
-    def format_binary(self, left, op, right):
-        return "{} {} {}".format(left, op, right)
-
-    def format_function_call(self, name, args):
-        return "{}({})".format(name, ', '.join(args))
+    buffer_size 文字たまるごとに 1 回の write() にまとめるので、sink への書き込み回数も
+    保持する文字数も出力全体の大きさによらない。
+    """
 
-    def format_literal(self, value):
-        if isinstance(value, str):
-            return '"{}"'.format(value)
-        return str(value)
-import os
-from typing import Optional, List, Any
+    def __init__(self, sink: TextIO, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.sink = sink
+        self.buffer_size = buffer_size
+        self.parts: List[str] = []
+        self.buffered = 0
+        self.lines = 0
+
+    def write_line(self, line: str) -> None:
+        # '\n'.join(code_lines) と同じく、最後の行の後には改行を付けない
+        if self.lines:
+            line = "\n" + line
+        self.lines += 1
+        self.parts.append(line)
+        self.buffered += len(line)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.parts:
+            self.sink.write("".join(self.parts))
+            self.parts = []
+            self.buffered = 0
 
 
 class BaseEmitter:
-    def __init__(self, output_dir: str = "scripts"):
+    # ヘッダーのコメントに書く出力言語の名前
+    language = "Rust-like"
+    # 言語の演算子の字面 → 出力言語の字面（同じなら書かない）
+    OPERATORS: Dict[str, str] = {}
+
+    def __init__(self, output_dir: Optional[str] = "scripts"):
+        # output_dir=None ならファイルには書かない（メモリ上で生成したコードを使う場合）
         self.output_dir = output_dir
         self.code_lines: List[str] = []
         self.indent_level = 0
+        self.function_names = set()
+        # stream_to() で sink が与えられている間は code_lines にためずに書き出す
+        self.writer: Optional[LineWriter] = None
 
-        if not os.path.exists(output_dir):
+        if output_dir is not None and not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
     def add_line(self, line: str) -> None:
         indent = "    " * self.indent_level
-        self.code_lines.append(indent + line)
+        if self.writer is not None:
+            self.writer.write_line(indent + line)
+        else:
+            self.code_lines.append(indent + line)
+
+    def stream_to(self, sink: TextIO, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        """以降の行を sink に直接書き出す（インデントの扱いは変わらない）。end_stream() で残りを書き出して戻す"""
+        self.writer = LineWriter(sink, buffer_size)
+
+    def end_stream(self) -> None:
+        if self.writer is not None:
+            self.writer.flush()
+            self.writer = None
 
     def indent(self) -> None:
         self.indent_level += 1
@@ -170,13 +87,27 @@ class BaseEmitter:
             f.write('\n'.join(self.code_lines))
         print(f"✅ Generated script saved: {filepath}")
 
+    def source(self) -> str:
+        return '\n'.join(self.code_lines)
+
     def clear(self) -> None:
         self.code_lines = []
         self.indent_level = 0
 
+    def drain_lines(self) -> List[str]:
+        # これまでの行を取り出して空にする（インデントはそのまま）
+        lines = self.code_lines
+        self.code_lines = []
+        return lines
+
+    def declare_functions(self, names: Iterable[str]) -> None:
+        # プログラム中の関数名。変数名と衝突する言語では format_identifier で名前を変える
+        self.function_names = set(names)
+
     # --- Language-agnostic formatting helpers (defaults produce Rust-like output) ---
-    def function_def_start(self, name: str, return_type: str = "") -> None:
-        self.add_line(f"fn {name}(){return_type} {{")
+    def function_def_start(self, name: str, return_type: str = "", params: Iterable[Tuple[str, str]] = ()) -> None:
+        parameters = ", ".join(f"{param}: {param_type}" for param, param_type in params)
+        self.add_line(f"fn {name}({parameters}){return_type} {{")
         self.indent()
 
     def function_def_end(self) -> None:
@@ -199,10 +130,32 @@ class BaseEmitter:
         self.add_line(f"if {condition} {{")
         self.indent()
 
+    def else_start(self) -> None:
+        self.dedent()
+        self.add_line("} else {")
+        self.indent()
+
     def if_end(self) -> None:
         self.dedent()
         self.add_line("}")
 
+    def match_start(self, subject: str) -> None:
+        self.add_line(f"match {subject} {{")
+        self.indent()
+
+    def match_arm_start(self, pattern: Optional[str]) -> None:
+        # pattern=None はワイルドカード `_`
+        self.add_line(f"{'_' if pattern is None else pattern} => {{")
+        self.indent()
+
+    def match_arm_end(self) -> None:
+        self.dedent()
+        self.add_line("},")
+
+    def match_end(self) -> None:
+        self.dedent()
+        self.add_line("}")
+
     def while_start(self, condition: str) -> None:
         self.add_line(f"while {condition} {{")
         self.indent()
@@ -217,13 +170,25 @@ class BaseEmitter:
         else:
             self.add_line("return;")
 
-    def format_binary(self, left: str, op: str, right: str) -> str:
-        return f"{left} {op} {right}"
+    def expression_statement(self, expression: str) -> None:
+        self.add_line(f"{expression};")
+
+    @classmethod
+    def format_operator(cls, op: str) -> str:
+        """演算子の字面（&& / || / !）を出力言語の字面にする。Generator が出力言語のクラスごとに一度だけ引く"""
+        return cls.OPERATORS.get(op, op)
+
+    def format_identifier(self, name: str) -> str:
+        return name
 
-    def format_function_call(self, name: str, args: List[str]) -> str:
-        return f"{name}({', '.join(args)})"
+    def format_function_name(self, name: str) -> str:
+        return name
 
     def format_literal(self, value: Any) -> str:
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, str):
+            return f'"{value}"'
         return str(value)
 
 
@@ -233,14 +198,58 @@ class RustEmitter(BaseEmitter):
 
 
 class PythonEmitter(BaseEmitter):
-    """Emit Python code. Overrides formatting helpers from BaseEmitter."""
+    """Emit Python code. Overrides formatting helpers from BaseEmitter.
+
+    出力はそのまま compile() して実行できるモジュールになる（PythonBackend を参照）。
+    observe に関数名を渡すと、その関数が return する直前と末尾で locals() をモジュールの
+    __observed__ 辞書に写す（__observed__ は実行する側が用意する。PythonBackend.get_local で読む）。
+    """
 
-    def function_def_start(self, name: str, return_type: str = "") -> None:
-        # Python: def name():
-        self.add_line(f"def {name}():")
+    language = "Python"
+    OPERATORS = {"&&": "and", "||": "or", "!": "not "}
+
+    def __init__(self, output_dir: Optional[str] = "scripts", observe: Optional[str] = None):
+        super().__init__(output_dir)
+        self.observe = observe
+        self.observing = False
+        # 空のブロックに pass を入れるため、ブロックを開いた時点の行数を積んでおく
+        self.lines_written = 0
+        self.block_starts: List[int] = []
+        # match ごとの (対象を退避した変数名, 最初のアームか)
+        self.matches: List[List[Any]] = []
+        self.match_count = 0
+
+    def add_line(self, line: str) -> None:
+        super().add_line(line)
+        self.lines_written += 1
+
+    def indent(self) -> None:
+        super().indent()
+        self.block_starts.append(self.lines_written)
+
+    def dedent(self) -> None:
+        if self.block_starts and self.block_starts.pop() == self.lines_written:
+            self.add_line("pass")
+        super().dedent()
+
+    def clear(self) -> None:
+        super().clear()
+        self.lines_written = 0
+        self.block_starts = []
+        self.matches = []
+        self.match_count = 0
+        self.observing = False
+
+    def function_def_start(self, name: str, return_type: str = "", params: Iterable[Tuple[str, str]] = ()) -> None:
+        # Python: def name(a, b):  型注釈は出力しない
+        self.add_line(f"def {name}({', '.join(param for param, _ in params)}):")
         self.indent()
+        self.observing = name == self.observe
 
     def function_def_end(self) -> None:
+        if self.observing:
+            self.add_line(OBSERVE_LINE)
+            self.observing = False
         # ensure a blank line after function
         self.dedent()
         self.add_line("")
@@ -261,216 +270,65 @@ class PythonEmitter(BaseEmitter):
         self.add_line(f"if {condition}:")
         self.indent()
 
-    def if_end(self) -> None:
-        self.dedent()
-
-    def while_start(self, condition: str) -> None:
-        self.add_line(f"while {condition}:")
-        self.indent()
-
-    def while_end(self) -> None:
-        self.dedent()
-
-    def return_statement(self, value: Optional[str] = None) -> None:
-        if value is not None:
-            self.add_line(f"return {value}")
-        else:
-            self.add_line("return")
-
-    def format_binary(self, left: str, op: str, right: str) -> str:
-        return f"{left} {op} {right}"
-
-    def format_function_call(self, name: str, args: List[str]) -> str:
-        return f"{name}({', '.join(args)})"
-
-    def format_literal(self, value: Any) -> str:
-        # ensure strings are quoted
-        if isinstance(value, str):
-            return f'"{value}"'
-        return str(value)
-
-
-
-class BaseEmitter:
-    def __init__(self, output_dir="scripts"):
-        self.output_dir = output_dir
-        self.code_lines = []
-        self.indent_level = 0
-
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-    def add_line(self, line: str):
-        indent = "    " * self.indent_level
-        self.code_lines.append(indent + line)
-
-    def indent(self):
-        self.indent_level += 1
-
-    def dedent(self):
-        self.indent_level = max(0, self.indent_level - 1)
-
-    def write_to_file(self, filename: str):
-        filepath = os.path.join(self.output_dir, filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(self.code_lines))
-        print(f"✅ Generated script saved: {filepath}")
-
-    def clear(self):
-        self.code_lines = []
-        self.indent_level = 0
-
-    # --- Language-agnostic formatting helpers (defaults produce Rust-like output) ---
-    def function_def_start(self, name: str, return_type: str = ""):
-        self.add_line(f"fn {name}(){return_type} {{")
-        self.indent()
-
-    def function_def_end(self):
+    def else_start(self) -> None:
         self.dedent()
-        self.add_line("}")
-        self.add_line("")
-
-    def let_statement(self, var_name: str, value: str):
-        self.add_line(f"let {var_name} = {value};")
-
-    def loop_start(self):
-        self.add_line("loop {")
-        self.indent()
-
-    def loop_end(self):
-        self.dedent()
-        self.add_line("}")
-
-    def if_start(self, condition: str):
-        self.add_line(f"if {condition} {{")
+        self.add_line("else:")
         self.indent()
 
-    def if_end(self):
-        self.dedent()
-        self.add_line("}")
-
-    def while_start(self, condition: str):
-        self.add_line(f"while {condition} {{")
-        self.indent()
-
-    def while_end(self):
+    def if_end(self) -> None:
         self.dedent()
-        self.add_line("}")
 
-    def return_statement(self, value: Optional[str] = None):
-        if value is not None:
-            self.add_line(f"return {value};")
+    def match_start(self, subject: str) -> None:
+        # 対象は一度だけ評価して退避し、各アームを == の if/elif の連鎖にする（VM と同じ意味）
+        name = f"__match_{self.match_count}"
+        self.match_count += 1
+        self.add_line(f"{name} = {subject}")
+        self.matches.append([name, True])
+
+    def match_arm_start(self, pattern: Optional[str]) -> None:
+        state = self.matches[-1]
+        if pattern is None:
+            self.add_line("if True:" if state[1] else "else:")
         else:
-            self.add_line("return;")
-
-    def format_binary(self, left: str, op: str, right: str) -> str:
-        return f"{left} {op} {right}"
-
-    def format_function_call(self, name: str, args: List[str]) -> str:
-        return f"{name}({', '.join(args)})"
-
-    def format_literal(self, value) -> str:
-        return str(value)
-
-
-class RustEmitter(BaseEmitter):
-    """Currently identical to BaseEmitter but exists for language-specific
-    customizations later.
-    """
-    pass
-
-
-class PythonEmitter(BaseEmitter):
-    """Emit Python code. Overrides formatting helpers from BaseEmitter."""
-
-    def function_def_start(self, name: str, return_type: str = ""):
-        # Python: def name():
-        self.add_line(f"def {name}():")
+            self.add_line(f"{'if' if state[1] else 'elif'} {state[0]} == {pattern}:")
+        state[1] = False
         self.indent()
 
-    def function_def_end(self):
-        # ensure a blank line after function
+    def match_arm_end(self) -> None:
         self.dedent()
-        self.add_line("")
-
-    def let_statement(self, var_name: str, value: str):
-        # assignment in Python
-        self.add_line(f"{var_name} = {value}")
-
-    def loop_start(self):
-        # Python has no infinite loop keyword, use while True:
-        self.add_line("while True:")
-        self.indent()
-
-    def loop_end(self):
-        self.dedent()
-
-    def if_start(self, condition: str):
-        self.add_line(f"if {condition}:")
-        self.indent()
 
-    def if_end(self):
-        self.dedent()
+    def match_end(self) -> None:
+        self.matches.pop()
 
-    def while_start(self, condition: str):
+    def while_start(self, condition: str) -> None:
         self.add_line(f"while {condition}:")
         self.indent()
 
-    def while_end(self):
+    def while_end(self) -> None:
         self.dedent()
 
-    def return_statement(self, value: Optional[str] = None):
+    def return_statement(self, value: Optional[str] = None) -> None:
+        if self.observing:
+            self.add_line(OBSERVE_LINE)
         if value is not None:
             self.add_line(f"return {value}")
         else:
             self.add_line("return")
 
-    def format_binary(self, left: str, op: str, right: str) -> str:
-        return f"{left} {op} {right}"
+    def expression_statement(self, expression: str) -> None:
+        self.add_line(expression)
 
-    def format_function_call(self, name: str, args: List[str]) -> str:
-        return f"{name}({', '.join(args)})"
+    def format_identifier(self, name: str) -> str:
+        # Python の予約語と、関数名を隠してしまうローカル変数は名前を変える
+        if keyword.iskeyword(name) or name in self.function_names:
+            return name + "_"
+        return name
+
+    def format_function_name(self, name: str) -> str:
+        return name + "_" if keyword.iskeyword(name) else name
 
     def format_literal(self, value: Any) -> str:
-        # ensure strings are quoted
-        if isinstance(value, str):
-            return f'"{value}"'
+        # ensure strings are quoted (repr escapes quotes and backslashes)
+        if isinstance(value, (bool, str)):
+            return repr(value)
         return str(value)
-import os
-from datetime import datetime
-
-
-class BaseEmitter:
-    def __init__(self, output_dir="scripts"):
-        self.output_dir = output_dir
-        self.code_lines = []
-        self.indent_level = 0
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-    def add_line(self, line: str):
-        indent = "    " * self.indent_level
-        self.code_lines.append(indent + line)
-
-    def indent(self):
-        self.indent_level += 1
-
-    def dedent(self):
-        self.indent_level = max(0, self.indent_level - 1)
-
-    def write_to_file(self, filename: str):
-        filepath = os.path.join(self.output_dir, filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(self.code_lines))
-        print(f"✅ generated script saved: {filepath}")
-
-    def clear(self):
-        self.code_lines = []
-        self.indent_level = 0
-
-
-class RustEmitter(BaseEmitter):
-    """Simple Rust-like emitter. Keeps the same behavior as the previous generator's
-    line/indent handling but is pluggable for other emitters."""
-    def __init__(self, output_dir="scripts"):
-        super().__init__(output_dir=output_dir)
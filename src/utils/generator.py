@@ -1,39 +1,148 @@
 import os
+from contextlib import contextmanager
 from datetime import datetime
 from .emitter import RustEmitter
+from ..ast.node import Kind
+from ..ast.traversal import Traversal, PASSTHROUGH_KINDS
+from ..interpreter.resolver import Resolver
+
+
+# 値を持たない文の種別。STATEMENT の中身がこれ以外なら式文
+STATEMENT_KINDS = {Kind.LET, Kind.LOOP, Kind.IF, Kind.IF_ELSE, Kind.WHILE, Kind.MATCH, Kind.RETURN}
+
+# 二項演算子と単項演算子の字面（出力言語ごとの差は emitter が吸収する）
+BINARY_OPERATORS = {
+    Kind.OR_EXPR: "||",
+    Kind.AND_EXPR: "&&",
+    Kind.EQ_EXPR: "==",
+    Kind.NE_EXPR: "!=",
+    Kind.LT_EXPR: "<",
+    Kind.GT_EXPR: ">",
+    Kind.LE_EXPR: "<=",
+    Kind.GE_EXPR: ">=",
+    Kind.ADD_EXPR: "+",
+    Kind.SUB_EXPR: "-",
+    Kind.MUL_EXPR: "*",
+    Kind.DIV_EXPR: "/",
+}
+UNARY_OPERATORS = {
+    Kind.NEG_EXPR: "-",
+    Kind.NOT_EXPR: "!",
+}
+
+# 文法（calc_grammar.lark）での優先順位。値が大きいほど強く結合する
+UNARY_PRECEDENCE = 7
+PRECEDENCE = {
+    Kind.OR_EXPR: 1,
+    Kind.AND_EXPR: 2,
+    Kind.EQ_EXPR: 3,
+    Kind.NE_EXPR: 3,
+    Kind.LT_EXPR: 4,
+    Kind.GT_EXPR: 4,
+    Kind.LE_EXPR: 4,
+    Kind.GE_EXPR: 4,
+    Kind.ADD_EXPR: 5,
+    Kind.SUB_EXPR: 5,
+    Kind.MUL_EXPR: 6,
+    Kind.DIV_EXPR: 6,
+    Kind.NEG_EXPR: UNARY_PRECEDENCE,
+    Kind.NOT_EXPR: UNARY_PRECEDENCE,
+}
+# Python では比較演算子がすべて同じ優先順位で連鎖するため、比較の被演算子になる比較は括弧で囲む
+COMPARISON_PRECEDENCE = (3, 4)
+
+
+def needs_group(precedence, child, right=False):
+    """優先順位 precedence の演算子の被演算子が種別 child のとき、木の形を保つのに括弧が要るか"""
+    child_precedence = PRECEDENCE.get(child)
+    if child_precedence is None:
+        return False
+    if child_precedence < precedence or (child_precedence == precedence and right):
+        return True
+    if child_precedence in COMPARISON_PRECEDENCE and precedence in COMPARISON_PRECEDENCE:
+        return True
+    # 単項演算子どうし（- -x）と、比較より弱い Python の not を被演算子にする場合
+    return child_precedence == UNARY_PRECEDENCE and (precedence == UNARY_PRECEDENCE or child == Kind.NOT_EXPR)
+
+
+def group_kinds(precedence, right=False):
+    return frozenset(kind for kind in PRECEDENCE if needs_group(precedence, kind, right))
+
+
+def join_code(code):
+    """式のコードを 1 つの文字列にする。
+
+    式の途中ではコードを文字列の連結で作らず、断片のタプルを入れ子にしておき（深い式でも
+    文字列の複製が繰り返されない）、文に渡すときにここで一度だけ join する。
+    """
+    if code.__class__ is not tuple:
+        return code
+    parts = []
+    append = parts.append
+    stack = [code]
+    pop = stack.pop
+    push_all = stack.extend
+    while stack:
+        part = pop()
+        if part.__class__ is tuple:
+            push_all(reversed(part))
+        else:
+            append(part)
+    return "".join(parts)
 
 
 class Generator:
+    # 出力言語のクラス → 演算子の種別ごとの (出力言語の字面, 括弧で囲む被演算子の種別)。
+    # ノードごとに優先順位を比べずに済むよう、出力言語のクラスごとに一度だけ作る
+    _operator_tables = {}
+
     def __init__(self, output_dir="scripts", emitter=None):
         self.output_dir = output_dir
         # use provided emitter or default to RustEmitter
         self.emitter = emitter or RustEmitter(output_dir=output_dir)
+        self.binary_operators, self.unary_operators = self.operator_tables(type(self.emitter))
 
-        # handlers dict mapping node kinds to methods
+        # handlers dict mapping node kind tags to methods
         self.handlers = {
-            "TOP_LEVEL": self._handle_top_level,
-            "FUNCTION": self._handle_function,
-            "STATEMENT": self._handle_statement,
-            "LET": self._handle_let,
-            "LOOP": self._handle_loop,
-            "IF": self._handle_if,
-            "WHILE": self._handle_while,
-            "RETURN": self._handle_return,
-            "ADD_EXPR": self._handle_add_expr,
-            "SUB_EXPR": self._handle_sub_expr,
-            "MUL_EXPR": self._handle_mul_expr,
-            "DIV_EXPR": self._handle_div_expr,
-            "EXPR": self._handle_expr,
-            "FACTOR": self._handle_factor,
-            "FUNCTION_CALL": self._handle_function_call,
-            "ARG_LIST": self._handle_arg_list,
-            "NUM": self._handle_num,
-            "FLOAT": self._handle_float,
-            "STR": self._handle_str,
-            "BOOL": self._handle_bool,
-            "ID": self._handle_id,
-            "PRIMITIVE_TYPE": self._handle_primitive_type,
+            Kind.TOP_LEVEL: self._handle_top_level,
+            Kind.FUNCTION: self._handle_function,
+            Kind.STATEMENT: self._handle_statement,
+            Kind.LET: self._handle_let,
+            Kind.LOOP: self._handle_loop,
+            Kind.IF: self._handle_if,
+            Kind.IF_ELSE: self._handle_if_else,
+            Kind.WHILE: self._handle_while,
+            Kind.MATCH: self._handle_match,
+            Kind.RETURN: self._handle_return,
+            Kind.EXPR: self._handle_expr,
+            Kind.ARG_LIST: self._handle_arg_list,
+            Kind.NUM: self._handle_num,
+            Kind.FLOAT: self._handle_float,
+            Kind.STR: self._handle_str,
+            Kind.BOOL: self._handle_bool,
+            Kind.ID: self._handle_id,
+            Kind.PRIMITIVE_TYPE: self._handle_primitive_type,
+            Kind.ARRAY_TYPE: self._handle_array_type,
         }
+        # 式は子のコードを受け取って組み立てる（子は Traversal が明示的なスタックで先に生成する）
+        self.binary_handlers = dict.fromkeys(BINARY_OPERATORS, self._handle_binary)
+        self.unary_handlers = dict.fromkeys(UNARY_OPERATORS, self._handle_unary)
+        self.call_handlers = {
+            Kind.FUNCTION_CALL: (Resolver.call_arguments, self._handle_function_call),
+        }
+        self.traversal = Traversal(self.handlers, self._handle_default, self.binary_handlers, self.unary_handlers, self.call_handlers)
+
+    @classmethod
+    def operator_tables(cls, emitter_class):
+        tables = cls._operator_tables.get(emitter_class)
+        if tables is None:
+            binary = {
+                kind: (f" {emitter_class.format_operator(op)} ", group_kinds(PRECEDENCE[kind]), group_kinds(PRECEDENCE[kind], right=True))
+                for kind, op in BINARY_OPERATORS.items()
+            }
+            unary = {kind: (emitter_class.format_operator(op), group_kinds(UNARY_PRECEDENCE)) for kind, op in UNARY_OPERATORS.items()}
+            tables = cls._operator_tables[emitter_class] = (binary, unary)
+        return tables
 
     def _add_line(self, line):
         """インデント付きでコード行を追加（emitter 経由）"""
@@ -48,31 +157,63 @@ class Generator:
         self.emitter.dedent()
 
     def generate(self, node, filename=None):
-        result = self._generate_node(node)
-
-        # ファイル出力が指定されている場合
-        if filename and self.emitter.code_lines:
-            self._write_to_file(filename)
-
-        return result
+        if filename:
+            # ファイルに書くときは行を生成した順に書き出し、出力全体をメモリに持たない
+            with self._open_output(filename) as f:
+                self.emitter.stream_to(f)
+                try:
+                    result = self._generate_node(node)
+                finally:
+                    self.emitter.end_stream()
+            return result
+        return self._generate_node(node)
+
+    def generate_stream(self, functions, filename):
+        """FUNCTION ノードを受け取るたびにコードを生成してファイルに書き出し、ノードを次の段へ渡す。
+
+        出力は generate(TOP_LEVEL) と同じ内容になる。
+        """
+        with self._open_output(filename) as f:
+            self.emitter.stream_to(f)
+            try:
+                self._add_header()
+                for function in functions:
+                    self._generate_node(function)
+                    yield function
+            finally:
+                self.emitter.end_stream()
+
+    @contextmanager
+    def _open_output(self, filename):
+        """出力ファイルを開く。生成が途中で失敗したら書きかけのファイルは消す"""
+        filepath = os.path.join(self.emitter.output_dir, filename)
+        try:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                yield f
+        except BaseException:
+            os.remove(filepath)
+            raise
+        print(f"✅ Generated script saved: {filepath}")
 
     def _generate_node(self, node):
-        kind = node.get_kind()
-        handler = self.handlers.get(kind, self._handle_default)
-        return handler(node)
+        return join_code(self.traversal.evaluate(node))
 
     # === handlers ===
-    def _handle_top_level(self, node):
+    def _add_header(self):
         # header comment - keep same for now
-        self._add_line("# Generated Rust-like script")
+        self._add_line(f"# Generated {self.emitter.language} script")
         self._add_line(f"# Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         self._add_line("")
+
+    def _handle_top_level(self, node):
+        self.emitter.declare_functions(str(function.get_lhs().get_lhs()) for function in node.get_lhs())
+        self._add_header()
         for child in node.get_lhs():
             self._generate_node(child)
         return "main"
 
     def _handle_function(self, node):
-        function_name = self._generate_node(node.get_lhs())
+        function_name = self.emitter.format_function_name(str(node.get_lhs().get_lhs()))
         function_body = node.get_rhs()
         type_annotation = node.get_type()
 
@@ -80,16 +221,25 @@ class Generator:
         return_type = ""
         if type_annotation:
             return_type = f" -> {self._generate_node(type_annotation)}"
+        params = []
+        if node.params is not None:
+            for param in node.params.get_lhs():
+                params.append((self._generate_node(param.get_lhs()), self._generate_node(param.get_rhs())))
 
         # use emitter to start/end function definition (language-specific)
-        self.emitter.function_def_start(function_name, return_type)
+        self.emitter.function_def_start(function_name, return_type, params)
         for stmt in function_body:
             self._generate_node(stmt)
         self.emitter.function_def_end()
         return function_name
 
     def _handle_statement(self, node):
-        return self._generate_node(node.get_lhs())
+        statement = node.get_lhs()
+        if statement.tag not in STATEMENT_KINDS:
+            # 式文: 値は捨てる
+            self.emitter.expression_statement(self._generate_node(statement))
+            return "expression"
+        return self._generate_node(statement)
 
     def _handle_let(self, node):
         variable_name = self._generate_node(node.get_lhs())
@@ -114,6 +264,30 @@ class Generator:
         self.emitter.if_end()
         return "if"
 
+    def _handle_if_else(self, node):
+        if_node = node.get_lhs()
+        self.emitter.if_start(self._generate_node(if_node.get_lhs()))
+        for stmt in if_node.get_rhs():
+            self._generate_node(stmt)
+        self.emitter.else_start()
+        for stmt in node.get_rhs():
+            self._generate_node(stmt)
+        self.emitter.if_end()
+        return "if"
+
+    def _handle_match(self, node):
+        self.emitter.match_start(self._generate_node(node.get_lhs()))
+        for arm in node.get_rhs():
+            wildcard = Resolver.is_wildcard(arm.get_lhs())
+            self.emitter.match_arm_start(None if wildcard else self._generate_node(arm.get_lhs()))
+            self._generate_node(arm.get_rhs())
+            self.emitter.match_arm_end()
+            if wildcard:
+                # ワイルドカードより後のアームには到達しない
+                break
+        self.emitter.match_end()
+        return "match"
+
     def _handle_while(self, node):
         condition = self._generate_node(node.get_lhs())
         while_body = node.get_rhs()
@@ -131,25 +305,25 @@ class Generator:
             self.emitter.return_statement(None)
         return "return"
 
-    def _handle_add_expr(self, node):
-        left = self._generate_node(node.get_lhs())
-        right = self._generate_node(node.get_rhs())
-        return self.emitter.format_binary(left, "+", right)
-
-    def _handle_sub_expr(self, node):
-        left = self._generate_node(node.get_lhs())
-        right = self._generate_node(node.get_rhs())
-        return self.emitter.format_binary(left, "-", right)
-
-    def _handle_mul_expr(self, node):
-        left = self._generate_node(node.get_lhs())
-        right = self._generate_node(node.get_rhs())
-        return self.emitter.format_binary(left, "*", right)
-
-    def _handle_div_expr(self, node):
-        left = self._generate_node(node.get_lhs())
-        right = self._generate_node(node.get_rhs())
-        return self.emitter.format_binary(left, "/", right)
+    def _handle_binary(self, node, left, right):
+        operator, left_groups, right_groups = self.binary_operators[node.tag]
+        lhs = node.lhs
+        while lhs.tag in PASSTHROUGH_KINDS and lhs.rhs is None:
+            lhs = lhs.lhs
+        if lhs.tag in left_groups:
+            left = ("(", left, ")")
+        rhs = node.rhs
+        while rhs.tag in PASSTHROUGH_KINDS and rhs.rhs is None:
+            rhs = rhs.lhs
+        if rhs.tag in right_groups:
+            right = ("(", right, ")")
+        return (left, operator, right)
+
+    def _handle_unary(self, node, operand):
+        operator, groups = self.unary_operators[node.tag]
+        if Resolver.unwrap(node.lhs).tag in groups:
+            operand = ("(", operand, ")")
+        return (operator, operand)
 
     def _handle_expr(self, node):
         if node.get_rhs():
@@ -159,16 +333,14 @@ class Generator:
         else:
             return self._generate_node(node.get_lhs())
 
-    def _handle_factor(self, node):
-        return self._generate_node(node.get_lhs())
-
-    def _handle_function_call(self, node):
-        function_name = self._generate_node(node.get_lhs())
-        args = []
-        if node.get_rhs():
-            for arg in node.get_rhs():
-                args.append(self._generate_node(arg))
-        return self.emitter.format_function_call(function_name, args)
+    def _handle_function_call(self, node, *args):
+        code = [self.emitter.format_function_name(str(node.get_lhs().get_lhs())), "("]
+        for i, arg in enumerate(args):
+            if i:
+                code.append(", ")
+            code.append(arg)
+        code.append(")")
+        return tuple(code)
 
     def _handle_arg_list(self, node):
         args = []
@@ -177,30 +349,30 @@ class Generator:
         return args
 
     def _handle_num(self, node):
-        return str(node.get_lhs())
+        return self.emitter.format_literal(int(node.get_lhs()))
 
     def _handle_float(self, node):
-        return str(node.get_lhs())
+        return self.emitter.format_literal(float(node.get_lhs()))
 
     def _handle_str(self, node):
-        return f'"{node.get_lhs()}"'
+        # トークンは引用符を含む
+        return self.emitter.format_literal(str(node.get_lhs()).strip('"'))
 
     def _handle_bool(self, node):
-        return str(node.get_lhs()).lower()
+        return self.emitter.format_literal(str(node.get_lhs()).lower() == "true")
 
     def _handle_id(self, node):
-        return str(node.get_lhs())
+        return self.emitter.format_identifier(str(node.get_lhs()))
 
     def _handle_primitive_type(self, node):
         return str(node.get_lhs())
 
+    def _handle_array_type(self, node):
+        return f"[{self._generate_node(node.get_lhs())}]"
+
     def _handle_default(self, node):
         return f"/* Unknown node: {node.get_kind()} */"
 
-    def _write_to_file(self, filename):
-        """生成されたコードをファイルに書き込み（emitter 経由）"""
-        self.emitter.write_to_file(filename)
-
     def clear(self):
         """生成されたコードをクリア（emitter 経由）"""
         self.emitter.clear()
\ No newline at end of file
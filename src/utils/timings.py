@@ -0,0 +1,132 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+from lark import Tree
+from ..ast.node import Node
+
+
+class StageTiming:
+    """1 つの段の計測結果。peak_memory は段の開始時点から増えたメモリの最大値（バイト）"""
+    __slots__ = ("name", "wall", "cpu", "peak_memory", "nodes")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_memory = None
+        # 段が扱った木のノード数（lark の Tree を数えたときは Tree の数）
+        self.nodes = None
+
+
+class StageTimings:
+    """パイプラインの段ごとに経過時間・CPU 時間・tracemalloc の最大メモリ・ノード数を記録する。
+
+        timings = StageTimings()
+        with timings.stage("parse"):
+            tree = parser.parse(text)
+        timings.count(tree)
+        with timings.stage("check", tree=root):
+            Eval(root).check()
+        print("\\n".join(timings.format()))
+
+    trace_memory なら最初の段で tracemalloc を始める。tracemalloc はメモリの確保ごとに記録するので、
+    計測中の時間は計測しないときより長くなる（段どうしの比較には使える）。
+    """
+
+    def __init__(self, trace_memory: bool = True, clock=time.perf_counter, cpu_clock=time.process_time):
+        self.trace_memory = trace_memory
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+        self.stages: List[StageTiming] = []
+        self.__started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str, tree=None) -> Iterator[StageTiming]:
+        """with の中の処理を name の段として計測する。tree を渡すと、段の後でそのノード数を記録する"""
+        record = StageTiming(name)
+        base = 0
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.__started_tracing = True
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        cpu_start = self.cpu_clock()
+        start = self.clock()
+        try:
+            yield record
+        finally:
+            record.wall = self.clock() - start
+            record.cpu = self.cpu_clock() - cpu_start
+            if self.trace_memory:
+                record.peak_memory = max(0, tracemalloc.get_traced_memory()[1] - base)
+            self.stages.append(record)
+        if tree is not None:
+            record.nodes = count_nodes(tree)
+
+    def count(self, value) -> None:
+        """直前の段の結果の木（Node か lark の Tree）のノード数を記録する。数える時間は段に含めない"""
+        if self.stages:
+            self.stages[-1].nodes = count_nodes(value)
+
+    def stop(self) -> None:
+        """この計測で始めた tracemalloc を止める"""
+        if self.__started_tracing:
+            tracemalloc.stop()
+            self.__started_tracing = False
+
+    def to_dict(self) -> dict:
+        """JSON に書き出す形（時間はミリ秒、メモリはバイト）"""
+        return {
+            "stages": [
+                {
+                    "name": record.name,
+                    "wall_ms": record.wall * 1000,
+                    "cpu_ms": record.cpu * 1000,
+                    "peak_memory_bytes": record.peak_memory,
+                    "nodes": record.nodes,
+                }
+                for record in self.stages
+            ],
+            "total": {
+                "wall_ms": sum(record.wall for record in self.stages) * 1000,
+                "cpu_ms": sum(record.cpu for record in self.stages) * 1000,
+            },
+            "trace_memory": self.trace_memory,
+        }
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def format(self) -> List[str]:
+        """段ごとの表の行（時間はミリ秒、メモリは KiB）"""
+        width = max([len("stage"), len("total")] + [len(record.name) for record in self.stages])
+        lines = [f"{'stage':<{width}}  {'wall ms':>10}  {'cpu ms':>10}  {'peak KiB':>10}  {'nodes':>8}"]
+        for record in self.stages:
+            peak = f"{record.peak_memory / 1024:.1f}" if record.peak_memory is not None else "-"
+            nodes = str(record.nodes) if record.nodes is not None else "-"
+            lines.append(f"{record.name:<{width}}  {record.wall * 1000:10.2f}  {record.cpu * 1000:10.2f}  {peak:>10}  {nodes:>8}")
+        total = self.to_dict()["total"]
+        lines.append(f"{'total':<{width}}  {total['wall_ms']:10.2f}  {total['cpu_ms']:10.2f}")
+        return lines
+
+
+def count_nodes(value) -> Optional[int]:
+    """Node の木（lhs / rhs / type / params とそのリストをたどる）か lark の Tree のノードの数"""
+    if isinstance(value, Tree):
+        return sum(1 for _ in value.iter_subtrees())
+    if not isinstance(value, (Node, list)):
+        return None
+    count = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if value.__class__ is Node:
+            count += 1
+            stack.extend((value.lhs, value.rhs, value.type, value.params))
+        elif isinstance(value, list):
+            stack.extend(value)
+    return count
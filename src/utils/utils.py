@@ -1,37 +1,33 @@
+from functools import partial
 from ..ast.node import Node
+from ..ast.traversal import preorder
 
 def printNode(node, callCount=0):
+    # 明示的なスタックでたどる（深い式でも再帰しない）。要素は (ノード, 深さ, 種別名の前に出す文字列)
+    preorder((node, callCount, ""), _print_item)
+
+def _print_item(item):
+    node, callCount, prefix = item
     callCount += 1
-    print(node.get_kind())
+    print(prefix + node.get_kind())
+    indent = "  " * callCount
 
+    children = []
     if type(node.get_lhs()) == Node and node.get_kind() == "FUNCTION":
-        for i in range(node.get_rhs().__len__()):
-            printNode(node.get_rhs()[i])
+        for stmt in node.get_rhs():
+            children.append((stmt, 0, ""))
     elif node.get_kind() == "CONDITION":
-        for i in range(node.get_lhs().__len__()):
-            for i in range(callCount):
-                print("  ", end="")
-            printNode(node.get_lhs()[i], callCount)
+        for child in node.get_lhs():
+            children.append((child, callCount, indent))
 
     else:
         if type(node.get_lhs()) == Node:
-            for i in range(callCount):
-                print("  ", end="")
-            print("L: ", end="")
-            printNode(node.get_lhs(), callCount)
+            children.append((node.get_lhs(), callCount, indent + "L: "))
         elif node.get_lhs() is not None:
-            for i in range(callCount):
-                print("  ", end="")
-            print("L: ", node.get_lhs())
+            children.append(partial(print, indent + "L: ", node.get_lhs()))
 
         if type(node.get_rhs()) == Node:
-            for i in range(callCount):
-                print("  ", end="")
-            print("R: ", end="")
-            printNode(node.get_rhs(), callCount)
+            children.append((node.get_rhs(), callCount, indent + "R: "))
         elif node.get_rhs() is not None:
-            for i in range(callCount):
-                print("  ", end="")
-            print("R: ", node.get_rhs())
-
-    callCount -= 1
\ No newline at end of file
+            children.append(partial(print, indent + "R: ", node.get_rhs()))
+    return children
@@ -0,0 +1,14 @@
+fn square(n: i32) -> i32 {
+    return n * n;
+}
+fn mix(a: i32, b: f64, c: bool) -> f64 {
+    let total: f64 = a * 2.5 + b / 4.0 - -a;
+    let flag = !c && (a >= 3 || a != 0);
+    return total;
+}
+fn main() -> i32 {
+    let x = square(3) + square(4) * (1 + 2) / 2;
+    let y = +x - -x;
+    let z = mix(x, 1.5, true);
+    return x;
+}
@@ -0,0 +1,2 @@
+fn f(a: i32,b: i32)->i32{let x=a*b+1;return x;}
+fn main()->i32{let x=f(2,3);while x>0{let x=x-1;}return x;}
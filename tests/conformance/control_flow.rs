@@ -0,0 +1,31 @@
+fn count(limit: i32) -> i32 {
+    // 制御構文
+    let i = 0;
+    while i < limit {
+        let i = i + 1;
+    }
+    loop {
+        return i;
+    }
+}
+/* 複数行
+   コメント */
+fn classify(n: i32) -> String {
+    if n <= 0 {
+        return "small";
+    } else {
+        if n == 1 {
+            return "one";
+        }
+    }
+    match n {
+        2 => return "two";,
+        _ => return "many";,
+    }
+    return "";
+}
+fn main() -> i32 {
+    let x = count(10);
+    let s = classify(x);
+    return x;
+}
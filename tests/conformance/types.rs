@@ -0,0 +1,11 @@
+fn unit() -> () {
+    let a: [i32] = 1;
+    let b: String = "text";
+    let c: char = "c";
+    let d: bool = false;
+    return;
+}
+fn main() {
+    unit();
+    let x = 1;
+}
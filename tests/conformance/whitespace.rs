@@ -0,0 +1,5 @@
+fn main() -> i32 {
+	let x = 1;
+	let y = x	+	2;
+	return y;
+}
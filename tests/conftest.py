@@ -1,7 +1,47 @@
+import itertools
 import sys
 from pathlib import Path
+import pytest
 
 # Ensure project root is on sys.path so tests can import `src` package
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+from src.ast.node import Node  # noqa: E402
+from src.parser.calc_transformer import CalcTransformer  # noqa: E402
+from src.parser.grammar_loader import load_grammar  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def build_ast():
+    """Function that parses a source string into an AST; the grammar is loaded once per session"""
+    parser = load_grammar(str(ROOT / "grammar" / "calc_grammar.lark"), "top_level")
+
+    def build(source):
+        return CalcTransformer().transform(parser.parse(source.strip()))
+
+    return build
+
+
+def _dump(node):
+    if isinstance(node, Node):
+        return (node.get_kind(), _dump(node.get_lhs()), _dump(node.get_rhs()), _dump(node.get_type()), _dump(node.get_params()))
+    if isinstance(node, list):
+        return [_dump(child) for child in node]
+    return None if node is None else str(node)
+
+
+@pytest.fixture(scope="session")
+def dump_ast():
+    """Structural representation used to compare two ASTs (spans are ignored)"""
+    return _dump
+
+
+@pytest.fixture(scope="session")
+def ticking_clock():
+    """Factory of fake clocks; each clock advances by one second every time it is called"""
+    def clock():
+        return itertools.count().__next__
+
+    return clock
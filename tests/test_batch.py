@@ -0,0 +1,125 @@
+import json
+import pytest
+from pathlib import Path
+from src.interpreter.optimizer import Optimizer
+from src.utils.batch import collect_sources, output_paths, run_batch, write_report
+
+ROOT = Path(__file__).resolve().parent.parent
+GRAMMAR = str(ROOT / "grammar" / "calc_grammar.lark")
+SOURCE = (ROOT / "tests" / "test.rs").read_text(encoding="utf-8")
+
+WRONG_RETURN = """fn main() -> bool {
+    return 1;
+}
+"""
+
+SYNTAX_ERROR = """fn main() -> i32 {
+    let = 2;
+}
+"""
+
+
+@pytest.fixture
+def project(tmp_path):
+    src = tmp_path / "src"
+    (src / "nested").mkdir(parents=True)
+    (src / "a.rs").write_text(SOURCE, encoding="utf-8")
+    (src / "nested" / "b.rs").write_text(SOURCE, encoding="utf-8")
+    (src / "nested" / "wrong.rs").write_text(WRONG_RETURN, encoding="utf-8")
+    (src / "broken.rs").write_text(SYNTAX_ERROR, encoding="utf-8")
+    (src / "notes.txt").write_text("not a source file", encoding="utf-8")
+    return tmp_path
+
+
+class TestBatch:
+    """Test batch.py functionality"""
+
+    def test_collect_directory_glob_and_manifest(self, project):
+        """Test that directories, glob patterns and manifests give the same sorted file list"""
+        src = project / "src"
+        manifest = project / "files.txt"
+        manifest.write_text("# sources\nsrc/a.rs\nsrc/broken.rs\n\nsrc/nested/b.rs  # nested\nsrc/nested/wrong.rs\n", encoding="utf-8")
+
+        from_directory = collect_sources([str(src)])
+        from_glob = collect_sources([str(src / "**" / "*.rs"), str(src / "a.rs")])
+        from_manifest = collect_sources([], str(manifest))
+
+        assert [Path(path).name for path in from_directory] == ["a.rs", "broken.rs", "b.rs", "wrong.rs"]
+        assert from_glob == from_directory
+        assert from_manifest == from_directory
+
+    def test_missing_source_is_an_error(self, project):
+        """Test that a path that does not exist is reported"""
+        with pytest.raises(ValueError, match="No such source"):
+            collect_sources([str(project / "missing.rs")])
+
+    def test_output_paths_mirror_source_tree(self, project):
+        """Test that outputs keep the layout relative to the common directory"""
+        sources = collect_sources([str(project / "src")])
+        outputs = output_paths(sources, str(project / "out"))
+
+        assert [Path(path).relative_to(project / "out").as_posix() for path in outputs] == ["a.rs", "broken.rs", "nested/b.rs", "nested/wrong.rs"]
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_run_batch_writes_outputs_and_report(self, project, workers):
+        """Test per-file outputs and the aggregate diagnostics, in input order"""
+        sources = collect_sources([str(project / "src")])
+        report = run_batch(sources, str(project / "out"), GRAMMAR, workers=workers, use_cache=False)
+
+        files = {Path(result["source"]).name: result for result in report["files"]}
+        assert [result["source"] for result in report["files"]] == sources
+        assert files["a.rs"]["ok"] and files["b.rs"]["ok"]
+        assert (project / "out" / "nested" / "b.rs").read_text(encoding="utf-8").startswith("# Generated")
+
+        syntax = files["broken.rs"]
+        assert syntax["output"] is None
+        assert [(d["kind"], d["line"], d["column"]) for d in syntax["diagnostics"]] == [("syntax", 2, 9)]
+
+        wrong = files["wrong.rs"]
+        assert not wrong["ok"]
+        assert [d["kind"] for d in wrong["diagnostics"]] == ["type"]
+
+        assert report["summary"]["files"] == 4
+        assert report["summary"]["failed"] == 2
+
+        path = project / "report.json"
+        write_report(report, str(path))
+        assert json.loads(path.read_text(encoding="utf-8"))["summary"]["diagnostics"] == report["summary"]["diagnostics"]
+
+    def test_optimizer_failure_fails_only_that_file(self, project, monkeypatch):
+        """Test that an exception from the optimizer becomes a diagnostic for that file"""
+        original = Optimizer.optimize
+
+        def optimize(self, root):
+            if any(str(function.lhs.lhs) == "sub2" for function in root.lhs):
+                raise ZeroDivisionError("boom")
+            return original(self, root)
+
+        monkeypatch.setattr(Optimizer, "optimize", optimize)
+        (project / "src" / "small.rs").write_text("fn main() -> i32 { let x = 1 + 2; return x; }", encoding="utf-8")
+        sources = collect_sources([str(project / "src" / "a.rs"), str(project / "src" / "small.rs")])
+        report = run_batch(sources, str(project / "out"), GRAMMAR, workers=1, use_cache=False)
+
+        failed, small = report["files"]
+        assert failed["output"] is None
+        assert [(d["kind"], d["message"]) for d in failed["diagnostics"]] == [("optimize", "ZeroDivisionError: boom")]
+        assert small["ok"]
+        assert not (project / "out" / "a.rs").exists()
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_unreadable_file_fails_only_that_file(self, tmp_path, workers):
+        """Test that a file that is not valid UTF-8 becomes a read diagnostic and the others still compile"""
+        src = tmp_path / "src"
+        src.mkdir()
+        (src / "bad.rs").write_bytes(b"fn main() -> i32 { let s = \"\xff\"; return 0; }")
+        (src / "ok.rs").write_text(SOURCE, encoding="utf-8")
+        sources = collect_sources([str(src)])
+        report = run_batch(sources, str(tmp_path / "out"), GRAMMAR, workers=workers, use_cache=False)
+
+        bad, ok = report["files"]
+        assert bad["output"] is None
+        assert [d["kind"] for d in bad["diagnostics"]] == ["read"]
+        assert "UnicodeDecodeError" in bad["diagnostics"][0]["message"]
+        assert ok["ok"]
+        assert (tmp_path / "out" / "ok.rs").exists()
+        assert report["summary"]["failed"] == 1
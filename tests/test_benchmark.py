@@ -0,0 +1,72 @@
+import io
+import contextlib
+import pytest
+from pathlib import Path
+from src.parser.calc_transformer import CalcTransformer
+from src.parser.grammar_loader import load_grammar
+from src.utils.benchmark import (
+    PROGRAMS, RESULTS_VERSION, STAGES, compare_results, execute, load_results, run_benchmarks, write_results,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+GRAMMAR = str(ROOT / "grammar" / "calc_grammar.lark")
+
+
+def results(cases):
+    return {"version": RESULTS_VERSION, "cases": cases}
+
+
+class TestBenchmark:
+    """Test benchmark.py functionality"""
+
+    @pytest.mark.parametrize("name, size, expected", [
+        ("deep_expression", 30, sum((3 - i) * (i % 7 + 1) for i in range(30))),
+        ("many_functions", 30, 30 * 29),
+        ("long_loop", 30, 30 * 29 - 30),
+        ("deep_recursion", 30, 30),
+    ])
+    def test_programs_run_on_their_executor(self, name, size, expected):
+        """Test that each synthetic program parses, type-checks and computes the expected x"""
+        program = PROGRAMS[name]
+        parser = load_grammar(GRAMMAR, "top_level")
+        with contextlib.redirect_stdout(io.StringIO()):
+            root = CalcTransformer().transform(parser.parse(program.build(size)))
+            assert execute(root, program.executor) == expected
+
+    def test_run_benchmarks_records_every_stage(self, tmp_path):
+        """Test that each case records all stages and the results survive a JSON round trip"""
+        data = run_benchmarks(GRAMMAR, programs=["many_functions", "long_loop"], sizes=["small"], repeat=1)
+
+        assert list(data["cases"]) == ["grammar", "many_functions/small", "long_loop/small"]
+        assert list(data["cases"]["grammar"]) == ["load_grammar"]
+        assert list(data["cases"]["long_loop/small"]) == list(STAGES)
+        assert data["info"]["long_loop/small"]["executor"] == "vm"
+        write_results(data, str(tmp_path / "results.json"))
+        assert load_results(str(tmp_path / "results.json")) == data
+
+    def test_unknown_program_or_size(self):
+        """Test that unknown programs and sizes are rejected before anything runs"""
+        with pytest.raises(ValueError, match="Unknown benchmark program"):
+            run_benchmarks(GRAMMAR, programs=["fibonacci"])
+        with pytest.raises(ValueError, match="Unknown benchmark size"):
+            run_benchmarks(GRAMMAR, sizes=["huge"])
+
+    def test_compare_against_baseline(self):
+        """Test the regression threshold, the noise floor and cases missing from the baseline"""
+        baseline = results({"a": {"parse": 0.010, "check": 0.010, "execute": 0.0001}})
+        current = results({
+            "a": {"parse": 0.013, "check": 0.0115, "execute": 0.0009},
+            "b": {"parse": 1.0},
+        })
+
+        regressions = compare_results(current, baseline, threshold=0.2, min_time=0.001)
+        assert [(r.case, r.stage, round(r.ratio, 2)) for r in regressions] == [("a", "parse", 1.3)]
+        assert [r.stage for r in compare_results(current, baseline, threshold=0.1, min_time=0.001)] == ["parse", "check"]
+        assert [r.stage for r in compare_results(current, baseline, threshold=0.2, min_time=0)] == ["execute", "parse"]
+
+    def test_version_mismatch(self, tmp_path):
+        """Test that results written in another format are not compared"""
+        path = tmp_path / "old.json"
+        path.write_text('{"version": 0, "cases": {}}', encoding="utf-8")
+        with pytest.raises(ValueError, match="Unsupported benchmark results version"):
+            load_results(str(path))
@@ -182,4 +182,36 @@ class TestCalcTransformer:
         
         assert isinstance(result, Node)
         assert result.get_kind() == "FACTOR"
-        assert result.get_lhs() == inner_node
\ No newline at end of file
+        assert result.get_lhs() == inner_node
+
+
+class TestSourceSpans:
+    """Test source spans attached by calc_transformer.py"""
+
+    @pytest.fixture
+    def root(self, build_ast):
+        """Parse a two-line function"""
+        return build_ast("fn main() -> i32 {\n    let x = a + 12;\n}")
+
+    def test_rule_spans(self, root):
+        """Test that nodes cover their tokens as (line, column, end line, end column)"""
+        function = root.get_lhs()[0]
+        let = function.get_rhs()[0].get_lhs()
+
+        assert function.get_span() == (1, 4, 2, 19)
+        assert let.get_span() == (2, 9, 2, 19)
+        assert let.get_rhs().get_span() == (2, 13, 2, 19)
+        assert let.get_rhs().get_rhs().get_span() == (2, 17, 2, 19)
+
+    def test_single_child_rules_share_the_span(self, root):
+        """Test that a wrapper node reuses its child's span tuple"""
+        let = root.get_lhs()[0].get_rhs()[0].get_lhs()
+
+        assert let.get_rhs().get_rhs().get_span() is let.get_rhs().get_rhs().get_lhs().get_span()
+
+    def test_origin_offsets_spans(self):
+        """Test that line / column passed to transform shift the spans"""
+        tree = Tree("number", [Token("NUMBER", "7", line=1, column=3, end_line=1, end_column=4)])
+
+        assert CalcTransformer().transform(tree, line=5, column=10).get_span() == (5, 12, 5, 13)
+
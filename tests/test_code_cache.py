@@ -0,0 +1,89 @@
+import os
+import marshal
+from pathlib import Path
+from src.interpreter import code_cache
+from src.interpreter.code_cache import CodeCache
+from src.interpreter.python_backend import PythonBackend
+from src.parser.calc_transformer import CalcTransformer
+from src.parser.grammar_loader import load_grammar
+
+ROOT = Path(__file__).resolve().parent.parent
+GRAMMAR = str(ROOT / "grammar" / "calc_grammar.lark")
+SOURCE = "fn main() -> i32 { let x = 2 * (3 + 4); return x; }"
+
+
+def compile_source(source):
+    parser = load_grammar(GRAMMAR, "top_level")
+    return PythonBackend(CalcTransformer().transform(parser.parse(source))).code
+
+
+class TestCodeCache:
+    """Test code_cache.py functionality"""
+
+    def test_hit_after_store(self, tmp_path):
+        """Test that a stored code object runs without regenerating anything"""
+        cache = CodeCache(GRAMMAR, cache_dir=str(tmp_path))
+        cache.store(SOURCE, compile_source(SOURCE))
+
+        code = cache.load(SOURCE)
+
+        assert PythonBackend(code=code).run() == 14
+        assert (cache.hits, cache.misses) == (1, 0)
+        assert cache.load(SOURCE + " ") is None
+
+    def test_key_depends_on_options(self, tmp_path):
+        """Test that code generated with different options is kept apart"""
+        optimized = CodeCache(GRAMMAR, cache_dir=str(tmp_path), options=["optimize"])
+        optimized.store(SOURCE, compile_source(SOURCE))
+
+        assert CodeCache(GRAMMAR, cache_dir=str(tmp_path), options=["no-optimize"]).load(SOURCE) is None
+        assert optimized.load(SOURCE) is not None
+
+    def test_key_depends_on_optimizer_and_generator(self, tmp_path, monkeypatch):
+        """Test that entries compiled by an older optimizer or code generator are not served"""
+        cache = CodeCache(GRAMMAR, cache_dir=str(tmp_path))
+        cache.store(SOURCE, compile_source(SOURCE))
+
+        monkeypatch.setattr(code_cache, "OPTIMIZER_VERSION", code_cache.OPTIMIZER_VERSION + 1)
+        assert cache.load(SOURCE) is None
+        monkeypatch.undo()
+        assert cache.load(SOURCE) is not None
+
+        # 版を上げ忘れても、生成に関わるモジュールのソースが変わればキーが変わる
+        cache.generator_hash = "edited"
+        assert cache.load(SOURCE) is None
+
+    def test_foreign_entry_is_a_miss(self, tmp_path):
+        """Test that entries from another Python version or key are discarded"""
+        cache = CodeCache(GRAMMAR, cache_dir=str(tmp_path))
+        path = tmp_path / (cache.key(SOURCE) + ".pyc")
+        path.write_bytes(b"\0" * 36 + marshal.dumps(compile_source(SOURCE)))
+
+        assert cache.load(SOURCE) is None
+        assert not path.exists()
+
+    def test_corrupted_entry_is_a_miss(self, tmp_path):
+        """Test that a truncated entry is discarded"""
+        cache = CodeCache(GRAMMAR, cache_dir=str(tmp_path))
+        cache.store(SOURCE, compile_source(SOURCE))
+        path = tmp_path / (cache.key(SOURCE) + ".pyc")
+        path.write_bytes(path.read_bytes()[:50])
+
+        assert cache.load(SOURCE) is None
+        assert not path.exists()
+
+    def test_lru_eviction(self, tmp_path):
+        """Test that the least recently used entries are evicted first"""
+        code = compile_source(SOURCE)
+        entry_size = 36 + len(marshal.dumps(code))
+        cache = CodeCache(GRAMMAR, cache_dir=str(tmp_path), max_bytes=entry_size * 2)
+
+        cache.store("a", code)
+        cache.store("b", code)
+        os.utime(tmp_path / (cache.key("a") + ".pyc"), (1, 1))
+        os.utime(tmp_path / (cache.key("b") + ".pyc"), (2, 2))
+        cache.store("c", code)
+
+        assert cache.load("a") is None
+        assert cache.load("b") is not None
+        assert cache.load("c") is not None
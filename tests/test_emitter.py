@@ -0,0 +1,100 @@
+import io
+import pytest
+from pathlib import Path
+from src.ast.node import Node, Kind
+from src.utils.emitter import LineWriter, PythonEmitter, RustEmitter
+from src.utils.generator import Generator, join_code
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCE = (ROOT / "tests" / "test.rs").read_text(encoding="utf-8")
+
+
+class CountingSink(io.StringIO):
+    """write() の回数を数える sink"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+class TestStreamingEmitter:
+    """Test streaming output of emitter.py"""
+
+    @pytest.mark.parametrize("emitter_class", [RustEmitter, PythonEmitter])
+    def test_same_output_as_accumulated_lines(self, build_ast, emitter_class):
+        """Test that streaming keeps the text and indentation of code_lines"""
+        root = build_ast(SOURCE + "fn f(a: i32) -> i32 { if a < 1 { } else { loop { return a; } } }")
+        accumulated = emitter_class(output_dir=None)
+        Generator(emitter=accumulated).generate(root)
+
+        sink = io.StringIO()
+        streamed = emitter_class(output_dir=None)
+        streamed.stream_to(sink, buffer_size=16)
+        Generator(emitter=streamed).generate(root)
+        streamed.end_stream()
+
+        assert sink.getvalue() == accumulated.source()
+        assert streamed.code_lines == []
+
+    def test_writes_are_batched(self):
+        """Test that the sink sees one write per filled buffer"""
+        sink = CountingSink()
+        writer = LineWriter(sink, buffer_size=100)
+        for _ in range(100):
+            writer.write_line("x" * 9)
+        writer.flush()
+
+        assert sink.getvalue() == "\n".join(["x" * 9] * 100)
+        assert sink.writes == 10
+
+    def test_generate_streams_to_file(self, build_ast, tmp_path):
+        """Test that generate(filename) writes the file without keeping lines"""
+        generator = Generator(output_dir=str(tmp_path))
+        generator.generate(build_ast(SOURCE), "out.rs")
+
+        text = (tmp_path / "out.rs").read_text(encoding="utf-8")
+        assert text.startswith("# Generated Rust-like script\n")
+        assert text.endswith("fn main() -> i32 {\n    let x = sub();\n}\n")
+        assert generator.emitter.code_lines == []
+        assert generator.emitter.writer is None
+
+    def test_failed_generation_leaves_no_file(self, tmp_path):
+        """Test that a half-written script is removed"""
+        generator = Generator(output_dir=str(tmp_path))
+        broken = Node(Kind.TOP_LEVEL, [Node(Kind.FUNCTION, Node(Kind.ID, "f"), [Node(Kind.STATEMENT, None)])])
+
+        with pytest.raises(AttributeError):
+            generator.generate(broken, "broken.rs")
+        assert not (tmp_path / "broken.rs").exists()
+
+
+class TestExpressionCode:
+    """Test expression code building in generator.py"""
+
+    def test_join_code_flattens_nested_fragments(self):
+        """Test that nested fragment tuples are joined in order"""
+        assert join_code(((("a", " + ", "b"), " * ", ("(", ("c", " - ", "d"), ")")))) == "a + b * (c - d)"
+        assert join_code("x") == "x"
+
+    def test_operator_tables_are_shared_per_emitter_class(self):
+        """Test that operator spelling is resolved once per emitter class"""
+        rust = Generator(emitter=RustEmitter(output_dir=None))
+        python = Generator(emitter=PythonEmitter(output_dir=None))
+
+        assert Generator(emitter=RustEmitter(output_dir=None)).binary_operators is rust.binary_operators
+        assert rust.binary_operators[Kind.AND_EXPR][0] == " && "
+        assert python.binary_operators[Kind.AND_EXPR][0] == " and "
+        assert python.unary_operators[Kind.NOT_EXPR][0] == "not "
+
+    def test_grouping(self, build_ast):
+        """Test that parentheses are emitted only where the tree needs them"""
+        root = build_ast("fn f(a: i32) -> i32 { let x = a - (a - 1) * (a + 2) - -(-a); let y = (a < 1) == !(a > 2); }")
+        generator = Generator(emitter=RustEmitter(output_dir=None))
+        generator.generate(root)
+
+        assert "    let x = a - (a - 1) * (a + 2) - -(-a);" in generator.emitter.source()
+        assert "    let y = (a < 1) == (!(a > 2));" in generator.emitter.source()
@@ -6,12 +6,6 @@ from src.ast.node import Node
 class TestEval:
     """Test eval.py functionality"""
     
-    def setup_method(self):
-        """Setup for each test"""
-        # Clear the global module dictionary before each test
-        import src.interpreter.eval as eval_module
-        eval_module.m = {}
-    
     def test_evaluate_number_node(self):
         """Test evaluation of number nodes"""
         node = Node("NUM", "42")
@@ -102,10 +96,9 @@ class TestEval:
         # Should return the evaluated value
         assert result == (42, Types.NUM)
         
-        # Check if variable was added to memory
-        import src.interpreter.eval as eval_module
-        assert "x" in eval_module.m
-        assert eval_module.m["x"] == Types.NUM
+        # Check if variable was added to the evaluator's symbol table
+        assert "x" in evaluator.m
+        assert evaluator.m["x"] == Types.NUM
     
     def test_evaluate_add_expr(self):
         """Test evaluation of addition expressions"""
@@ -133,14 +126,12 @@ class TestEval:
     
     def test_evaluate_function_call_defined(self):
         """Test evaluation of defined function call"""
-        # First, add a function to the memory
-        import src.interpreter.eval as eval_module
-        eval_module.m["test_func"] = Types.NUM
-        
         func_name = Node("ID", "test_func")
         call_node = Node("FUNCTION_CALL", func_name, [])
         
         evaluator = Eval(call_node)
+        # First, add a function to the evaluator's symbol table
+        evaluator.m["test_func"] = Types.NUM
         result = evaluator.evaluate(call_node)
         
         # Should return function name and type
@@ -154,8 +145,7 @@ class TestEval:
         evaluator._Eval__now_function_name = "test_func"
         
         # Add variable to memory with matching type
-        import src.interpreter.eval as eval_module
-        eval_module.m["x"] = Types.NUM
+        evaluator.m["x"] = Types.NUM
         
         return_value = Node("ID", "x")
         return_node = Node("RETURN", return_value)
@@ -173,8 +163,7 @@ class TestEval:
         evaluator._Eval__now_function_name = "test_func"
         
         # Add variable to memory with different type
-        import src.interpreter.eval as eval_module
-        eval_module.m["x"] = Types.NUM  # But returning number
+        evaluator.m["x"] = Types.NUM  # But returning number
         
         return_value = Node("ID", "x")
         return_node = Node("RETURN", return_value)
@@ -206,4 +195,116 @@ class TestEval:
         assert Types.STR == "string"
         assert Types.BOOL == "boolean"
         assert Types.ID == "identifier"
-        assert Types.VOID == "void"
\ No newline at end of file
+        assert Types.VOID == "void"
+
+PROGRAM = """fn main() -> i32 {
+    let x = helper(2);
+    return x;
+}
+fn helper(n: i32) -> i32 {
+    let y = n * 2;
+    return y;
+}
+fn broken() -> String {
+    let z = 1 + 2.5;
+    return "ok";
+}
+fn wrong_return() -> bool {
+    return 1;
+}
+"""
+
+
+class TestEvalCheck:
+    """Test signature collection and per-function body checks"""
+
+    def test_signatures_are_collected_first(self, build_ast):
+        """Test that a call to a function defined later is accepted"""
+        evaluator = Eval(build_ast(PROGRAM), verbose=False)
+        evaluator.check()
+
+        assert evaluator.signatures == {"main": Types.NUM, "helper": Types.NUM, "broken": Types.STR, "wrong_return": Types.BOOL}
+        assert evaluator.results["main"] is True
+        assert evaluator.results["helper"] is True
+
+    def test_errors_are_reported_per_function(self, build_ast):
+        """Test that every function body is checked, not only main"""
+        evaluator = Eval(build_ast(PROGRAM), verbose=False)
+
+        assert evaluator.check() is False
+        assert evaluator.results["broken"] is False
+        assert evaluator.results["wrong_return"] is False
+        assert evaluator.errors == [
+            "変数zで型numberと型floatの不一致が発生",
+            "関数wrong_returnは型booleanにも関わらず型numberが返されました",
+        ]
+
+    def test_returning_a_void_call_is_reported(self, build_ast):
+        """Test that returning the result of a () function gives a message, not only a failed result"""
+        evaluator = Eval(build_ast("""
+fn g() { let a = 1; }
+fn f() -> i32 { return g(); }
+fn h() { return g(); }
+fn main() -> i32 { let x = f(); return x; }
+"""), verbose=False)
+
+        assert evaluator.check() is False
+        assert evaluator.results == {"g": True, "f": False, "h": True, "main": True}
+        assert evaluator.errors == ["関数fは型numberにも関わらず型voidが返されました"]
+
+    def test_instances_do_not_share_state(self, build_ast):
+        """Test that two evaluators keep separate symbol tables"""
+        first = Eval(build_ast(PROGRAM), verbose=False)
+        second = Eval(None, verbose=False)
+        first.check()
+
+        assert "helper" in first.m
+        assert second.m == {}
+        assert second.evaluate(Node("FUNCTION_CALL", Node("ID", "helper"), [])) is False
+
+    def test_parallel_check_matches_sequential(self, build_ast):
+        """Test that the process pool gives the same results in the same order"""
+        root = build_ast(PROGRAM)
+        sequential = Eval(root, verbose=False)
+        parallel = Eval(root, verbose=False)
+
+        assert sequential.check() == parallel.check(workers=2)
+        assert parallel.errors == sequential.errors
+        assert list(parallel.results.items()) == list(sequential.results.items())
+
+
+class TestInferTypes:
+    """Test the node → runtime type side table"""
+
+    def test_literals_and_arithmetic(self, build_ast):
+        """Test that division is float and int-only arithmetic stays int"""
+        root = build_ast("fn main() -> i32 {\n    let a = 1 + 2 * 3;\n    let b = a / 2;\n    let c = b - 1;\n    let d = a < 3;\n}")
+        types = Eval(root, verbose=False).infer_types()
+        lets = [statement.get_lhs() for statement in root.get_lhs()[0].get_rhs()]
+
+        assert [types.get(let.get_rhs()) for let in lets] == [Types.NUM, Types.FLOAT, Types.FLOAT, Types.BOOL]
+
+    def test_unstable_variables_are_untyped(self, build_ast):
+        """Test that variables assigned different types, params and calls are not typed"""
+        root = build_ast("""fn f(n: i32) -> i32 {
+    let i = 0;
+    let k = n + 1;
+    let m = g();
+    while i < 3 {
+        let j = i + 1;
+        let i = i + 0.5;
+    }
+    return i;
+}
+fn g() -> i32 {
+    return 1;
+}""")
+        types = Eval(root, verbose=False).infer_types()
+        body = root.get_lhs()[0].get_rhs()
+        loop = body[3].get_lhs()
+
+        assert types.get(body[1].get_lhs().get_rhs()) is None
+        assert types.get(body[2].get_lhs().get_rhs()) is None
+        # ループの 2 周目では i は float になるので i + 1 の型は決めない
+        assert types.get(loop.get_rhs()[0].get_lhs().get_rhs()) is None
+        assert types.get(loop.get_lhs()) is None
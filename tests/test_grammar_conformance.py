@@ -0,0 +1,79 @@
+import re
+import random
+import pytest
+from pathlib import Path
+from lark.exceptions import UnexpectedInput
+from src.parser.calc_transformer import CalcTransformer
+from src.parser.grammar_loader import load_grammar
+
+ROOT = Path(__file__).resolve().parent.parent
+GRAMMAR = str(ROOT / "grammar" / "calc_grammar.lark")
+# 空白を _ws 規則で扱っていた以前の文法。比較のためだけに残している
+LEGACY_GRAMMAR = str(ROOT / "tests" / "conformance" / "legacy_calc_grammar.lark")
+CORPUS = sorted((ROOT / "tests" / "conformance").glob("*.rs")) + [ROOT / "tests" / "test.rs"]
+
+LINE_BREAKS = ["\n", "\r\n", "\n\t", " \n  ", "\n\n"]
+INLINE_SPACES = [" ", "\t", "  ", " \t "]
+VARIANTS = 40
+
+
+@pytest.fixture(scope="module")
+def parsers():
+    return load_grammar(LEGACY_GRAMMAR, "top_level"), load_grammar(GRAMMAR, "top_level")
+
+
+def respace(source, rng):
+    """Rewrite whitespace runs and optionally pad punctuation with spaces"""
+    if rng.random() < 0.5:
+        source = re.sub(r"(?<=[-+*/(){},;:=<>!])|(?=[-+*/(){},;:=<>!])", lambda m: rng.choice(["", " "]), source)
+    return re.sub(r"\s+", lambda m: rng.choice(LINE_BREAKS if "\n" in m.group() else INLINE_SPACES), source)
+
+
+class TestGrammarConformance:
+    """Test that the lexer-level whitespace grammar matches the legacy grammar"""
+
+    @pytest.mark.parametrize("path", CORPUS, ids=lambda path: path.name)
+    def test_corpus_produces_same_ast(self, dump_ast, parsers, path):
+        """Test that every corpus file gives the same tree and AST under both grammars"""
+        legacy, current = parsers
+        source = path.read_text(encoding="utf-8")
+        legacy_tree = legacy.parse(source)
+        current_tree = current.parse(source)
+
+        assert current_tree == legacy_tree
+        assert dump_ast(CalcTransformer().transform(current_tree)) == dump_ast(CalcTransformer().transform(legacy_tree))
+
+    @pytest.mark.parametrize("path", CORPUS, ids=lambda path: path.name)
+    def test_whitespace_variants_agree(self, parsers, path):
+        """Test that whitespace variants accepted by the legacy grammar parse identically"""
+        legacy, current = parsers
+        source = path.read_text(encoding="utf-8")
+        rng = random.Random(path.name)
+        accepted = 0
+        for _ in range(VARIANTS):
+            variant = respace(source, rng)
+            try:
+                legacy_tree = legacy.parse(variant)
+            except UnexpectedInput:
+                continue
+            accepted += 1
+            assert current.parse(variant) == legacy_tree, variant
+        assert accepted > 0
+
+    def test_whitespace_is_not_tokenized(self, parsers):
+        """Test that whitespace no longer reaches the parser as tokens"""
+        legacy, current = parsers
+        source = (ROOT / "tests" / "test.rs").read_text(encoding="utf-8")
+
+        legacy_tokens = sum(1 for _ in legacy.parse_interactive(source).iter_parse())
+        current_tokens = sum(1 for _ in current.parse_interactive(source).iter_parse())
+        assert current_tokens < legacy_tokens / 2
+
+    def test_previously_rejected_whitespace_is_accepted(self, parsers):
+        """Test that whitespace the legacy grammar rejected is now ignored"""
+        legacy, current = parsers
+        source = "\n  fn f( a: i32 ) -> i32 { }\n\tfn main() { f( 1 ); }\n"
+
+        with pytest.raises(UnexpectedInput):
+            legacy.parse(source)
+        assert current.parse(source) == current.parse("fn f(a: i32) -> i32 {} fn main() { f(1); }")
@@ -1,9 +1,20 @@
+import io
 import pytest
 import tempfile
 import os
-from src.parser.grammar_loader import load_grammar
-from lark import Lark
-from lark.exceptions import GrammarError
+import contextlib
+from pathlib import Path
+from src.ast.node import Node
+from src.parser.calc_transformer import CalcTransformer
+from src.parser.grammar_loader import load_grammar, parse_ast
+from src.parser.parse_cache import encode_ast
+from src.parser.standalone_parser import build_standalone_parser
+from lark import Lark, Tree
+from lark.exceptions import GrammarError, UnexpectedInput
+
+ROOT = Path(__file__).resolve().parent.parent
+GRAMMAR = str(ROOT / "grammar" / "calc_grammar.lark")
+SOURCES = [ROOT / "tests" / "test.rs"] + sorted((ROOT / "tests" / "conformance").glob("*.rs"))
 
 
 class TestGrammarLoader:
@@ -87,4 +98,63 @@ NUMBER: /[0-9]+/
             
             # Both should be Lark instances (caching is internal to Lark)
             assert isinstance(parser1, Lark)
-            assert isinstance(parser2, Lark)
\ No newline at end of file
+            assert isinstance(parser2, Lark)
+
+
+def two_step(source):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return CalcTransformer().transform(load_grammar(GRAMMAR, "top_level").parse(source))
+
+
+def inline(source, standalone_path=None):
+    parser = load_grammar(GRAMMAR, "top_level", standalone_path, inline_transform=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(source)
+
+
+class TestInlineTransform:
+    """Test load_grammar(inline_transform=True) against parse + CalcTransformer.transform"""
+
+    @pytest.mark.parametrize("path", SOURCES, ids=lambda path: path.name)
+    def test_same_ast_as_two_step(self, path):
+        """Test that the inline parse builds the same nodes, values and spans"""
+        source = path.read_text(encoding="utf-8")
+        root = inline(source)
+
+        assert root.__class__ is Node
+        # encode_ast は種別・値・リストの形・span をすべて書き出す
+        assert encode_ast(root) == encode_ast(two_step(source))
+
+    def test_deep_expression(self):
+        """Test a long left-recursive expression"""
+        terms = " + ".join(f"(a - {i}) * {i % 7 + 1}" for i in range(2000))
+        source = f"fn main() -> i32 {{\n    let a = 3;\n    let x = {terms};\n    return x;\n}}"
+
+        root = inline(source)
+        assert encode_ast(root) == encode_ast(two_step(source))
+        # 先頭の "(" は木に残らないので、式の span は 14 列目の a から始まる
+        assert root.lhs[0].rhs[1].lhs.rhs.span == (3, 14, 3, len(terms) + 13)
+
+    def test_standalone_parser(self, tmp_path):
+        """Test that the generated parser tables accept the inline transformer too"""
+        standalone_path = str(tmp_path / "calc_parser_standalone.py")
+        build_standalone_parser(GRAMMAR, "top_level", standalone_path)
+        source = SOURCES[0].read_text(encoding="utf-8")
+
+        assert encode_ast(inline(source, standalone_path)) == encode_ast(two_step(source))
+
+    def test_parse_ast_accepts_both_parsers(self):
+        """Test that parse_ast transforms only when the parser does not do it inline"""
+        source = SOURCES[0].read_text(encoding="utf-8")
+        plain = load_grammar(GRAMMAR, "top_level")
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert isinstance(plain.parse(source), Tree)
+            roots = [parse_ast(plain, source), parse_ast(load_grammar(GRAMMAR, "top_level", inline_transform=True), source)]
+        assert encode_ast(roots[0]) == encode_ast(roots[1])
+
+    def test_syntax_error_position(self):
+        """Test that syntax errors report the same position"""
+        source = "fn main() -> i32 {\n    let = 2;\n}"
+        with pytest.raises(UnexpectedInput) as error:
+            inline(source)
+        assert (error.value.line, error.value.column) == (2, 9)
@@ -0,0 +1,158 @@
+import pytest
+from pathlib import Path
+from src.parser.calc_transformer import CalcTransformer
+from src.parser.grammar_loader import load_grammar
+from src.parser.incremental import IncrementalDocument, TextEdit, resolver_checker
+
+ROOT = Path(__file__).resolve().parent.parent
+GRAMMAR = str(ROOT / "grammar" / "calc_grammar.lark")
+
+SOURCE = """fn add(a: i32, b: i32) -> i32 {
+    return a + b;
+}
+fn twice(x: i32) -> i32 {
+    let y = add(x, x);
+    return y;
+}
+fn other() -> i32 {
+    let z = 1;
+    return z;
+}
+fn main() -> i32 {
+    let x = twice(2);
+}
+"""
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return load_grammar(GRAMMAR, "function")
+
+
+@pytest.fixture(scope="module")
+def full_parser():
+    return load_grammar(GRAMMAR, "top_level")
+
+
+def replace(document, old, new):
+    """Apply an edit replacing the first occurrence of old"""
+    start = document.text.index(old)
+    return document.apply_edit(TextEdit(start, start + len(old), new))
+
+
+def counting_checker(calls):
+    def checker(document, function):
+        calls.append(str(function.get_lhs().get_lhs()))
+        return resolver_checker(document, function)
+    return checker
+
+
+class TestIncrementalDocument:
+    """Test incremental.py functionality"""
+
+    def test_initial_ast_matches_full_parse(self, dump_ast, parser, full_parser):
+        """Test that the initial document AST equals a whole-file parse"""
+        document = IncrementalDocument(SOURCE, parser)
+
+        assert dump_ast(document.root) == dump_ast(CalcTransformer().transform(full_parser.parse(SOURCE)))
+        assert document.diagnostics() == []
+
+    def test_edit_reparses_only_the_touched_function(self, dump_ast, parser, full_parser):
+        """Test that an edit inside one function reparses just that function"""
+        document = IncrementalDocument(SOURCE, parser)
+        root = document.root
+        untouched = root.get_lhs()[0]
+        reparsed = document.reparsed
+
+        replace(document, "let z = 1;", "let z = 1 + 2 * 3;")
+
+        assert document.reparsed == reparsed + 1
+        assert document.root is root
+        assert root.get_lhs()[0] is untouched
+        assert dump_ast(root) == dump_ast(CalcTransformer().transform(full_parser.parse(document.text)))
+
+    def test_body_edit_rechecks_only_that_function(self, parser):
+        """Test that a body-only edit does not invalidate callers"""
+        calls = []
+        document = IncrementalDocument(SOURCE, parser, counting_checker(calls))
+        document.diagnostics()
+        calls.clear()
+
+        invalidated = replace(document, "return a + b;", "return a * b;")
+        document.diagnostics()
+
+        assert invalidated == {"add"}
+        assert calls == ["add"]
+
+    def test_signature_change_rechecks_callers(self, parser):
+        """Test that changing parameters invalidates the callers"""
+        calls = []
+        document = IncrementalDocument(SOURCE, parser, counting_checker(calls))
+        document.diagnostics()
+        calls.clear()
+
+        invalidated = replace(document, "fn add(a: i32, b: i32)", "fn add(a: i32)")
+        diagnostics = document.diagnostics()
+
+        assert invalidated == {"add", "twice"}
+        assert sorted(calls) == ["add", "twice"]
+        messages = [(d.function, d.message) for d in diagnostics]
+        assert ("add", "Variable 'b' not found in function scope 'add'") in messages
+        assert ("twice", "Function add expects 1 arguments but got 2") in messages
+
+    def test_brace_edit_merges_and_splits_functions(self, dump_ast, parser, full_parser):
+        """Test that edits changing function boundaries keep the AST consistent"""
+        document = IncrementalDocument(SOURCE, parser)
+
+        # 閉じ括弧を消すと次の関数と合わせて構文エラーになる
+        start = document.text.index("}\nfn other")
+        document.apply_edit(TextEdit(start, start + 1, ""))
+        errors = [d for d in document.diagnostics() if d.function is None]
+        assert len(errors) == 1
+
+        document.apply_edit(TextEdit(start, start, "}"))
+        assert document.text == SOURCE
+        assert [d for d in document.diagnostics() if d.function is None] == []
+        assert dump_ast(document.root) == dump_ast(CalcTransformer().transform(full_parser.parse(SOURCE)))
+
+    def test_syntax_error_position_is_absolute(self, parser):
+        """Test that syntax errors are reported at file positions"""
+        document = IncrementalDocument(SOURCE, parser)
+        replace(document, "let z = 1;", "let = 1;")
+
+        [error] = document.diagnostics()
+        assert error.function is None
+        assert (error.line, error.column) == (9, 9)
+
+    def test_removed_function_invalidates_callers(self, parser):
+        """Test that deleting a callee reports its callers"""
+        document = IncrementalDocument(SOURCE, parser)
+        document.diagnostics()
+        start = document.text.index("fn add")
+        end = document.text.index("fn twice")
+
+        invalidated = document.apply_edit(TextEdit(start, end, ""))
+
+        assert "twice" in invalidated
+        assert [d.message for d in document.diagnostics()] == ["Function add is not defined"]
+
+    def test_duplicate_definition(self, parser):
+        """Test that defining a function twice is reported for both definitions"""
+        document = IncrementalDocument(SOURCE, parser)
+        document.apply_edit(TextEdit(len(SOURCE), len(SOURCE), "fn other() -> i32 {\n    return 2;\n}\n"))
+
+        duplicates = [d for d in document.diagnostics() if d.message == "Function other is defined more than once"]
+        assert [d.line for d in duplicates] == [8, 15]
+
+    def test_edit_out_of_range(self, parser):
+        """Test that invalid edit ranges are rejected"""
+        document = IncrementalDocument(SOURCE, parser)
+
+        with pytest.raises(ValueError):
+            document.apply_edit(TextEdit(5, len(SOURCE) + 1, ""))
+
+    def test_edit_from_line_column_range(self, parser):
+        """Test building an edit from editor line and column positions"""
+        edit = TextEdit.from_range(SOURCE, (9, 13), (9, 14), "5")
+
+        assert SOURCE[edit.start:edit.end] == "1"
@@ -0,0 +1,200 @@
+import pytest
+from src.interpreter.eval import Eval
+from src.interpreter.interpreter import Interpreter, Variable, Types, type_of
+
+
+class TestInterpreterValues:
+    """Test the unboxed value model of interpreter.py"""
+
+    def test_expressions_return_plain_values(self, build_ast):
+        """Test that literals and arithmetic evaluate to Python values"""
+        root = build_ast("fn main() -> i32 { let x = 2 * 3 + 1; }")
+        interpreter = Interpreter(root)
+        interpreter.execute()
+        let = root.lhs[0].rhs[0].lhs
+
+        assert interpreter.execute(let.rhs) == 7
+        assert type(interpreter.execute(let.rhs)) is int
+
+    def test_locals_are_stored_as_variables(self, build_ast):
+        """Test that only named storage is wrapped, with the value's type"""
+        frame = Interpreter(build_ast("""
+fn main() -> i32 {
+    let a = 7 / 2;
+    let s = "hi";
+    let b = true;
+    let x = a * 2;
+}
+""")).execute()
+
+        assert [(v.get_name(), v.get_value(), v.get_type()) for v in frame.values] == [
+            ("a", 3.5, Types.NUM),
+            ("s", "hi", Types.STR),
+            ("b", True, Types.BOOL),
+            ("x", 7.0, Types.NUM),
+        ]
+
+    def test_call_arguments_and_results(self, build_ast):
+        """Test that arguments are bound as variables and results come back unboxed"""
+        frame = Interpreter(build_ast("""
+fn add(a: i32, b: i32) -> i32 { return a + b; }
+fn main() -> i32 { let x = add(2, 3) * 10; }
+""")).execute()
+
+        assert frame.get_variable("x").get_value() == 50
+
+    def test_variable_has_no_instance_dict(self):
+        """Test that Variable uses __slots__"""
+        variable = Variable("x", 1, Types.NUM)
+
+        assert not hasattr(variable, "__dict__")
+        with pytest.raises(AttributeError):
+            variable.other = 1
+
+    def test_type_of(self):
+        """Test the mapping from runtime values to language types"""
+        assert [type_of(v) for v in (1, 1.5, True, "s", None)] == [Types.NUM, Types.NUM, Types.BOOL, Types.STR, Types.VOID]
+
+
+SPECIALIZED = """
+fn main() -> i32 {
+    let a = 3;
+    let f = 0.5;
+    let b = a * 2 + 1;
+    let c = f * 4 - 1;
+    let d = -(a + 1) / 2;
+    let s = "x";
+    let x = b + c + d;
+}
+"""
+
+
+class TestSpecialization:
+    """Test execution with the Eval type table"""
+
+    def test_same_values_as_dynamic_execution(self, build_ast):
+        """Test that typed subtrees compute exactly what the generic handlers compute"""
+        root = build_ast(SPECIALIZED)
+        types = Eval(root, verbose=False).infer_types()
+
+        typed = Interpreter(root, types=types).execute()
+        plain = Interpreter(root).execute()
+
+        assert [(v.get_value(), type(v.get_value()), v.get_type()) for v in typed.values] == \
+            [(v.get_value(), type(v.get_value()), v.get_type()) for v in plain.values]
+        assert typed.get_variable("x").get_value() == 7 + 1.0 - 2.0
+
+    def test_typed_let_skips_runtime_type_lookup(self, build_ast):
+        """Test that a let with a known type takes it from the table"""
+        root = build_ast("fn main() -> i32 { let x = 1 + 2; }")
+        types = Eval(root, verbose=False).infer_types()
+        let = root.lhs[0].rhs[0].lhs
+        types[let.rhs] = "boolean"
+
+        frame = Interpreter(root, types=types).execute()
+
+        assert frame.get_variable("x").get_type() == Types.BOOL
+
+
+def run_x(root):
+    return Interpreter(root).execute().get_variable("x").get_value()
+
+
+class TestControlFlow:
+    """Test calls, returns and control flow on the tree walker"""
+
+    def test_recursive_fib(self, build_ast):
+        """Test that a recursive function gets its own frame per call"""
+        assert run_x(build_ast("""
+fn fib(n: i32) -> i32 {
+    if n < 2 {
+        return n;
+    }
+    return fib(n - 1) + fib(n - 2);
+}
+fn main() -> i32 { let x = fib(15); }
+""")) == 610
+
+    def test_return_stops_the_callee(self, build_ast):
+        """Test that statements after return are not executed"""
+        assert run_x(build_ast("""
+fn f() -> i32 {
+    return 1;
+    let y = 2;
+}
+fn main() -> i32 { let x = f(); }
+""")) == 1
+
+    def test_call_to_later_function(self, build_ast):
+        """Test that functions defined after the caller can be called"""
+        assert run_x(build_ast("""
+fn main() -> i32 { let x = helper(2); }
+fn helper(a: i32) -> i32 { return a * 2; }
+""")) == 4
+
+    def test_if_else_while_loop_match(self, build_ast):
+        """Test the control-flow statements and comparisons"""
+        assert run_x(build_ast("""
+fn sign(n: i32) -> i32 {
+    if n < 0 {
+        return -1;
+    } else {
+        return 1;
+    }
+}
+fn first_over(limit: i32) -> i32 {
+    let i = 0;
+    loop {
+        if i * i > limit {
+            return i;
+        }
+        let i = i + 1;
+    }
+}
+fn name(n: i32) -> i32 {
+    match n {
+        1 => return 10;,
+        2 => return 20;,
+        _ => return 0;,
+    }
+    return -1;
+}
+fn main() -> i32 {
+    let i = 0;
+    let s = 0;
+    while i < 5 {
+        let s = s + i;
+        let i = i + 1;
+    }
+    let x = s * 1000 + sign(-3) * 100 + first_over(10) * 10 + name(2) + name(7);
+}
+""")) == 10000 - 100 + 40 + 20
+
+    def test_short_circuit(self, build_ast):
+        """Test that && and || skip the right operand"""
+        assert run_x(build_ast("""
+fn main() -> i32 {
+    let a = false && 1 / 0 == 0;
+    let b = true || 1 / 0 == 0;
+    let x = 0;
+    if b {
+        if a {
+            let x = 1;
+        } else {
+            let x = 2;
+        }
+    }
+}
+""")) == 2
+
+    def test_deep_recursion(self, build_ast):
+        """Test recursion close to the call depth limit"""
+        assert run_x(build_ast("""
+fn depth(n: i32) -> i32 {
+    if n < 1 {
+        return 0;
+    }
+    return depth(n - 1) + 1;
+}
+fn main() -> i32 { let x = depth(900); }
+""")) == 900
@@ -0,0 +1,38 @@
+from src.ast.node import Node, Kind, KIND_NAMES, kind_tag
+
+
+class TestNode:
+    """Test node.py functionality"""
+
+    def test_kind_string_and_tag_agree(self):
+        """Test that string kinds are stored as integer tags"""
+        node = Node("ADD_EXPR", Node("NUM", "1"), Node("NUM", "2"))
+
+        assert node.tag == Kind.ADD_EXPR
+        assert node.get_kind() == "ADD_EXPR"
+        assert Node(Kind.ADD_EXPR, None).get_kind() == "ADD_EXPR"
+
+    def test_node_has_no_instance_dict(self):
+        """Test that nodes use __slots__ instead of a per-instance __dict__"""
+        node = Node("NUM", "1")
+
+        assert not hasattr(node, "__dict__")
+
+    def test_unknown_kind_is_registered(self):
+        """Test that unknown kind names get a fresh tag"""
+        tag = kind_tag("SOME_NEW_KIND")
+
+        assert KIND_NAMES[tag] == "SOME_NEW_KIND"
+        assert Node("SOME_NEW_KIND", None).tag == tag
+
+    def test_children_follow_layout(self):
+        """Test that children() yields child nodes in source order"""
+        name = Node("ID", "f")
+        params = Node("PARAM_LIST", [])
+        return_type = Node("PRIMITIVE_TYPE", "i32")
+        body = [Node("STATEMENT", Node("RETURN", None))]
+        function = Node("FUNCTION", name, body, return_type, params)
+
+        assert list(function.children()) == [name, params, return_type, body[0]]
+        assert list(Node("NUM", "1").children()) == []
+        assert list(Node("RETURN", None).children()) == []
@@ -0,0 +1,174 @@
+import io
+import math
+import pytest
+import contextlib
+from pathlib import Path
+from src.ast.node import Kind
+from src.interpreter.compiler import Compiler
+from src.interpreter.optimizer import Optimizer
+from src.interpreter.resolver import Resolver
+from src.interpreter.vm import VM
+from src.parser.calc_transformer import CalcTransformer
+from src.parser.grammar_loader import load_grammar
+
+ROOT = Path(__file__).resolve().parent.parent
+GRAMMAR = str(ROOT / "grammar" / "calc_grammar.lark")
+SOURCE = (ROOT / "tests" / "test.rs").read_text(encoding="utf-8")
+CORPUS = [ROOT / "tests" / "test.rs"] + sorted((ROOT / "tests" / "conformance").glob("*.rs"))
+
+# 右辺が定数でない前の束縛（引数など）を読む let
+SELF_READS = {
+    "parameter": ("fn f(b: i32) -> i32 {\n    let b = b + 1;\n    let b = b * 2;\n    return b;\n}\n"
+                  "fn main() -> i32 {\n    let x = f(5);\n    return x;\n}", 12),
+    "shadowed_local": ("fn f(n: i32) -> i32 {\n    let x = n;\n    let x = x + 1;\n    return x;\n}\n"
+                       "fn main() -> i32 {\n    let x = f(4);\n    return x;\n}", 5),
+    "loop_body": ("fn main() -> i32 {\n    let i = 0;\n    let x = 1;\n    while i < 3 {\n        let x = x * 2;\n"
+                  "        let x = x + i;\n        let i = i + 1;\n    }\n    return x;\n}", 12),
+}
+
+CONTROL_FLOW = """fn count(n: i32) -> i32 {
+    let i = 0;
+    let total = 10 * 2;
+    while i < n {
+        let total = total + i;
+        let i = i + 1;
+    }
+    return total;
+}
+fn pick(n: i32) -> i32 {
+    let x = 1;
+    if n > 2 {
+        let x = 5;
+    }
+    match n {
+        1 => let x = x + 100;,
+        _ => let x = x + 0;,
+    }
+    return x;
+}
+fn main() -> i32 {
+    let x = count(4) + pick(3) + pick(1);
+}
+"""
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return load_grammar(GRAMMAR, "top_level")
+
+
+def transform(parser, source):
+    return CalcTransformer().transform(parser.parse(source))
+
+
+def function_named(root, name):
+    return next(function for function in root.lhs if str(function.lhs.lhs) == name)
+
+
+def let_values(function):
+    """関数本体の let 文を (変数名, 右辺の種別, 右辺のトークン) で返す"""
+    lets = []
+    for statement in function.rhs:
+        node = statement.lhs if statement.tag == Kind.STATEMENT else statement
+        if node.tag == Kind.LET:
+            lets.append((str(node.lhs.lhs), node.rhs.get_kind(), node.rhs.lhs if node.rhs.tag in (Kind.NUM, Kind.FLOAT) else None))
+    return lets
+
+
+def run(root):
+    vm = VM(Compiler().compile(root))
+    vm.run()
+    return vm.get_local("x")
+
+
+def run_main(root):
+    """main の戻り値と変数 x の値"""
+    vm = VM(Compiler().compile(root))
+    return vm.run(), vm.get_local("x")
+
+
+class TestOptimizer:
+    """Test optimizer.py functionality"""
+
+    def test_fold_and_propagate(self, parser):
+        """Test that constant chains collapse to the last store with a folded value"""
+        root = transform(parser, SOURCE)
+        optimizer = Optimizer()
+        optimizer.optimize(root)
+
+        # 2*2/(2+2)-1 は実行時と同じく真の除算で 0.0 になる
+        assert let_values(function_named(root, "sub2")) == [("x", "FLOAT", "0.0")]
+        assert let_values(function_named(root, "sub")) == [("x", "ADD_EXPR", None), ("z", "ADD_EXPR", None)]
+        assert optimizer.removed == 9
+        assert optimizer.folded > 0 and optimizer.propagated > 0
+
+    def test_calls_and_unknown_values_are_kept(self, parser):
+        """Test that stores with calls or parameters are not folded or removed"""
+        root = transform(parser, "fn f(a: i32) -> i32 {\n    let x = g();\n    let x = a + 1;\n    return x;\n}\nfn g() -> i32 {\n    return 1;\n}")
+        Optimizer().optimize(root)
+
+        assert [name for name, _, _ in let_values(function_named(root, "f"))] == ["x", "x"]
+
+    def test_division_by_zero_is_not_folded(self, parser):
+        """Test that a runtime error is not folded away"""
+        root = transform(parser, "fn main() -> i32 {\n    let x = 1 / 0;\n    let x = 2;\n}")
+        Optimizer().optimize(root)
+
+        assert let_values(function_named(root, "main")) == [("x", "DIV_EXPR", None), ("x", "NUM", "2")]
+
+    def test_branch_assignments_are_not_propagated(self, parser):
+        """Test that values assigned in loops and branches are not treated as constants"""
+        root = transform(parser, CONTROL_FLOW)
+        Optimizer().optimize(root)
+        count = function_named(root, "count")
+        pick = function_named(root, "pick")
+
+        # ループ本体で代入される total と、if・match の中で代入される x は伝播しない
+        assert Resolver.unwrap(count.rhs[-1].lhs.lhs).tag == Kind.ID
+        assert let_values(count)[1] == ("total", "NUM", "20")
+        assert Resolver.unwrap(pick.rhs[-1].lhs.lhs).tag == Kind.ID
+
+    @pytest.mark.parametrize("source", [SOURCE, CONTROL_FLOW], ids=["test.rs", "control_flow"])
+    def test_same_result_as_unoptimized(self, parser, source):
+        """Test that the optimized program computes the same value"""
+        optimized = Optimizer().optimize(transform(parser, source))
+
+        assert run(optimized) == run(transform(parser, source))
+
+    @pytest.mark.parametrize("name", SELF_READS)
+    def test_store_read_by_next_store_is_kept(self, parser, name):
+        """Test that a let whose value is read by the next let of the same name is not removed"""
+        source, expected = SELF_READS[name]
+        optimized = Optimizer().optimize(transform(parser, source))
+
+        assert run(optimized) == expected
+        assert run(transform(parser, source)) == expected
+
+    def test_self_read_keeps_both_stores(self, parser):
+        """Test that let b = b * 2 keeps the store of b it reads"""
+        root = transform(parser, SELF_READS["parameter"][0])
+        optimizer = Optimizer()
+        optimizer.optimize(root)
+
+        assert [name for name, _, _ in let_values(function_named(root, "f"))] == ["b", "b"]
+        assert optimizer.removed == 0
+
+    def test_negative_zero_keeps_its_sign(self, parser):
+        """Test that a folded -0.0 is not merged with an earlier 0.0 in the constant pool"""
+        source = "fn main() -> i32 { let a = 0.0; let x = 0.0 * -1.0; return x; }"
+        with contextlib.redirect_stdout(io.StringIO()):
+            plain = transform(parser, source)
+            optimized = Optimizer().optimize(transform(parser, source))
+
+        results = [run_main(optimized), run_main(plain)]
+        assert [[math.copysign(1.0, value) for value in result] for result in results] == [[-1.0, -1.0]] * 2
+
+    @pytest.mark.parametrize("path", CORPUS, ids=lambda path: path.name)
+    def test_corpus_same_as_unoptimized(self, parser, path):
+        """Test optimized against unoptimized execution over the conformance corpus"""
+        source = path.read_text(encoding="utf-8")
+        with contextlib.redirect_stdout(io.StringIO()):
+            plain = transform(parser, source)
+            optimized = Optimizer().optimize(transform(parser, source))
+
+        assert run_main(optimized) == run_main(plain)
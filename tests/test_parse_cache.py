@@ -0,0 +1,88 @@
+import os
+import pytest
+from pathlib import Path
+from src.ast.node import Node
+from src.parser.grammar_loader import load_grammar
+from src.parser.parse_cache import ParseCache, encode_ast, decode_ast
+
+ROOT = Path(__file__).resolve().parent.parent
+GRAMMAR = str(ROOT / "grammar" / "calc_grammar.lark")
+SOURCE = "fn main() -> i32 { let x = 2 * (3 + 4); return x; }"
+
+
+class TestParseCache:
+    """Test parse_cache.py functionality"""
+
+    def test_encode_decode_roundtrip(self, dump_ast, tmp_path):
+        """Test that a transformed AST survives serialization"""
+        cache = ParseCache(GRAMMAR, cache_dir=str(tmp_path))
+        root = cache.parse(load_grammar(GRAMMAR, "top_level"), SOURCE)
+
+        assert dump_ast(decode_ast(encode_ast(root))) == dump_ast(root)
+
+    def test_spans_roundtrip(self, tmp_path):
+        """Test that source spans are stored, and shared spans stay shared"""
+        cache = ParseCache(GRAMMAR, cache_dir=str(tmp_path))
+        root = cache.parse(load_grammar(GRAMMAR, "top_level"), SOURCE)
+        let = root.get_lhs()[0].get_rhs()[0].get_lhs()
+
+        decoded = decode_ast(encode_ast(root)).get_lhs()[0].get_rhs()[0].get_lhs()
+        assert decoded.get_span() == let.get_span() == (1, 24, 1, 38)
+        assert decoded.get_rhs().get_rhs().get_span() is decoded.get_rhs().get_rhs().get_lhs().get_span()
+
+    def test_deep_tree_roundtrip(self):
+        """Test that very deep expression chains do not hit the recursion limit"""
+        expr = Node("NUM", "0")
+        for i in range(5000):
+            expr = Node("ADD_EXPR", expr, Node("NUM", str(i)))
+
+        decoded = decode_ast(encode_ast(expr))
+        depth = 0
+        while decoded.get_kind() == "ADD_EXPR":
+            decoded = decoded.get_lhs()
+            depth += 1
+        assert depth == 5000
+
+    def test_hit_after_store(self, dump_ast, tmp_path):
+        """Test that a stored AST is returned for the same source"""
+        cache = ParseCache(GRAMMAR, cache_dir=str(tmp_path))
+        parser = load_grammar(GRAMMAR, "top_level")
+        first = cache.parse(parser, SOURCE)
+        second = cache.load(SOURCE)
+
+        assert second is not None
+        assert dump_ast(second) == dump_ast(first)
+        assert cache.hits == 1
+        assert cache.load(SOURCE + " ") is None
+
+    def test_key_depends_on_grammar(self, tmp_path):
+        """Test that a different grammar file gives a different key"""
+        other_grammar = tmp_path / "other.lark"
+        other_grammar.write_text("start: \"a\"\n", encoding="utf-8")
+
+        assert ParseCache(GRAMMAR).key(SOURCE) != ParseCache(str(other_grammar)).key(SOURCE)
+
+    def test_corrupted_entry_is_a_miss(self, tmp_path):
+        """Test that unreadable entries are discarded"""
+        cache = ParseCache(GRAMMAR, cache_dir=str(tmp_path))
+        path = tmp_path / (cache.key(SOURCE) + ".ast")
+        path.write_bytes(b"not an ast")
+
+        assert cache.load(SOURCE) is None
+        assert not path.exists()
+
+    def test_lru_eviction(self, tmp_path):
+        """Test that the least recently used entries are evicted first"""
+        root = Node("TOP_LEVEL", [])
+        entry_size = len(encode_ast(root))
+        cache = ParseCache(GRAMMAR, cache_dir=str(tmp_path), max_bytes=entry_size * 2)
+
+        cache.store("a", root)
+        cache.store("b", root)
+        os.utime(tmp_path / (cache.key("a") + ".ast"), (1, 1))
+        os.utime(tmp_path / (cache.key("b") + ".ast"), (2, 2))
+        cache.store("c", root)
+
+        assert cache.load("a") is None
+        assert cache.load("b") is not None
+        assert cache.load("c") is not None
@@ -0,0 +1,97 @@
+import io
+import json
+import contextlib
+from pathlib import Path
+from src.ast.node import Kind
+from src.interpreter.eval import Eval
+from src.interpreter.interpreter import Interpreter
+from src.interpreter.profiler import Profiler
+from src.parser.calc_transformer import CalcTransformer
+from src.parser.grammar_loader import load_grammar
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCE = """
+fn sq(a: i32) -> i32 { return a * a; }
+fn f(n: i32) -> i32 { return sq(n) + sq(n + 1); }
+fn main() -> i32 { let x = f(3) + f(4) * 2; return x; }
+"""
+
+
+def run(source, profiler, typed=False):
+    parser = load_grammar(str(ROOT / "grammar" / "calc_grammar.lark"), "top_level")
+    with contextlib.redirect_stdout(io.StringIO()):
+        root = CalcTransformer().transform(parser.parse(source.strip()))
+        types = Eval(root, verbose=False).infer_types() if typed else None
+        return Interpreter(root, types=types, profiler=profiler).execute()
+
+
+class TestProfiler:
+    """Test profiler.py functionality"""
+
+    def test_function_calls_and_times(self, ticking_clock):
+        """Test call counts and inclusive / exclusive time per function"""
+        profiler = Profiler(clock=ticking_clock())
+        frame = run(SOURCE, profiler)
+
+        assert frame.get_variable("x").get_value() == 25 + 2 * 41
+        stats = {name: (s.calls, s.inclusive, s.exclusive) for name, s in profiler.functions.items()}
+        # main [0, 13] → f [1, 6] → sq [2, 3], sq [4, 5] / f [7, 12] → sq [8, 9], sq [10, 11]
+        assert stats == {"main": (1, 13, 3), "f": (2, 10, 6), "sq": (4, 4, 4)}
+
+    def test_node_kind_counts(self):
+        """Test that every executed node is counted by kind"""
+        profiler = Profiler()
+        run(SOURCE, profiler)
+
+        assert profiler.node_counts[Kind.FUNCTION_CALL] == 6
+        assert profiler.node_counts[Kind.MUL_EXPR] == 5
+        assert profiler.node_counts[Kind.FUNCTION] == 3
+        assert profiler.to_dict()["node_kinds"]["ID"] == 13
+
+    def test_specialized_subtrees_are_counted_once(self):
+        """Test that a closure for a typed subtree counts as one visit of its root"""
+        profiler = Profiler()
+        run("fn main() -> i32 { let a = 2; let x = a * 3 + 1; return x; }", profiler, typed=True)
+
+        assert profiler.node_counts[Kind.ADD_EXPR] == 1
+        assert profiler.node_counts[Kind.MUL_EXPR] == 0
+
+    def test_recursive_inclusive_time_is_not_double_counted(self, ticking_clock):
+        """Test that only the outermost activation of a recursive function adds inclusive time"""
+        profiler = Profiler(clock=ticking_clock())
+        profiler.enter("main")
+        profiler.enter("fact")
+        profiler.enter("fact")
+        profiler.leave()
+        profiler.leave()
+        profiler.leave()
+
+        assert profiler.functions["fact"].inclusive == 3
+        assert profiler.functions["fact"].exclusive == 3
+        assert profiler.collapsed() == ["main 2000000", "main;fact 2000000", "main;fact;fact 1000000"]
+
+    def test_exports(self, ticking_clock, tmp_path):
+        """Test the JSON and collapsed-stack files"""
+        profiler = Profiler(clock=ticking_clock())
+        run(SOURCE, profiler)
+        profiler.write_json(str(tmp_path / "profile.json"))
+        profiler.write_collapsed(str(tmp_path / "profile.folded"))
+
+        data = json.loads((tmp_path / "profile.json").read_text(encoding="utf-8"))
+        assert list(data["functions"]) == ["f", "sq", "main"]
+        assert data["functions"]["sq"] == {"calls": 4, "inclusive_ms": 4000, "exclusive_ms": 4000}
+        assert (tmp_path / "profile.folded").read_text(encoding="utf-8").splitlines() == [
+            "main 3000000",
+            "main;f 6000000",
+            "main;f;sq 4000000",
+        ]
+
+    def test_disabled_keeps_plain_handlers(self):
+        """Test that without a profiler the interpreter dispatches to its own methods"""
+        parser = load_grammar(str(ROOT / "grammar" / "calc_grammar.lark"), "top_level")
+        with contextlib.redirect_stdout(io.StringIO()):
+            interpreter = Interpreter(CalcTransformer().transform(parser.parse(SOURCE.strip())))
+
+        assert interpreter.profiler is None
+        assert interpreter.binary_handlers[Kind.MUL_EXPR] == interpreter._execute_mul_expr
+        assert interpreter.call_handlers[Kind.FUNCTION_CALL][1] == interpreter._execute_function_call
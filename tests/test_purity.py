@@ -0,0 +1,113 @@
+import pytest
+from pathlib import Path
+from src.ast.node import Node, Kind
+from src.interpreter.compiler import Compiler
+from src.interpreter.interpreter import Interpreter
+from src.interpreter.purity import MemoCache, MISSING, pure_functions
+from src.interpreter.vm import VM
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCE = (ROOT / "tests" / "test.rs").read_text(encoding="utf-8")
+
+FIB = """
+fn fib(n: i32) -> i32 {
+    if n < 2 { return n; }
+    return fib(n - 1) + fib(n - 2);
+}
+fn main() -> i32 { return fib(30); }
+"""
+
+
+def with_unknown_node(root, name):
+    """name の本体に未知の種別（組み込みの入出力などの拡張を想定）の式文を加える"""
+    for function in root.lhs:
+        if str(function.lhs.lhs) == name:
+            function.rhs.insert(0, Node(Kind.STATEMENT, Node("PRINT", Node(Kind.NUM, "1"))))
+    return root
+
+
+class TestPurity:
+    """Test purity.py functionality"""
+
+    def test_all_plain_functions_are_pure(self, build_ast):
+        """Test that arithmetic, control flow and recursion keep functions pure"""
+        assert pure_functions(build_ast(SOURCE)) == {"sub2", "sub", "params", "main"}
+        assert pure_functions(build_ast(FIB)) == {"fib", "main"}
+
+    def test_impurity_propagates_to_callers(self, build_ast):
+        """Test that calling an impure function makes the caller impure"""
+        root = with_unknown_node(build_ast(SOURCE), "sub2")
+
+        assert pure_functions(root) == {"params"}
+
+    def test_undefined_callee_is_impure(self, build_ast):
+        """Test that a call to an unknown function is not treated as pure"""
+        root = build_ast("fn f() -> i32 { return g(); }")
+
+        assert pure_functions(root) == set()
+
+    def test_lru_eviction_and_counters(self):
+        """Test that the least recently used entry is evicted"""
+        memo = MemoCache(max_entries=2)
+        memo.store("a", 1)
+        memo.store("b", None)
+        assert memo.lookup("a") == 1
+        memo.store("c", 3)
+
+        assert memo.lookup("b") is MISSING
+        assert memo.lookup("c") == 3
+        assert memo.stats() == {"hits": 2, "misses": 1, "evictions": 1, "entries": 2, "max_entries": 2}
+
+    def test_invalid_size(self):
+        """Test that a cache without room is rejected"""
+        with pytest.raises(ValueError, match="max_entries"):
+            MemoCache(0)
+
+
+class TestMemoization:
+    """Test memoized calls in the VM and the interpreter"""
+
+    def test_vm_memoizes_recursive_calls(self, build_ast):
+        """Test that each fib(n) body runs once and the result is unchanged"""
+        memo = MemoCache()
+        result = VM(Compiler().compile(build_ast(FIB)), memo=memo).run()
+
+        assert result == 832040
+        assert memo.misses == 31
+        assert memo.hits == 28
+
+    def test_vm_small_cache_still_correct(self, build_ast):
+        """Test that eviction only costs time, never correctness"""
+        memo = MemoCache(max_entries=2)
+        result = VM(Compiler().compile(build_ast(FIB.replace("fib(30)", "fib(15)"))), memo=memo).run()
+
+        assert result == 610
+        assert memo.evictions > 0
+
+    def test_vm_impure_functions_are_not_cached(self, build_ast):
+        """Test that functions marked impure always run"""
+        program = Compiler().compile(build_ast(FIB.replace("fib(30)", "fib(15)")))
+        program.get_function("fib").pure = False
+        memo = MemoCache()
+
+        assert VM(program, memo=memo).run() == 610
+        assert memo.stats()["entries"] == 0
+
+    def test_argument_types_are_part_of_the_key(self, build_ast):
+        """Test that f(1) and f(1.0) are cached separately"""
+        memo = MemoCache()
+        vm = VM(Compiler().compile(build_ast("""
+fn inc(a: i32) -> i32 { return a + 1; }
+fn main() -> i32 { let x = inc(1); let y = inc(1.0); return y; }
+""")), memo=memo)
+
+        assert repr(vm.run()) == "2.0"
+        assert vm.get_local("x") == 2 and type(vm.get_local("x")) is int
+
+    def test_interpreter_memoizes_repeated_calls(self, build_ast):
+        """Test that sub2() runs once when called twice with the same arguments"""
+        memo = MemoCache()
+        frame = Interpreter(build_ast(SOURCE), memo=memo).execute()
+
+        assert frame.get_variable("x").get_value() == 20.0
+        assert (memo.hits, memo.misses) == (1, 2)
@@ -0,0 +1,131 @@
+import pytest
+from pathlib import Path
+from src.interpreter.compiler import Compiler
+from src.interpreter.memory import CallDepthError
+from src.interpreter.python_backend import PythonBackend, generate_python
+from src.interpreter.vm import VM
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCE = (ROOT / "tests" / "test.rs").read_text(encoding="utf-8")
+CORPUS = [ROOT / "tests" / "test.rs"] + sorted((ROOT / "tests" / "conformance").glob("*.rs"))
+
+PROGRAM = """
+fn fib(n: i32) -> i32 {
+    if n < 2 { return n; } else { }
+    return fib(n - 1) + fib(n - 2);
+}
+fn classify(n: i32) -> String {
+    match n { 0 => return "zero";, 1 => return "one";, _ => return "many";, }
+}
+fn count(n: i32) -> i32 {
+    let i = 0;
+    let total = 0;
+    while i < n { let i = i + 1; let total = total + i; }
+    loop { if total > 100 { return total; } let total = total * 2; }
+}
+fn main() -> i32 {
+    let x = (1 + 2) * 3 - (4 - 5) / 2;
+    let b = !(1 < 2) == false && true || -(-x) > 0;
+    let s = classify(1);
+    if b { let x = x + 1; }
+    return fib(15) + count(10) + x;
+}
+"""
+
+
+def run_vm(root, entry="main"):
+    return VM(Compiler().compile(root)).run(entry)
+
+
+class TestPythonBackend:
+    """Test python_backend.py functionality"""
+
+    def test_same_result_as_vm(self, build_ast):
+        """Test that params, if/else, while, loop, match and calls agree with the VM"""
+        result = PythonBackend(build_ast(PROGRAM)).run()
+
+        assert result == run_vm(build_ast(PROGRAM))
+        assert type(result) is float
+
+    @pytest.mark.parametrize("expression", [
+        "1 - (2 - 3)",
+        "2 * 3 / (4 * 5)",
+        "-(2 + 3) * 4",
+        "!(1 == 1) == false",
+        "(1 < 2) == (3 < 4)",
+        "true && (false || true)",
+    ])
+    def test_grouping_is_preserved(self, build_ast, expression):
+        """Test that parentheses survive generation wherever the tree needs them"""
+        source = f"fn main() -> i32 {{ return {expression}; }}"
+
+        assert PythonBackend(build_ast(source)).run() == run_vm(build_ast(source))
+
+    def test_match_uses_the_first_matching_arm(self, build_ast):
+        """Test that arms are tried in order and the wildcard ends the chain"""
+        backend = PythonBackend(build_ast(PROGRAM))
+
+        assert [backend.run("classify", n) for n in (0, 1, 7)] == ["zero", "one", "many"]
+
+    def test_generated_source(self, build_ast):
+        """Test the shape of the emitted module"""
+        source = generate_python(build_ast("""
+fn empty() -> i32 { }
+fn pass(def: i32) -> i32 { let empty = def; return empty; }
+"""))
+
+        assert "def empty():\n    pass\n" in source
+        assert "def pass_(def_):\n    empty_ = def_\n    return empty_\n" in source
+
+    def test_code_object_is_compiled_once(self, build_ast):
+        """Test that repeated runs reuse the code object and the defined functions"""
+        backend = PythonBackend(build_ast(SOURCE))
+        code = backend.code
+
+        assert backend.run() is None
+        assert backend.run("sub") == 20.0
+        assert backend.code is code
+        assert PythonBackend(code=code).run("sub") == 20.0
+
+    def test_unknown_entry(self, build_ast):
+        """Test that a missing entry function is reported like the VM does"""
+        with pytest.raises(ValueError, match="Function start is not defined"):
+            PythonBackend(build_ast(SOURCE)).run("start")
+
+    def test_runaway_recursion(self, build_ast):
+        """Test that unbounded recursion raises CallDepthError"""
+        backend = PythonBackend(build_ast("fn f(n: i32) -> i32 { return f(n + 1); } fn main() -> i32 { return f(0); }"))
+
+        with pytest.raises(CallDepthError):
+            backend.run()
+
+    @pytest.mark.parametrize("path", CORPUS, ids=lambda path: path.name)
+    def test_main_locals_match_vm(self, build_ast, path):
+        """Test that get_local reads main's x as the VM does, also from a cached code object"""
+        root = build_ast(path.read_text(encoding="utf-8"))
+        vm = VM(Compiler().compile(root))
+        vm.run()
+        backend = PythonBackend(root)
+        backend.run()
+        cached = PythonBackend(code=backend.code)
+        cached.run()
+
+        assert backend.get_local("x") == cached.get_local("x") == vm.get_local("x")
+
+    def test_get_local_uses_renamed_identifiers(self, build_ast):
+        """Test that locals renamed by the emitter are found by their source name"""
+        backend = PythonBackend(build_ast("""
+fn f() -> i32 { return 1; }
+fn main() -> i32 {
+    let f = 2;
+    let pass = f + 1;
+    if pass > 2 { return pass; }
+    let y = 0;
+}
+"""))
+        backend.run()
+
+        assert (backend.get_local("f"), backend.get_local("pass")) == (2, 3)
+        assert backend.source.count("__observed__.update(locals())") == 2
+        with pytest.raises(KeyError, match="Variable 'y' not found"):
+            backend.get_local("y")
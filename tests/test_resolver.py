@@ -0,0 +1,96 @@
+import pytest
+from src.ast.node import Node
+from src.interpreter.resolver import Resolver
+from src.interpreter.memory import Frame, CallDepthError
+from src.interpreter.interpreter import Interpreter, Variable, Types
+
+
+def function(name, body, params=None):
+    param_list = None
+    if params:
+        param_list = Node("PARAM_LIST", [Node("PARAM", Node("ID", p), Node("PRIMITIVE_TYPE", "i32")) for p in params])
+    return Node("FUNCTION", Node("ID", name), body, Node("PRIMITIVE_TYPE", "i32"), param_list)
+
+
+def let(name, value):
+    return Node("STATEMENT", Node("LET", Node("ID", name), value))
+
+
+class TestResolver:
+    """Test resolver.py functionality"""
+
+    def test_slots_follow_declaration_order(self):
+        """Test that params come first and re-bound names keep their slot"""
+        read_a = Node("ID", "a")
+        body = [
+            let("x", read_a),
+            let("y", Node("NUM", "1")),
+            let("x", Node("ADD_EXPR", Node("ID", "x"), Node("ID", "y"))),
+        ]
+        scopes = Resolver().resolve(Node("TOP_LEVEL", [function("f", body, ["a"])]))
+
+        assert scopes["f"].local_names == ["a", "x", "y"]
+        assert scopes["f"].nparams == 1
+        assert read_a.get_slot() == 0
+        assert body[2].get_lhs().get_slot() == 1
+
+    def test_rhs_is_resolved_before_binding(self):
+        """Test that let x = x; does not see its own binding"""
+        root = Node("TOP_LEVEL", [function("main", [let("x", Node("ID", "x"))])])
+
+        with pytest.raises(ValueError, match="Variable 'x' not found in function scope 'main'"):
+            Resolver().resolve(root)
+
+    def test_all_errors_are_reported(self):
+        """Test that every unknown name is collected before raising"""
+        call = Node("FUNCTION_CALL", Node("ID", "missing"), [])
+        root = Node("TOP_LEVEL", [function("main", [let("x", Node("ID", "a")), let("y", call)])])
+        resolver = Resolver()
+
+        with pytest.raises(ValueError):
+            resolver.resolve(root)
+        assert len(resolver.errors) == 2
+        assert "Function missing is not defined" in resolver.errors
+
+
+class TestFrame:
+    """Test memory.Frame functionality"""
+
+    def test_get_variable(self):
+        """Test reading a variable by name from a list-backed frame"""
+        root = Node("TOP_LEVEL", [function("main", [let("x", Node("NUM", "1"))])])
+        frame = Frame(Resolver().resolve(root)["main"])
+        frame.values[0] = Variable("x", 1, Types.NUM)
+
+        assert frame.get_variable("x").get_value() == 1
+        with pytest.raises(KeyError):
+            frame.get_variable("y")
+
+    def test_interpreter_returns_main_frame(self):
+        """Test that the tree-walking interpreter stores locals in slots"""
+        body = [let("x", Node("NUM", "2")), let("y", Node("MUL_EXPR", Node("ID", "x"), Node("NUM", "3")))]
+        frame = Interpreter(Node("TOP_LEVEL", [function("main", body)])).execute()
+
+        assert frame.get_variable("y").get_value() == 6
+        assert frame.values == [frame.get_variable("x"), frame.get_variable("y")]
+
+    def test_interpreter_binds_parameters(self):
+        """Test that call arguments are bound to the callee's parameter slots"""
+        add = function("add", [
+            let("r", Node("ADD_EXPR", Node("ID", "a"), Node("ID", "b"))),
+            Node("STATEMENT", Node("RETURN", Node("ID", "r"))),
+        ], ["a", "b"])
+        call = Node("FUNCTION_CALL", Node("ID", "add"), [Node("ARG_LIST", [Node("NUM", "2"), Node("NUM", "5")])])
+        main = function("main", [let("x", call)])
+        frame = Interpreter(Node("TOP_LEVEL", [add, main])).execute()
+
+        assert frame.get_variable("x").get_value() == 7
+
+    def test_interpreter_recursion_limit(self):
+        """Test that unbounded recursion fails with a language-level error"""
+        call = Node("FUNCTION_CALL", Node("ID", "loop"), [])
+        loop = function("loop", [let("x", call)])
+        main = function("main", [let("x", Node("FUNCTION_CALL", Node("ID", "loop"), []))])
+
+        with pytest.raises(CallDepthError):
+            Interpreter(Node("TOP_LEVEL", [loop, main]), max_depth=20).execute()
@@ -0,0 +1,94 @@
+import io
+import sys
+import contextlib
+from pathlib import Path
+from src.ast.node import Kind
+from src.interpreter.interpreter import Interpreter
+from src.interpreter.sampler import SamplingProfiler
+from src.parser.calc_transformer import CalcTransformer
+from src.parser.grammar_loader import load_grammar
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCE = """fn light(a: i32) -> i32 {
+    return a + 1;
+}
+fn heavy(a: i32) -> i32 {
+    let x = a * 2 + a * 3;
+    return light(x);
+}
+fn main() -> i32 {
+    let x = heavy(1) + heavy(2);
+    return x;
+}"""
+
+
+def parse(source):
+    parser = load_grammar(str(ROOT / "grammar" / "calc_grammar.lark"), "top_level")
+    with contextlib.redirect_stdout(io.StringIO()):
+        return CalcTransformer().transform(parser.parse(source))
+
+
+def sample_every(interpreter, kind, sampler):
+    """kind のノードを実行するたびに sampler.sample を呼ぶようにする（タイマーの代わり）"""
+    count, handler, operands = interpreter.traversal.dispatch[kind]
+
+    def sampling(*args):
+        sampler.sample(sys._getframe())
+        return handler(*args)
+    interpreter.traversal.dispatch[kind] = (count, sampling, operands)
+
+
+class TestSamplingProfiler:
+    """Test sampler.py functionality"""
+
+    def test_samples_record_lines_of_the_call_stack(self):
+        """Test that each sample records the executing line and its callers' lines"""
+        root = parse(SOURCE)
+        sampler = SamplingProfiler()
+        with contextlib.redirect_stdout(io.StringIO()):
+            interpreter = Interpreter(root)
+            sample_every(interpreter, Kind.NUM, sampler)
+            interpreter.execute()
+
+        # NUM は main の 9 行目に 2 つ、heavy の 5 行目に 2 つ（2 回呼ばれる）、light の 2 行目に 1 つ（2 回呼ばれる）
+        assert sampler.stacks == {(9,): 2, (5, 9): 4, (2, 6, 9): 2}
+        assert sampler.function_samples(root) == {"main": (2, 8), "heavy": (4, 6), "light": (2, 2)}
+
+    def test_report_annotates_source_lines(self):
+        """Test the per-function table and the annotated source"""
+        root = parse(SOURCE)
+        sampler = SamplingProfiler()
+        sampler.samples = 4
+        sampler.stacks.update({(5, 9): 3, (2, 6, 9): 1})
+
+        report = sampler.report(SOURCE, root).splitlines()
+
+        assert report[2:6] == [
+            "function    self   total",
+            "heavy      75.0%  100.0%",
+            "light      25.0%   25.0%",
+            "main              100.0%",
+        ]
+        assert " 75.0%   75.0%     5      let x = a * 2 + a * 3;" in report
+        assert "        100.0%     9      let x = heavy(1) + heavy(2);" in report
+        assert "                   3  }" in report
+
+    def test_timer_samples_hot_line(self):
+        """Test that the SIGPROF timer attributes most samples to the expensive line"""
+        body = " + ".join(f"a * {j} - b" for j in range(40))
+        calls = " + ".join(f"heavy({i}, 2)" for i in range(600))
+        source = f"fn heavy(a: i32, b: i32) -> i32 {{\n    let x = {body};\n    return x;\n}}\nfn main() -> i32 {{\n    let x = {calls};\n    return x;\n}}"
+        root = parse(source)
+        with contextlib.redirect_stdout(io.StringIO()):
+            interpreter = Interpreter(root)
+            with SamplingProfiler(interval=0.0005) as sampler:
+                interpreter.execute()
+
+        self_lines, total_lines = sampler.line_samples()
+        assert sampler.samples > 0
+        assert self_lines.most_common(1)[0][0] == 2
+        assert total_lines[6] == sampler.samples
+
+    def test_no_samples(self):
+        """Test the report of a run shorter than one timer tick"""
+        assert SamplingProfiler().report(SOURCE, parse(SOURCE)).startswith("No samples")
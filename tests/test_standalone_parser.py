@@ -0,0 +1,46 @@
+import shutil
+from pathlib import Path
+from lark import Lark
+from src.parser.grammar_loader import load_grammar
+from src.parser.standalone_parser import build_standalone_parser, load_standalone_parser, grammar_hash
+
+ROOT = Path(__file__).resolve().parent.parent
+GRAMMAR = str(ROOT / "grammar" / "calc_grammar.lark")
+SOURCE = "fn main() -> i32 { let x = 2 * (3 + 4); return x; }"
+
+
+class TestStandaloneParser:
+    """Test standalone_parser.py functionality"""
+
+    def test_generated_parser_matches_grammar_parser(self, tmp_path):
+        """Test that the generated tables parse to the same tree as the .lark file"""
+        output = str(tmp_path / "calc_parser.py")
+        build_standalone_parser(GRAMMAR, "top_level", output)
+        parser = load_standalone_parser(GRAMMAR, "top_level", output)
+
+        assert isinstance(parser, Lark)
+        assert parser.parse(SOURCE) == load_grammar(GRAMMAR, "top_level").parse(SOURCE)
+
+    def test_missing_module_returns_none(self, tmp_path):
+        """Test that a missing module is reported as unavailable"""
+        assert load_standalone_parser(GRAMMAR, "top_level", str(tmp_path / "missing.py")) is None
+
+    def test_stale_module_falls_back_to_grammar(self, tmp_path):
+        """Test that a grammar change invalidates the generated module"""
+        grammar = tmp_path / "calc.lark"
+        shutil.copy(GRAMMAR, grammar)
+        output = str(tmp_path / "calc_parser.py")
+        build_standalone_parser(str(grammar), "top_level", output)
+        before = grammar_hash(str(grammar), "top_level")
+
+        grammar.write_text(grammar.read_text(encoding="utf-8") + "\n// changed\n", encoding="utf-8")
+
+        assert grammar_hash(str(grammar), "top_level") != before
+        assert load_standalone_parser(str(grammar), "top_level", output) is None
+        # load_grammar は .lark から作り直す
+        parser = load_grammar(str(grammar), "top_level", output)
+        assert parser.parse(SOURCE) is not None
+
+    def test_start_rule_is_part_of_hash(self):
+        """Test that a module built for another start rule is not reused"""
+        assert grammar_hash(GRAMMAR, "top_level") != grammar_hash(GRAMMAR, "function")
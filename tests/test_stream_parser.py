@@ -0,0 +1,140 @@
+import io
+import pytest
+from pathlib import Path
+from lark.exceptions import UnexpectedInput
+from src.interpreter.eval import Eval
+from src.interpreter.optimizer import Optimizer
+from src.parser.calc_transformer import CalcTransformer
+from src.parser.grammar_loader import load_grammar
+from src.parser.stream_parser import split_functions, iter_functions
+from src.utils.generator import Generator
+
+ROOT = Path(__file__).resolve().parent.parent
+GRAMMAR = str(ROOT / "grammar" / "calc_grammar.lark")
+SOURCE = (ROOT / "tests" / "test.rs").read_text(encoding="utf-8")
+
+# 文字列やコメントの中の括弧・fn は境界として扱わない
+TRICKY = """fn first() -> String {
+    // } fn fake() {
+    let s = "} { fn";
+    /* { multi
+       line } */
+    return s;
+}
+/* fn between() { } */
+fn second() -> i32 { if 1 < 2 { return 1; } else { return 2; } }
+// trailing comment"""
+
+
+@pytest.fixture(scope="module")
+def function_parser():
+    return load_grammar(GRAMMAR, "function")
+
+
+class TestStreamParser:
+    """Test stream_parser.py functionality"""
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 4096])
+    def test_split_at_function_boundaries(self, chunk_size):
+        """Test that items are split by braces regardless of chunk size"""
+        items = list(split_functions(io.StringIO(TRICKY), chunk_size))
+
+        assert len(items) == 2
+        assert "".join(text for text, _, _, _ in items) == TRICKY[:TRICKY.rindex("}") + 1]
+        assert items[1][0].strip().startswith("/* fn between")
+
+    def test_positions_are_absolute(self):
+        """Test that each item reports its offset, line and column in the file"""
+        items = list(split_functions(io.StringIO("fn a() {}  fn b() {\n}\nfn c() {}"), 3))
+
+        assert [(offset, line, column) for _, offset, line, column in items] == [(0, 1, 1), (9, 1, 10), (21, 2, 2)]
+
+    @pytest.mark.parametrize("source", [SOURCE, TRICKY], ids=["test.rs", "tricky"])
+    def test_same_ast_as_whole_file_parse(self, dump_ast, function_parser, source):
+        """Test that streamed functions equal the functions of a whole-file parse"""
+        whole = CalcTransformer().transform(load_grammar(GRAMMAR, "top_level").parse(source))
+        streamed = list(iter_functions(io.StringIO(source), function_parser, 16))
+
+        assert dump_ast(streamed) == dump_ast(whole.get_lhs())
+
+    def test_spans_are_absolute(self, function_parser):
+        """Test that streamed functions carry the same spans as a whole-file parse"""
+        whole = CalcTransformer().transform(load_grammar(GRAMMAR, "top_level").parse(TRICKY))
+        streamed = list(iter_functions(io.StringIO(TRICKY), function_parser, 16))
+
+        assert [function.get_span() for function in streamed] == [function.get_span() for function in whole.get_lhs()]
+        assert streamed[1].get_rhs()[0].get_lhs().get_span() == (9, 25, 9, 60)
+
+    def test_syntax_error_position(self, function_parser):
+        """Test that syntax errors are reported with file positions"""
+        source = "fn a() -> i32 {\n    return 1;\n}\nfn b() -> i32 {\n    let = 2;\n}"
+
+        with pytest.raises(UnexpectedInput) as error:
+            list(iter_functions(io.StringIO(source), function_parser))
+        assert (error.value.line, error.value.column) == (5, 9)
+
+    def test_trailing_garbage_is_reported(self, function_parser):
+        """Test that text after the last function is not silently dropped"""
+        with pytest.raises(UnexpectedInput):
+            list(iter_functions(io.StringIO("fn a() {}\nlet x = 1;"), function_parser))
+
+    def test_eval_and_generator_consume_stream(self, function_parser, tmp_path):
+        """Test that Eval and Generator process functions as they arrive"""
+        evaluator = Eval(None)
+        generator = Generator(output_dir=str(tmp_path))
+        stream = generator.generate_stream(evaluator.evaluate_functions(iter_functions(io.StringIO(SOURCE), function_parser)), "streamed.rs")
+
+        first = next(stream)
+        assert first.get_lhs().get_lhs() == "sub2"
+        assert evaluator.signatures["sub2"] == "number"
+        rest = list(stream)
+        assert len(rest) == 3
+
+        whole = Generator(output_dir=str(tmp_path))
+        whole.generate(CalcTransformer().transform(load_grammar(GRAMMAR, "top_level").parse(SOURCE)), "whole.rs")
+        # 2 行目は生成時刻
+        streamed_lines = (tmp_path / "streamed.rs").read_text(encoding="utf-8").split("\n")
+        whole_lines = (tmp_path / "whole.rs").read_text(encoding="utf-8").split("\n")
+        assert streamed_lines[:1] + streamed_lines[2:] == whole_lines[:1] + whole_lines[2:]
+
+    def test_calls_to_later_functions_are_checked_at_the_end(self, function_parser):
+        """Test that a forward call is not reported as undefined while the callee has not arrived"""
+        source = """fn main() -> i32 {
+    let x = helper(2);
+    return x;
+}
+fn helper(a: i32) -> i32 {
+    return a * 2;
+}"""
+        evaluator = Eval(None, verbose=False)
+        functions = list(Optimizer().optimize_functions(evaluator.evaluate_functions(iter_functions(io.StringIO(source), function_parser))))
+
+        assert len(functions) == 2
+        assert evaluator.errors == []
+        assert evaluator.results == {"helper": True, "main": True}
+
+    def test_deferred_functions_still_report_errors(self, function_parser):
+        """Test that undefined calls and type errors in deferred functions are reported as in a whole-file check"""
+        source = """fn main() -> i32 {
+    let x = helper(2) + missing(1);
+    return x;
+}
+fn bad() -> bool {
+    let y = helper(1);
+    return y;
+}
+fn helper(a: i32) -> i32 {
+    return a * 2;
+}"""
+        evaluator = Eval(None, verbose=False)
+        list(evaluator.evaluate_functions(iter_functions(io.StringIO(source), function_parser)))
+
+        whole = Eval(CalcTransformer().transform(load_grammar(GRAMMAR, "top_level").parse(source)), verbose=False)
+        whole.check()
+
+        assert evaluator.errors == [
+            "関数missingは定義されていません",
+            "関数badは型booleanにも関わらず型numberが返されました",
+        ]
+        assert sorted(evaluator.errors) == sorted(whole.errors)
+        assert evaluator.results == whole.results
@@ -0,0 +1,87 @@
+import io
+import json
+import tracemalloc
+import contextlib
+import pytest
+from pathlib import Path
+from src.ast.node import Node, Kind
+from src.parser.calc_transformer import CalcTransformer
+from src.parser.grammar_loader import load_grammar
+from src.utils.timings import StageTimings, count_nodes
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCE = "fn main() -> i32 { let x = 1 + 2 * 3; return x; }"
+
+
+class TestStageTimings:
+    """Test timings.py functionality"""
+
+    def test_stage_times_and_node_counts(self, ticking_clock):
+        """Test wall and CPU time per stage and node counts of the tree each stage handled"""
+        timings = StageTimings(trace_memory=False, clock=ticking_clock(), cpu_clock=ticking_clock())
+        parser = load_grammar(str(ROOT / "grammar" / "calc_grammar.lark"), "top_level")
+        with timings.stage("parse"):
+            tree = parser.parse(SOURCE)
+        timings.count(tree)
+        with timings.stage("transform"), contextlib.redirect_stdout(io.StringIO()):
+            root = CalcTransformer().transform(tree)
+        with timings.stage("check", root):
+            pass
+
+        data = timings.to_dict()
+        assert [stage["name"] for stage in data["stages"]] == ["parse", "transform", "check"]
+        assert [stage["wall_ms"] for stage in data["stages"]] == [1000, 1000, 1000]
+        assert data["total"] == {"wall_ms": 3000, "cpu_ms": 3000}
+        assert data["stages"][0]["nodes"] == sum(1 for _ in tree.iter_subtrees())
+        assert data["stages"][1]["nodes"] is None
+        assert data["stages"][2]["nodes"] == count_nodes(root)
+        assert data["stages"][2]["peak_memory_bytes"] is None
+
+    def test_count_nodes(self):
+        """Test that nodes in lists and in the type / params slots are counted"""
+        function = Node(Kind.FUNCTION, Node(Kind.ID, "main"), [
+            Node(Kind.STATEMENT, Node(Kind.RETURN, Node(Kind.NUM, 1))),
+        ], Node(Kind.PRIMITIVE_TYPE, "i32"))
+
+        assert count_nodes(Node(Kind.TOP_LEVEL, [function])) == 7
+        assert count_nodes("main") is None
+
+    def test_peak_memory(self):
+        """Test that the peak is measured from the start of each stage and tracing stops afterwards"""
+        timings = StageTimings()
+        kept = []
+        with timings.stage("allocate"):
+            kept.append(bytearray(1 << 20))
+        with timings.stage("small"):
+            bytearray(1 << 10)
+        timings.stop()
+
+        allocate, small = timings.stages
+        assert allocate.peak_memory >= 1 << 20
+        assert 1 << 10 <= small.peak_memory < 1 << 20
+        assert not tracemalloc.is_tracing()
+
+    def test_failed_stage_is_recorded(self):
+        """Test that a stage that raises still records its time"""
+        timings = StageTimings(trace_memory=False)
+        with pytest.raises(ValueError):
+            with timings.stage("check", Node(Kind.NUM, 1)):
+                raise ValueError("type error")
+
+        assert [record.name for record in timings.stages] == ["check"]
+        assert timings.stages[0].nodes is None
+
+    def test_json_and_table(self, ticking_clock, tmp_path):
+        """Test the JSON file and the printed table"""
+        timings = StageTimings(trace_memory=False, clock=ticking_clock(), cpu_clock=ticking_clock())
+        with timings.stage("generate", Node(Kind.NUM, 1)):
+            pass
+        timings.write_json(str(tmp_path / "timings.json"))
+
+        data = json.loads((tmp_path / "timings.json").read_text(encoding="utf-8"))
+        assert data["stages"] == [{"name": "generate", "wall_ms": 1000, "cpu_ms": 1000, "peak_memory_bytes": None, "nodes": 1}]
+        assert timings.format() == [
+            "stage        wall ms      cpu ms    peak KiB     nodes",
+            "generate     1000.00     1000.00           -         1",
+            "total        1000.00     1000.00",
+        ]
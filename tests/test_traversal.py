@@ -0,0 +1,174 @@
+import io
+import contextlib
+import pytest
+from pathlib import Path
+from src.ast.node import Node, Kind
+from src.ast.traversal import Traversal, preorder
+from src.interpreter.compiler import Compiler
+from src.interpreter.eval import Eval
+from src.interpreter.interpreter import Interpreter
+from src.interpreter.optimizer import Optimizer
+from src.interpreter.python_backend import PythonBackend
+from src.interpreter.vm import VM
+from src.parser.calc_transformer import CalcTransformer
+from src.parser.grammar_loader import load_grammar
+from src.parser.parse_cache import encode_ast
+from src.utils.emitter import RustEmitter
+from src.utils.generator import Generator
+from src.utils.utils import printNode
+
+ROOT = Path(__file__).resolve().parent.parent
+# Python の再帰上限（1000）を大きく超える左再帰の足し算
+DEEP_SOURCE = "fn main() -> i32 { let a = 2; let x = " + " + ".join(["a", "1"] * 2500) + "; return x; }"
+# 引数を読むので畳み込めない 5,000 項の足し算
+TERMS = " + ".join(f"a * {k}" for k in range(5000))
+PARAM_SOURCE = f"fn f(a: i32) -> i32 {{ let x = {TERMS}; return x; }} fn main() -> i32 {{ let x = f(3); return x; }}"
+PARAM_RESULT = 3 * 5000 * 4999 // 2
+
+
+@pytest.fixture(scope="module")
+def parse_deep():
+    """Parse a source into a fresh AST (for passes that rewrite the tree)"""
+    parser = load_grammar(str(ROOT / "grammar" / "calc_grammar.lark"), "top_level")
+
+    def parse(source):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return CalcTransformer().transform(parser.parse(source))
+
+    return parse
+
+
+@pytest.fixture(scope="module")
+def deep_ast(parse_deep):
+    return parse_deep(DEEP_SOURCE)
+
+
+def number(value):
+    return Node(Kind.FACTOR, Node(Kind.NUM, str(value)))
+
+
+class TestTraversal:
+    """Test traversal.py functionality"""
+
+    def test_operators_receive_operand_values(self):
+        """Test binary, unary and n-ary handlers and FACTOR unwrapping"""
+        traversal = Traversal(
+            {Kind.NUM: lambda node: int(node.lhs)},
+            lambda node: None,
+            binary={Kind.SUB_EXPR: lambda node, lhs, rhs: lhs - rhs},
+            unary={Kind.NEG_EXPR: lambda node, operand: -operand},
+            nary={Kind.FUNCTION_CALL: (lambda node: node.rhs, lambda node, *values: list(values))},
+        )
+        call = Node(Kind.FUNCTION_CALL, Node(Kind.ID, "f"), [
+            Node(Kind.SUB_EXPR, number(10), Node(Kind.NEG_EXPR, number(3))),
+            number(4),
+            Node(Kind.FACTOR, Node(Kind.FUNCTION_CALL, Node(Kind.ID, "g"), [])),
+        ])
+
+        assert traversal.evaluate(call) == [13, 4, []]
+
+    def test_unknown_kinds_use_default(self):
+        """Test that unregistered kinds are passed to the default handler"""
+        traversal = Traversal({}, lambda node: node.get_kind())
+
+        assert traversal.evaluate(Node(Kind.STR, '"s"')) == "STR"
+
+    def test_closures_replace_subtrees(self):
+        """Test that a registered closure is used instead of walking the subtree"""
+        inner = Node(Kind.ADD_EXPR, number(1), Node(Kind.ID, "unbound"))
+        traversal = Traversal({Kind.NUM: lambda node: int(node.lhs)}, lambda node: None,
+                              binary={Kind.ADD_EXPR: lambda node, lhs, rhs: lhs + rhs}, closures={inner: lambda: 40})
+
+        assert traversal.evaluate(Node(Kind.ADD_EXPR, Node(Kind.FACTOR, inner), number(2))) == 42
+
+    def test_preorder_runs_deferred_actions_in_order(self):
+        """Test that callables in the child list run after their earlier siblings"""
+        visited = []
+
+        def visit(item):
+            visited.append(item)
+            return [item + "1", lambda: visited.append("after " + item), item + "2"] if len(item) < 2 else None
+
+        preorder("a", visit)
+
+        assert visited == ["a", "a1", "after a", "a2"]
+
+
+class TestDeepExpressions:
+    """Test that every pass handles expressions deeper than the Python recursion limit"""
+
+    def test_eval(self, deep_ast):
+        """Test type checking a 5,000-term sum"""
+        evaluator = Eval(deep_ast, verbose=False)
+
+        assert evaluator.check()
+        assert evaluator.errors == []
+
+    def test_interpreter(self, deep_ast):
+        """Test executing a 5,000-term sum"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            frame = Interpreter(deep_ast).execute()
+
+        assert frame.get_variable("x").get_value() == 2500 * 3
+
+    def test_typed_interpreter(self, deep_ast):
+        """Test type inference and specialized closures on a 5,000-term sum"""
+        types = Eval(deep_ast, verbose=False).infer_types()
+        assert types[deep_ast.lhs[0].rhs[1].lhs.rhs] == "number"
+        with contextlib.redirect_stdout(io.StringIO()):
+            frame = Interpreter(deep_ast, types=types).execute()
+
+        assert frame.get_variable("x").get_value() == 2500 * 3
+
+    def test_generator(self, deep_ast):
+        """Test generating code for a 5,000-term sum"""
+        generator = Generator(emitter=RustEmitter(output_dir=None))
+        generator.generate(deep_ast)
+
+        assert "    let x = a + 1 + a + 1 + " in generator.emitter.source()
+
+    def test_optimizer(self, parse_deep):
+        """Test folding a 5,000-term sum of constants into one number"""
+        root = Optimizer().optimize(parse_deep(DEEP_SOURCE))
+
+        let = root.lhs[0].rhs[1].lhs
+        assert (let.rhs.get_kind(), let.rhs.lhs) == ("NUM", "7500")
+
+    @pytest.mark.parametrize("optimize", [False, True], ids=["plain", "optimized"])
+    def test_compiler_and_vm(self, parse_deep, optimize):
+        """Test compiling and running a 5,000-term sum of parameter terms"""
+        root = parse_deep(PARAM_SOURCE)
+        if optimize:
+            root = Optimizer().optimize(root)
+
+        assert VM(Compiler().compile(root)).run() == PARAM_RESULT
+
+    @pytest.mark.parametrize("optimize", [False, True], ids=["plain", "optimized"])
+    def test_python_backend(self, parse_deep, optimize):
+        """Test that the Python backend splits a 5,000-term sum into temporaries and restores the tree"""
+        root = parse_deep(PARAM_SOURCE)
+        if optimize:
+            root = Optimizer().optimize(root)
+        before = encode_ast(root)
+        backend = PythonBackend(root)
+
+        assert backend.run() == PARAM_RESULT
+        assert "__chunk_0 = " in backend.source
+        assert encode_ast(root) == before
+
+    def test_python_backend_rejects_unsplittable_expression(self, parse_deep):
+        """Test that a deep while condition gives a clear error instead of a RecursionError"""
+        root = parse_deep(f"fn f(a: i32) -> i32 {{ while {TERMS} < 0 {{ }} return a; }}")
+
+        with pytest.raises(ValueError, match="too deeply nested"):
+            PythonBackend(root)
+
+    def test_print_node(self, deep_ast):
+        """Test printing a 5,000-term sum"""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            printNode(deep_ast.lhs[0])
+
+        lines = output.getvalue().splitlines()
+        assert lines[:2] == ["FUNCTION", "STATEMENT"]
+        assert len(lines) > 15000
@@ -0,0 +1,228 @@
+import pytest
+from pathlib import Path
+from src.interpreter.compiler import Compiler
+from src.interpreter.vm import VM
+from src.interpreter.bytecode import Op
+from src.interpreter.interpreter import Interpreter
+from src.interpreter.memory import CallDepthError
+
+ROOT = Path(__file__).resolve().parent.parent
+CORPUS = [ROOT / "tests" / "test.rs"] + sorted((ROOT / "tests" / "conformance").glob("*.rs"))
+
+RECURSION = """
+fn fib(n: i32) -> i32 {
+    if n < 2 { return n; }
+    return fib(n - 1) + fib(n - 2);
+}
+fn depth(n: i32) -> i32 {
+    if n < 1 { return 0; }
+    return depth(n - 1) + 1;
+}
+fn main() -> i32 {
+    let f = fib(12);
+    let d = depth(500);
+    let x = f + d;
+}
+"""
+
+LOOPS = """
+fn first_square_over(limit: i32) -> i32 {
+    let i = 0;
+    loop {
+        if i * i > limit { return i; }
+        let i = i + 1;
+    }
+}
+fn main() -> i32 {
+    let i = 0;
+    let s = 0;
+    while i < 20 {
+        if i / 2 * 2 == i { let s = s + i; } else { let s = s - 1; }
+        let i = i + 1;
+    }
+    let x = s + first_square_over(50) * 100;
+}
+"""
+
+MATCH = """
+fn name(n: i32) -> String {
+    match n { 0 => return "zero";, 1 => return "one";, _ => return "many";, }
+}
+fn main() -> i32 {
+    let a = 2;
+    let r = 0;
+    match a { 1 => let r = 10;, 2 => let r = 20;, _ => let r = 30;, }
+    let s = name(1);
+    let t = name(5);
+    let x = r;
+}
+"""
+
+
+def run(root):
+    vm = VM(Compiler().compile(root))
+    return vm.run(), vm
+
+
+class TestCompiler:
+    """Test compiler.py functionality"""
+
+    def test_constants_are_pooled(self, build_ast):
+        """Test that identical constants share one pool entry"""
+        program = Compiler().compile(build_ast("fn main() -> i32 { let x = 2 * 2; return x; }"))
+        code = program.get_function("main")
+
+        assert code.consts.count(2) == 1
+        assert code.local_names == ["x"]
+        assert Op.MUL in code.code[0::2]
+
+    def test_params_take_first_slots(self, build_ast):
+        """Test that parameters are assigned the leading local slots"""
+        program = Compiler().compile(build_ast("fn f(a: i32, b: i32) -> i32 { let c = a + b; return c; }"))
+        code = program.get_function("f")
+
+        assert code.nparams == 2
+        assert code.local_names == ["a", "b", "c"]
+
+    def test_undefined_variable(self, build_ast):
+        """Test that unknown names are rejected at compile time"""
+        with pytest.raises(ValueError, match="Variable 'y' not found"):
+            Compiler().compile(build_ast("fn main() -> i32 { let x = y; }"))
+
+    def test_argument_count_mismatch(self, build_ast):
+        """Test that calls with the wrong arity are rejected"""
+        with pytest.raises(ValueError, match="expects 1 arguments"):
+            Compiler().compile(build_ast("fn f(a: i32) -> i32 { return a; } fn main() -> i32 { let x = f(); }"))
+
+
+class TestVM:
+    """Test vm.py functionality"""
+
+    def test_arithmetic(self, build_ast):
+        """Test arithmetic precedence and division"""
+        result, _ = run(build_ast("fn main() -> i32 { let x = 2*2/(2+2)-1; return x + 10 * 2; }"))
+
+        assert result == 20.0
+
+    def test_while_loop(self, build_ast):
+        """Test while loops with comparisons"""
+        result, vm = run(build_ast("""
+fn main() -> i32 {
+    let i = 0;
+    let s = 0;
+    while i < 100 {
+        let s = s + i;
+        let i = i + 1;
+    }
+    return s;
+}
+"""))
+        assert result == 4950
+        assert vm.get_local("i") == 100
+
+    def test_if_else(self, build_ast):
+        """Test if/else branches and logical operators"""
+        result, vm = run(build_ast("""
+fn main() -> i32 {
+    let a = 3;
+    if a >= 3 && !(a == 4) { let b = 1; } else { let b = 2; }
+    if a < 0 || false { let c = 1; } else { let c = 2; }
+    return b * 10 + c;
+}
+"""))
+        assert result == 12
+
+    def test_match(self, build_ast):
+        """Test match arms including the wildcard arm"""
+        result, _ = run(build_ast("""
+fn main() -> i32 {
+    let a = 2;
+    let r = 0;
+    match a { 1 => let r = 10;, 2 => let r = 20;, _ => let r = 30;, }
+    return r;
+}
+"""))
+        assert result == 20
+
+    def test_function_call_with_arguments(self, build_ast):
+        """Test calls with arguments and forward references"""
+        result, _ = run(build_ast("""
+fn main() -> i32 {
+    let x = add(1, neg(2));
+    return x;
+}
+fn add(a: i32, b: i32) -> i32 { return a + b; }
+fn neg(a: i32) -> i32 { return -a; }
+"""))
+        assert result == -1
+
+    def test_recursion(self, build_ast):
+        """Test recursive calls keep separate locals"""
+        result, _ = run(build_ast("""
+fn fib(n: i32) -> i32 {
+    if n < 2 { return n; }
+    return fib(n - 1) + fib(n - 2);
+}
+fn main() -> i32 { return fib(15); }
+"""))
+        assert result == 610
+
+    def test_frames_are_recycled(self, build_ast):
+        """Test that returned frames are reused and cleared"""
+        result, _ = run(build_ast("""
+fn inc(a: i32) -> i32 {
+    if a > 100 { let big = 1; }
+    return a + 1;
+}
+fn main() -> i32 {
+    let x = inc(inc(inc(0)));
+    let y = inc(500);
+    return x + y;
+}
+"""))
+        assert result == 504
+
+    def test_max_recursion_depth(self, build_ast):
+        """Test that deep recursion raises a language-level error"""
+        program = Compiler().compile(build_ast("""
+fn down(n: i32) -> i32 {
+    if n == 0 { return 0; }
+    return down(n - 1) + 1;
+}
+fn main() -> i32 { return down(50); }
+"""))
+        assert VM(program, max_depth=100).run() == 50
+
+        with pytest.raises(CallDepthError, match="Maximum recursion depth 10 exceeded in function down"):
+            VM(program, max_depth=10).run()
+
+    def test_deep_recursion_without_python_stack(self, build_ast):
+        """Test that recursion depth is not limited by Python's own stack"""
+        result, _ = run(build_ast("""
+fn down(n: i32) -> i32 {
+    if n == 0 { return 0; }
+    return down(n - 1) + 1;
+}
+fn main() -> i32 { return down(900); }
+"""))
+        assert result == 900
+
+    @pytest.mark.parametrize("path", CORPUS, ids=lambda path: path.name)
+    def test_matches_tree_walker(self, build_ast, path):
+        """Test that the VM agrees with the reference tree-walking interpreter on every main local"""
+        self.assert_same_locals(build_ast(path.read_text(encoding="utf-8")))
+
+    @pytest.mark.parametrize("source", [RECURSION, LOOPS, MATCH], ids=["recursion", "loops", "match"])
+    def test_matches_tree_walker_on_control_flow(self, build_ast, source):
+        """Test recursion, early returns from loops and match arms against the tree walker"""
+        self.assert_same_locals(build_ast(source))
+
+    @staticmethod
+    def assert_same_locals(ast):
+        frame = Interpreter(ast).execute()
+        expected = {variable.get_name(): variable.get_value() for variable in frame.values if variable is not None}
+
+        vm = VM(Compiler().compile(ast))
+        vm.run()
+        assert expected
+        assert {name: vm.get_local(name) for name in expected} == expected